@@ -0,0 +1,297 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from pdf2image import pdfinfo_from_path
+from main import compare_policies
+from tracing import Trace, use_trace
+from test import strip_date_from_filename
+
+# Span names of main.compare_policies: the top-level stages in order, then the stages that run
+# inside them, many times and possibly on worker threads (their times are summed over all spans;
+# "split" runs page by page in the pipeline's OCR threads, or once after extraction when not pipelined)
+STAGES = ["extract", "clean", "similarity", "render"]
+WORKER_STAGES = ["rasterize", "ocr", "split", "encode", "diff"]
+ANNOTATED_DIR = "ANNOTATED-POLICIES"
+BENCHMARK_DIR = "benchmarks"
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# Cold-start budget: importing an entry point must stay under this many seconds
+# and must not pull in any of the heavy dependencies, which load on first use
+IMPORT_BUDGETS = {"main": 0.3}
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "onnxruntime", "sklearn",
+                 "pdf2image", "pytesseract", "nltk", "reportlab"]
+
+def peak_rss_mb():
+    """
+    Peak resident set size so far, in MB: this process plus its largest finished child
+    (tesseract, forked diff workers). Pages a forked child shares with this process count twice,
+    so it is an upper bound. Only meaningful in a fresh process, see run_pipeline_timed.
+    """
+    peak = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+class MemoryTrace(Trace):
+    """A Trace that also notes the peak RSS (see peak_rss_mb) at the end of every span, per span name."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.peak_rss_mb = {}
+
+    @contextmanager
+    def span(self, name, **attrs):
+        try:
+            with super().span(name, **attrs):
+                yield
+        finally:
+            peak = peak_rss_mb()
+            with self._lock:
+                self.peak_rss_mb[name] = max(self.peak_rss_mb.get(name, 0.0), peak)
+
+def measure_import(module, repeats=5):
+    """
+    Cold import time of `module` in a fresh interpreter (best of `repeats`, via -X importtime),
+    plus the heavy dependencies the import pulled in.
+    """
+    probe = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    best = None
+    heavy = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                                capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].rstrip() == f" {module}":
+                seconds = int(parts[1]) / 1e6
+                best = seconds if best is None else min(best, seconds)
+        heavy = [m for m in result.stdout.strip().split(",") if m]
+    return {"seconds": best, "heavy_modules": heavy}
+
+def check_import_budgets(budgets=IMPORT_BUDGETS):
+    """Measure every budgeted module; returns (measurements, violations)."""
+    measurements = {}
+    violations = []
+    for module, budget in budgets.items():
+        measurement = measure_import(module)
+        measurement["budget"] = budget
+        measurements[module] = measurement
+        if measurement["seconds"] is not None and measurement["seconds"] > budget:
+            violations.append(f"import {module}: {measurement['seconds']:.3f}s over the {budget:.3f}s budget")
+        if measurement["heavy_modules"]:
+            violations.append(f"import {module} loads heavy modules eagerly: {', '.join(measurement['heavy_modules'])}")
+    return measurements, violations
+
+def make_large_policy_pdf(num_pages, path, renewal=False):
+    """
+    Render a synthetic policy of `num_pages` pages from the generator's clause wordings.
+    The renewal swaps the clause on every 10th page, so both documents share most of their text.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    import generate_policies as gp
+
+    clauses = [c for _, _, options in gp.CLAUSE_FIELDS for c in options if len(c) > 200]
+    styles = gp.get_styles()
+    content = []
+    for page in range(num_pages):
+        clause = clauses[page % len(clauses)]
+        if renewal and page % 10 == 9:
+            clause = clauses[(page + 1) % len(clauses)]
+        content.append(Paragraph(f"Page {page + 1} - Schedule of Exclusions", styles['Heading2']))
+        content.extend(Paragraph(p.strip(), styles['Normal']) for p in clause.split("<br/>"))
+        content.append(Spacer(1, 12))
+        content.append(PageBreak())
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    SimpleDocTemplate(path, pagesize=letter).build(content)
+    return path
+
+def benchmark_inputs(sizes, include_annotated=True):
+    """Fixed benchmark inputs: the annotated expiring/renewal pairs plus generated documents of each size."""
+    pairs = []
+    if include_annotated:
+        expiring_dir = os.path.join(ANNOTATED_DIR, "EXPIRING")
+        renewal_dir = os.path.join(ANNOTATED_DIR, "RENEWAL")
+        renewals = {strip_date_from_filename(f): f for f in os.listdir(renewal_dir) if f.endswith(".pdf")}
+        for filename in sorted(os.listdir(expiring_dir)):
+            name = strip_date_from_filename(filename)
+            if filename.endswith(".pdf") and name in renewals:
+                pairs.append((f"annotated/{name}", os.path.join(expiring_dir, filename),
+                              os.path.join(renewal_dir, renewals[name])))
+    for size in sizes:
+        expiring_pdf = os.path.join(BENCHMARK_DIR, "inputs", f"generated_{size}_expiring.pdf")
+        renewal_pdf = os.path.join(BENCHMARK_DIR, "inputs", f"generated_{size}_renewal.pdf")
+        if not os.path.exists(expiring_pdf):
+            make_large_policy_pdf(size, expiring_pdf)
+        if not os.path.exists(renewal_pdf):
+            make_large_policy_pdf(size, renewal_pdf, renewal=True)
+        pairs.append((f"generated/{size}_pages", expiring_pdf, renewal_pdf))
+    return pairs
+
+def _run_once(expiring_pdf, renewal_pdf, backend="torch", pipelined=True):
+    """One timed comparison in this process; run_pipeline_timed calls it in a fresh interpreter."""
+    output_path = os.path.join(BENCHMARK_DIR, "output", "diff_output.html")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    trace = MemoryTrace("benchmark")
+    start = time.perf_counter()
+    with use_trace(trace):
+        compare_policies(expiring_pdf, renewal_pdf, backend=backend, pipelined=pipelined, output_path=output_path)
+    timings = {"total": time.perf_counter() - start, "peak_rss_mb": peak_rss_mb(), "rss": {}}
+
+    # Top-level stages run one after the other, so their sum is close to the wall-clock total;
+    # worker stages overlap across threads and documents, so theirs is CPU-side work, not latency
+    for stage in STAGES:
+        timings[stage] = sum(s["seconds"] for s in trace.spans if s["name"] == stage and s["parent"] is None)
+    for stage in WORKER_STAGES:
+        timings[stage] = sum(s["seconds"] for s in trace.spans if s["name"] == stage)
+    # Peak RSS reached by the end of each stage (0 for stages that did not run)
+    for stage in STAGES + WORKER_STAGES:
+        timings["rss"][stage] = trace.peak_rss_mb.get(stage, 0.0)
+
+    counters = trace.counters
+    pages = counters.get("pages") or sum(pdfinfo_from_path(pdf)["Pages"] for pdf in (expiring_pdf, renewal_pdf))
+    counts = {"pages": pages, "paragraphs": counters.get("paragraphs", 0),
+              "report_bytes": os.path.getsize(output_path),
+              "tiers": {name[len("tier_"):]: value for name, value in counters.items() if name.startswith("tier_")},
+              "diffs": counters.get("diffs", 0), "diffs_coarse": counters.get("diffs_coarse", 0)}
+    return timings, counts
+
+def run_pipeline_timed(expiring_pdf, renewal_pdf, backend="torch", pipelined=True):
+    """
+    Run the production comparison (main.compare_policies) once, in a fresh interpreter so the peak RSS
+    belongs to this input alone (and, as from the command line, includes loading the model), and read
+    the stage times and peak RSS per stage from its spans. Returns (timings, counts).
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--run-once", expiring_pdf, renewal_pdf,
+               "--backend", backend] + ([] if pipelined else ["--sequential"])
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    timings, counts = json.loads(result.stdout.strip().splitlines()[-1])
+    return timings, counts
+
+def summarize(runs, counts):
+    """Latency percentiles per stage plus throughput for one input."""
+    summary = {"runs": len(runs), **counts, "stages": {},
+               "peak_rss_mb": max(run["peak_rss_mb"] for run in runs)}
+    for stage in STAGES + WORKER_STAGES + ["total"]:
+        values = np.array([run[stage] for run in runs])
+        summary["stages"][stage] = {
+            "p50": float(np.percentile(values, 50)),
+            "p90": float(np.percentile(values, 90)),
+            "p99": float(np.percentile(values, 99)),
+            "peak_rss_mb": max(run["rss"][stage] for run in runs) if stage != "total" else summary["peak_rss_mb"],
+        }
+    total = summary["stages"]["total"]["p50"]
+    summary["pages_per_second"] = counts["pages"] / total if total else None
+    summary["paragraphs_per_second"] = counts["paragraphs"] / total if total else None
+    return summary
+
+def run_benchmarks(sizes=(10, 100, 1000), repeats=3, backend="torch", include_annotated=True, pipelined=True):
+    """Benchmark every input `repeats` times and return the results dict."""
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "machine": {"platform": platform.platform(), "cpus": os.cpu_count()},
+        "backend": backend,
+        "pipelined": pipelined,
+        "inputs": {},
+    }
+    results["imports"], results["import_violations"] = check_import_budgets()
+    for module, measurement in results["imports"].items():
+        print(f"import {module}: {measurement['seconds']:.3f}s (budget {measurement['budget']:.3f}s)")
+    for name, expiring_pdf, renewal_pdf in benchmark_inputs(sizes, include_annotated):
+        runs = []
+        counts = {}
+        for _ in range(repeats):
+            timings, counts = run_pipeline_timed(expiring_pdf, renewal_pdf, backend, pipelined)
+            runs.append(timings)
+        results["inputs"][name] = summarize(runs, counts)
+        total = results["inputs"][name]["stages"]["total"]["p50"]
+        print(f"{name}: {total:.2f}s p50, {results['inputs'][name]['pages_per_second']:.2f} pages/s")
+    return results
+
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """
+    List regressions against a stored baseline: stage p50 latency more than `tolerance` slower,
+    or throughput more than `tolerance` lower.
+    """
+    regressions = list(results.get("import_violations", []))
+    for module, current in results.get("imports", {}).items():
+        old = baseline.get("imports", {}).get(module, {}).get("seconds")
+        new = current["seconds"]
+        if old and new is not None and new > old * (1 + tolerance):
+            regressions.append(f"import {module}: {old:.3f}s -> {new:.3f}s (+{new / old - 1:.0%})")
+    for name, current in results["inputs"].items():
+        previous = baseline.get("inputs", {}).get(name)
+        if not previous:
+            continue
+        for stage in STAGES + WORKER_STAGES + ["total"]:
+            if stage not in previous["stages"]:
+                continue
+            old = previous["stages"][stage]["p50"]
+            new = current["stages"][stage]["p50"]
+            if old and new > old * (1 + tolerance):
+                regressions.append(f"{name} {stage}: p50 {old:.3f}s -> {new:.3f}s (+{new / old - 1:.0%})")
+        for metric in ("pages_per_second", "paragraphs_per_second"):
+            old, new = previous.get(metric), current.get(metric)
+            if old and new is not None and new < old * (1 - tolerance):
+                regressions.append(f"{name} {metric}: {old:.2f} -> {new:.2f} ({new / old - 1:.0%})")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage-level performance benchmark of the comparison pipeline")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10, 100, 1000], help="generated document sizes in pages")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--skip-annotated", action="store_true", help="only run the generated documents")
+    parser.add_argument("--sequential", action="store_true", help="benchmark the non-pipelined extraction path")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--imports-only", action="store_true", help="only check the import-time budgets")
+    parser.add_argument("--run-once", nargs=2, metavar=("EXPIRING", "RENEWAL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_once:
+        # Worker of run_pipeline_timed: one comparison, results as the last line of stdout
+        print(json.dumps(_run_once(*args.run_once, args.backend, not args.sequential)))
+        raise SystemExit(0)
+
+    if args.imports_only:
+        measurements, violations = check_import_budgets()
+        for module, measurement in measurements.items():
+            print(f"import {module}: {measurement['seconds']:.3f}s (budget {measurement['budget']:.3f}s)")
+        for violation in violations:
+            print(f"  {violation}")
+        raise SystemExit(1 if violations else 0)
+
+    results = run_benchmarks(args.sizes, args.repeats, args.backend, not args.skip_annotated,
+                             not args.sequential)
+
+    os.makedirs(os.path.join(BENCHMARK_DIR, "results"), exist_ok=True)
+    results_file = os.path.join(BENCHMARK_DIR, "results", f"{results['timestamp'].replace(':', '-')}.json")
+    with open(results_file, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {results_file}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            raise SystemExit(1)
+        print("No regressions against baseline.")
+    else:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
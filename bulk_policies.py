@@ -0,0 +1,270 @@
+import logging
+import os
+from datetime import datetime
+import numpy as np
+import generate_policies
+from generate_policies import (CLAUSE_FIELDS, PAYMENT_TERMS, PERIOD_SUBLIMITS, POLICY_DURATIONS, SUBLIMIT_SCHEDULE,
+                               policy_paragraphs)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; batches are written as compressed .npz files instead
+    pa = None
+
+logger = logging.getLogger("policy_diff")
+
+# Amount columns hold dollars; a sublimit of "Policy Limit" is stored as POLICY_LIMIT
+POLICY_LIMIT = -1
+
+DEDUCTIBLE_KEYS = ('all_other_loss', 'earthquake', 'named_windstorm', 'flood')
+COVERAGE_KEYS = ('earthquake', 'strikes_riots_civil_commotion', 'named_windstorm', 'flood')
+SIR_TYPES = ('none', 'single', 'aggregated')
+
+def choose_sublimits(options, policy_limit, parent_limit=None, rng=None):
+    """
+    Vectorized choose_sublimit: for every row, a uniform choice among the options that are at most
+    policy_limit (and parent_limit), "Policy Limit" always allowed; the policy limit when none qualifies.
+    """
+    n = len(policy_limit)
+    amounts = np.array([POLICY_LIMIT if isinstance(o, str) else o for o in options], dtype=np.int64)
+    valid = (amounts == POLICY_LIMIT) | (amounts <= policy_limit[:, None])
+    if parent_limit is not None:
+        valid &= (amounts == POLICY_LIMIT) | (amounts <= parent_limit[:, None])
+    num_valid = valid.sum(axis=1)
+    # Pick the k-th valid option, k uniform in [0, num_valid)
+    k = np.floor(rng.random(n) * num_valid).astype(np.int64)
+    chosen = amounts[np.argmax(np.cumsum(valid, axis=1) > k[:, None], axis=1)]
+    return np.where(num_valid > 0, chosen, policy_limit)
+
+def choose_amounts(n, range_min, range_max, bias_min, bias_max, bias_probability=0.8, rng=None):
+    """Vectorized choose_deductible / choose_sir: biased uniform draw rounded to the nearest thousand."""
+    biased = rng.random(n) < bias_probability
+    value = np.where(biased, rng.uniform(bias_min, bias_max, n), rng.uniform(range_min, range_max, n))
+    return (np.round(value / 1000) * 1000).astype(np.int64)
+
+def _day_of_month(months, start_day):
+    """Day 1, 15 or the last day (start_day 0, 1, 2) of each datetime64[M] month."""
+    first = months.astype('datetime64[D]')
+    last = (months + 1).astype('datetime64[D]') - 1
+    return np.where(start_day == 0, first, np.where(start_day == 1, first + 14, last))
+
+def add_months(dates, months):
+    """datetime64[D] + months, clamping the day to the end of the month like relativedelta."""
+    month = dates.astype('datetime64[M]')
+    day = (dates - month.astype('datetime64[D]')).astype(np.int64)
+    target = month + months
+    month_length = ((target + 1).astype('datetime64[D]') - target.astype('datetime64[D]')).astype(np.int64)
+    return target.astype('datetime64[D]') + np.minimum(day, month_length - 1)
+
+def generate_policy_columns(policy_id, insured_name, rng, inception_date=None, as_of=None):
+    """
+    Columnar generate_policy_data: one row per policy, drawn from the same distributions.
+    - policy_id, insured_name: arrays with one entry per policy
+    - inception_date: datetime64[D] array to use instead of a random date (renewals)
+    - rng: a numpy Generator
+    Returns {column name: array}: amounts in dollars, dates as datetime64[D], clause wordings as
+    indexes into their CLAUSE_FIELDS lists, deductible_<key>, sublimit_<key> and coverage_<key>.
+    """
+    n = len(policy_id)
+    columns = {'policy_id': np.asarray(policy_id, dtype=np.int64), 'insured_name': np.asarray(insured_name)}
+
+    duration_months = rng.choice(np.array(POLICY_DURATIONS, dtype=np.int8), n, p=[0.7, 0.1, 0.1, 0.1])
+    if inception_date is None:
+        as_of_day = np.datetime64((as_of or datetime.now()).date(), 'D')
+        initial_date = as_of_day - rng.integers(30, 360, n, endpoint=True)
+        start_day = rng.integers(0, 3, n)
+        month = initial_date.astype('datetime64[M]')
+        inception_date = _day_of_month(month, start_day)
+        # A start day later in the month than the drawn date moves to the previous month
+        inception_date = np.where(inception_date > initial_date, _day_of_month(month - 1, start_day), inception_date)
+    columns['inception_date'] = np.asarray(inception_date, dtype='datetime64[D]')
+    columns['expiration_date'] = add_months(columns['inception_date'], duration_months)
+    columns['duration_months'] = duration_months
+
+    policy_limit = rng.integers(10_000_000, 200_000_000, n, endpoint=True)
+    columns['policy_limit'] = policy_limit
+    columns['insured_value'] = np.round(policy_limit * rng.uniform(0.8, 1.2, n)).astype(np.int64)
+    base_premium = policy_limit * rng.uniform(0.001, 0.005, n)
+    brokerage_commission = rng.uniform(0.10, 0.25, n)
+    columns['premium'] = np.round(base_premium * (1 + brokerage_commission)).astype(np.int64)
+    columns['brokerage_commission_percentage'] = np.round(brokerage_commission * 100, 2)
+
+    columns['deductible_all_other_loss'] = choose_amounts(n, 25_000, 50_000_000, 25_000, 50_000_000,
+                                                          bias_probability=0.5, rng=rng)
+    for key in DEDUCTIBLE_KEYS[1:]:
+        columns[f'deductible_{key}'] = choose_amounts(n, 5_000_000, 100_000_000, 5_000_000, 25_000_000, rng=rng)
+
+    sir_type = rng.choice(np.arange(3, dtype=np.int8), n, p=[0.5, 0.3, 0.2])
+    sir_amount = choose_amounts(n, 5_000_000, 100_000_000, 5_000_000, 25_000_000, rng=rng)
+    aggregate = np.round(rng.integers(sir_amount, 100_000_000, endpoint=True) / 1000).astype(np.int64) * 1000
+    columns['sir_type'] = sir_type
+    columns['sir_amount'] = np.where(sir_type > 0, sir_amount, 0)
+    columns['sir_aggregate'] = np.where(sir_type == 2, aggregate, 0)
+
+    for key, options, parent in SUBLIMIT_SCHEDULE:
+        if key in PERIOD_SUBLIMITS:
+            columns[f'sublimit_{key}'] = rng.choice(np.array(options, dtype=np.int8), n)
+        elif not isinstance(options, str):
+            parent_limit = columns[f'sublimit_{parent}'] if parent else None
+            columns[f'sublimit_{key}'] = choose_sublimits(options, policy_limit, parent_limit, rng)
+
+    for key in COVERAGE_KEYS:
+        columns[f'coverage_{key}'] = rng.random(n) < 0.5
+    columns['policy_number'] = rng.integers(100000, 999999, n, endpoint=True).astype(np.int32)
+    for _, field, options in CLAUSE_FIELDS:
+        columns[field] = rng.integers(0, len(options), n).astype(np.int16)
+    columns['payment_terms_days'] = rng.choice(np.array(PAYMENT_TERMS, dtype=np.int16), n)
+    return columns
+
+def insured_names(start, stop):
+    """Insured names of pairs start..stop-1 (1-based), as generate_all_policies assigns them."""
+    generate_policies.reset_insured_names()
+    pool = generate_policies.INSURED_NAMES_POOL
+    return np.array([pool[i - 1] if i <= len(pool) else f"Company {i}" for i in range(start, stop)])
+
+def iter_policy_batches(num_pairs, seed=None, as_of=None, batch_size=100_000):
+    """
+    Yield (expiring, renewal) column dicts for num_pairs policy pairs, batch_size pairs at a time.
+    As in generate_all_policies' default mode, the renewal is an independent draw starting on the
+    expiring policy's expiration date, with policy_id num_pairs + pair index.
+    A seed makes the output reproducible for the same batch_size; pass as_of too for identical dates.
+    """
+    as_of = as_of or datetime.now()
+    for batch, start in enumerate(range(1, num_pairs + 1, batch_size)):
+        rng = np.random.default_rng([seed, batch] if seed is not None else None)
+        pair_index = np.arange(start, min(start + batch_size, num_pairs + 1))
+        names = insured_names(start, pair_index[-1] + 1)
+        expiring = generate_policy_columns(pair_index, names, rng, as_of=as_of)
+        renewal = generate_policy_columns(num_pairs + pair_index, names, rng, inception_date=expiring['expiration_date'])
+        yield expiring, renewal
+
+def _money(amount):
+    return f"${amount:,}"
+
+def policy_record(columns, i):
+    """Row i of a column dict as the policy dict generate_policy_data returns (for policy_paragraphs / create_pdf)."""
+    def value(name):
+        return columns[name][i].item()
+
+    sir_type = SIR_TYPES[value('sir_type')]
+    if sir_type == 'none':
+        sir = None
+    elif sir_type == 'single':
+        sir = f"{_money(value('sir_amount'))} each and every loss"
+    else:
+        sir = f"{_money(value('sir_amount'))} each and every loss and {_money(value('sir_aggregate'))} in the annual aggregate"
+
+    sublimits = {}
+    for key, options, _ in SUBLIMIT_SCHEDULE:
+        if isinstance(options, str):
+            sublimits[key] = options
+        elif key in PERIOD_SUBLIMITS:
+            sublimits[key] = f"{value(f'sublimit_{key}')} {PERIOD_SUBLIMITS[key]}"
+        else:
+            amount = value(f'sublimit_{key}')
+            sublimits[key] = "Policy Limit" if amount == POLICY_LIMIT else _money(amount)
+
+    record = {
+        'policy_id': value('policy_id'),
+        'insured_name': str(columns['insured_name'][i]),
+        'policy_number': f"PN-{value('policy_number')}",
+        'inception_date': str(columns['inception_date'][i]),
+        'expiration_date': str(columns['expiration_date'][i]),
+        'duration_months': value('duration_months'),
+        'policy_limit': _money(value('policy_limit')),
+        'insured_value': _money(value('insured_value')),
+        'premium': _money(value('premium')),
+        'brokerage_commission_percentage': f"{value('brokerage_commission_percentage')}%",
+        'payment_terms_days': value('payment_terms_days'),
+        'deductibles': {key: f"{_money(value(f'deductible_{key}'))} each and every loss" for key in DEDUCTIBLE_KEYS},
+        'sir': sir,
+        'sublimits': sublimits,
+        'coverage': {key: value(f'coverage_{key}') for key in COVERAGE_KEYS},
+    }
+    for _, field, options in CLAUSE_FIELDS:
+        record[field] = options[value(field)]
+    return record
+
+def policy_text(policy_data):
+    """A text-only policy document: the paragraphs create_pdf lays out, separated by blank lines."""
+    return "\n\n".join(policy_paragraphs(policy_data)) + "\n"
+
+def write_text_policies(columns, output_dir='policies_text'):
+    """Write every row as 'Insured Name @ MM-DD-YYYY.txt' (the create_pdf naming) without reportlab; returns the paths."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for i in range(len(columns['policy_id'])):
+        policy = policy_record(columns, i)
+        inception = datetime.strptime(policy['inception_date'], '%Y-%m-%d').strftime('%m-%d-%Y')
+        path = os.path.join(output_dir, f"{policy['insured_name']} @ {inception}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(policy_text(policy))
+        paths.append(path)
+    return paths
+
+def write_policy_tables(num_pairs, output_dir='policies_bulk', seed=None, as_of=None, batch_size=100_000,
+                        file_format=None, on_batch=None):
+    """
+    Generate num_pairs policy pairs in batches and write them as columnar tables:
+    - parquet (default when pyarrow is installed): expiring.parquet and renewal.parquet, one row group per batch
+    - npz: expiring-00000.npz, renewal-00000.npz, ... one compressed file per batch
+    on_batch(batch number, expiring, renewal) is called with the columns of every batch once written.
+    Returns the written paths.
+    """
+    if file_format is None:
+        file_format = "parquet" if pa is not None else "npz"
+        if pa is None:
+            logger.warning("pyarrow is not installed; writing compressed .npz batches instead of Parquet")
+    if file_format == "parquet" and pa is None:
+        raise ImportError("writing Parquet requires pyarrow (pip install pyarrow), or use file_format='npz'")
+    os.makedirs(output_dir, exist_ok=True)
+    writers = {}
+    paths = []
+    try:
+        for batch, tables in enumerate(iter_policy_batches(num_pairs, seed, as_of, batch_size)):
+            for side, columns in zip(("expiring", "renewal"), tables):
+                if file_format == "parquet":
+                    table = pa.table(columns)
+                    if side not in writers:
+                        paths.append(os.path.join(output_dir, f"{side}.parquet"))
+                        writers[side] = pq.ParquetWriter(paths[-1], table.schema)
+                    writers[side].write_table(table)
+                else:
+                    paths.append(os.path.join(output_dir, f"{side}-{batch:05d}.npz"))
+                    np.savez_compressed(paths[-1], **columns)
+            if on_batch:
+                on_batch(batch, *tables)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return paths
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Generate policy pairs as columnar tables for load testing.")
+    parser.add_argument("num_pairs", type=int)
+    parser.add_argument("--output", default="policies_bulk")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    parser.add_argument("--format", choices=["parquet", "npz"], default=None, help="default: parquet if pyarrow is installed")
+    parser.add_argument("--text", type=int, default=0, help="also write the first N pairs as text-only documents")
+    args = parser.parse_args()
+
+    # Keep the first rows of the first batch as written, so the text documents match the tables
+    first_rows = []
+
+    def keep_first_rows(batch, *tables):
+        if batch == 0 and args.text:
+            first_rows.extend({name: column[:args.text] for name, column in columns.items()} for columns in tables)
+
+    start = time.perf_counter()
+    paths = write_policy_tables(args.num_pairs, args.output, args.seed, batch_size=args.batch_size,
+                                file_format=args.format, on_batch=keep_first_rows)
+    print(f"{args.num_pairs:,} pairs written to {len(paths)} files in {time.perf_counter() - start:.1f} s")
+    if args.text:
+        expiring, renewal = first_rows
+        text_dir = os.path.join(args.output, "text")
+        print(f"{len(write_text_policies(expiring, text_dir)) + len(write_text_policies(renewal, text_dir))} "
+              f"text documents written to {text_dir}")
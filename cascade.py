@@ -0,0 +1,112 @@
+import difflib
+import hashlib
+import re
+import numpy as np
+
+try:
+    from rapidfuzz import fuzz
+except ImportError:  # rapidfuzz is optional; difflib gives the same ratio, just slower
+    fuzz = None
+
+# Past this many characters (both sides together), the difflib fallback compares words instead of characters:
+# SequenceMatcher is quadratic, and two pages OCR'd as one paragraph each would take seconds per candidate
+CHAR_RATIO_MAX_CHARS = 2_000
+
+TIERS = ("hash", "lexical", "embedding")
+
+def normalize_paragraph(text, clean=None):
+    """Collapse whitespace and case (after the optional `clean` function) so cosmetic differences hash equally."""
+    if clean is not None:
+        text = clean(text)
+    return " ".join(text.lower().split())
+
+def paragraph_hash(text, clean=None):
+    return hashlib.sha1(normalize_paragraph(text, clean).encode("utf-8")).hexdigest()
+
+def token_set(text):
+    return set(re.findall(r"\w+", text.lower()))
+
+def jaccard_similarity(a_tokens, b_tokens):
+    if not a_tokens and not b_tokens:
+        return 1.0
+    return len(a_tokens & b_tokens) / len(a_tokens | b_tokens)
+
+def char_ratio(a, b):
+    """
+    Character-level similarity in [0, 1] (rapidfuzz if installed, otherwise difflib).
+    Without rapidfuzz, texts longer than CHAR_RATIO_MAX_CHARS are compared word by word.
+    """
+    if fuzz is not None:
+        return fuzz.ratio(a, b) / 100.0
+    if len(a) + len(b) > CHAR_RATIO_MAX_CHARS:
+        a, b = a.split(), b.split()
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+def cascade_match(expiring_paragraphs, renewal_paragraphs, encode, clean=None, high=0.9, candidates=3):
+    """
+    Find the best renewal counterpart for every expiring paragraph, using the cheapest test that settles it.
+    1. hash:      identical after cleaning/normalization -> matched, score 1.0
+    2. lexical:   token-set Jaccard picks `candidates` renewal paragraphs, character ratio scores them;
+                  a best ratio >= high (clearly the same clause) settles it
+    3. embedding: only the paragraphs left, edited or reworded (a low character ratio says nothing
+                  about meaning), are embedded with `encode` (a function mapping a list of paragraphs
+                  to embeddings) and matched by cosine similarity
+    Returns (matches, tier_counts), where matches[i] = {"renewal_index", "score", "tier"}.
+    """
+    matches = [None] * len(expiring_paragraphs)
+    tier_counts = dict.fromkeys(TIERS, 0)
+    tier_counts["encoded"] = 0
+    if not renewal_paragraphs:
+        return matches, tier_counts
+
+    # Tier 1: hash equality
+    renewal_by_hash = {}
+    for j, para in enumerate(renewal_paragraphs):
+        renewal_by_hash.setdefault(paragraph_hash(para, clean), j)
+    unresolved = []
+    for i, para in enumerate(expiring_paragraphs):
+        j = renewal_by_hash.get(paragraph_hash(para, clean))
+        if j is not None:
+            matches[i] = {"renewal_index": j, "score": 1.0, "tier": "hash"}
+            tier_counts["hash"] += 1
+        else:
+            unresolved.append(i)
+
+    # Tier 2: cheap lexical similarity
+    exp_norm = {i: normalize_paragraph(expiring_paragraphs[i], clean) for i in unresolved}
+    ren_norm = [normalize_paragraph(p, clean) for p in renewal_paragraphs]
+    ren_tokens = [token_set(p) for p in ren_norm]
+    uncertain = []
+    for i in unresolved:
+        tokens = token_set(exp_norm[i])
+        shortlist = sorted(range(len(renewal_paragraphs)),
+                           key=lambda j: jaccard_similarity(tokens, ren_tokens[j]), reverse=True)[:candidates]
+        scored = [(char_ratio(exp_norm[i], ren_norm[j]), j) for j in shortlist]
+        best_score, best_j = max(scored)
+        if best_score >= high:
+            matches[i] = {"renewal_index": best_j, "score": best_score, "tier": "lexical"}
+            tier_counts["lexical"] += 1
+        else:
+            uncertain.append(i)
+
+    # Tier 3: embeddings for the ambiguous remainder only
+    if uncertain:
+        exp_embeddings = np.asarray(encode([expiring_paragraphs[i] for i in uncertain]), dtype=np.float32)
+        ren_embeddings = np.asarray(encode(list(renewal_paragraphs)), dtype=np.float32)
+        exp_embeddings /= np.clip(np.linalg.norm(exp_embeddings, axis=1, keepdims=True), 1e-12, None)
+        ren_embeddings /= np.clip(np.linalg.norm(ren_embeddings, axis=1, keepdims=True), 1e-12, None)
+        similarity_matrix = exp_embeddings @ ren_embeddings.T
+        for row, i in enumerate(uncertain):
+            j = int(np.argmax(similarity_matrix[row]))
+            matches[i] = {"renewal_index": j, "score": float(similarity_matrix[row][j]), "tier": "embedding"}
+        tier_counts["embedding"] = len(uncertain)
+        tier_counts["encoded"] = len(uncertain) + len(renewal_paragraphs)
+
+    return matches, tier_counts
+
+def format_tier_counts(tier_counts):
+    total = sum(tier_counts[t] for t in TIERS) or 1
+    text = ", ".join(f"{t} {tier_counts[t]} ({tier_counts[t] / total:.0%})" for t in TIERS)
+    if tier_counts.get("encoded"):
+        text += f"; {tier_counts['encoded']} paragraphs embedded"
+    return text
@@ -0,0 +1,366 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import numpy as np
+
+# Short, digit-free lines that start a new part of the policy
+SECTION_HEADINGS = [
+    "Policy Information", "Financial Information", "Deductibles", "Self Insured Retention",
+    "Sublimits", "Exclusions and Clauses", "Coverage Information", "Terrorism", "Nuclear",
+    "Communicable Disease", "Cyber", "Sanctions", "Microorganism", "Transmission & Distribution Lines"
+]
+
+def parse_policy_filename(path):
+    """
+    Split a file named 'Insured Name @ MM-DD-YYYY.pdf' into (insured name, policy date).
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    match = re.search(r'\s*@\s*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})', name)
+    if not match:
+        return name.strip(), None
+    return name[:match.start()].strip(), match.group(1)
+
+def detect_section(paragraph, current_section=None):
+    """
+    Return the section a paragraph opens, or the current section if it is ordinary text.
+    """
+    first_line = paragraph.strip().splitlines()[0].strip() if paragraph.strip() else ""
+    heading = first_line.rstrip(":").strip()
+    for known in SECTION_HEADINGS:
+        if heading.lower().startswith(known.lower()) and len(heading.split()) <= 6:
+            return known
+    return current_section
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def _paragraph_key(text):
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+class ClauseIndex:
+    """
+    File-backed IVF (inverted file) index over paragraph embeddings.
+
+    Identical wording is stored once and tagged with every policy it appears in,
+    so boilerplate shared across the portfolio does not grow the index.
+    Vectors are clustered with spherical k-means; a query only scans the
+    `nprobe` closest clusters.
+
+    On disk, save() only appends what was added since the last save:
+    - vectors.f32, texts.jsonl, occurrences.jsonl   append-only data files
+    - centroids-<n>.npy, assignments-<n>.i32         clusters of training generation n; the assignments of
+                                                     vectors added later are appended, a retrain starts n + 1
+    - meta.json                                      committed length of every data file, the generation and
+                                                     the embedding backend the vectors came from
+    meta.json is replaced atomically after the appends, so an interrupted save leaves the
+    previous index intact (bytes past the committed lengths are ignored and overwritten).
+    Queries must be encoded the same way as the vectors (see search_similar_clauses).
+    """
+
+    def __init__(self, path, backend=None):
+        self.path = path
+        self.backend = backend
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+        self.texts = []
+        self.occurrences = []
+        self.documents = set()
+        self.key_to_id = {}
+        self.centroids = None
+        self.assignment = np.zeros(0, dtype=np.int32)
+        self.trained_size = 0
+        self._pending = []
+        self._occurrences_by_id = {}
+        self._lists = None
+        self._meta = None
+        self._saved = {"vectors": 0, "texts": 0, "occurrences": 0, "assignments": 0}
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @classmethod
+    def load(cls, path, backend=None):
+        """
+        Load an index from `path`, or return an empty one if nothing is saved there yet.
+        With `backend`, the embedding backend of the vectors about to be added: raises ValueError if
+        the index was built with another one, since their embeddings are not comparable.
+        """
+        index = cls(path, backend)
+        if not os.path.exists(index._file("meta.json")):
+            return index
+        with open(index._file("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        stored_backend = meta.get("backend", "torch")
+        if backend and backend != stored_backend:
+            raise ValueError(f"clause index {path} holds {stored_backend} embeddings, not {backend}")
+        index.backend = stored_backend
+        index._meta = meta
+        if meta["vectors"]:
+            index.vectors = np.memmap(index._file("vectors.f32"), dtype=np.float32, mode="r",
+                                      shape=(meta["vectors"], meta["dim"]))
+        index.texts = index._read_lines("texts.jsonl", meta["texts_bytes"])
+        index._add_occurrences(index._read_lines("occurrences.jsonl", meta["occurrences_bytes"]))
+        index.key_to_id = {_paragraph_key(t): i for i, t in enumerate(index.texts)}
+        if meta["generation"]:
+            index.centroids = np.load(index._file(f"centroids-{meta['generation']}.npy"))
+            index.assignment = np.fromfile(index._file(f"assignments-{meta['generation']}.i32"), dtype=np.int32,
+                                           count=meta["assignments"])
+            index.trained_size = meta["trained_size"]
+        index._saved = {"vectors": meta["vectors"], "texts": len(index.texts),
+                        "occurrences": len(index.occurrences), "assignments": len(index.assignment)}
+        return index
+
+    def _read_lines(self, name, size):
+        with open(self._file(name), "rb") as f:
+            data = f.read(size)
+        return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+    def _add_occurrences(self, occurrences):
+        for occurrence in occurrences:
+            self.occurrences.append(occurrence)
+            self._occurrences_by_id.setdefault(occurrence["id"], []).append(occurrence)
+            self.documents.add((occurrence["insured_name"], occurrence["policy_date"], occurrence["source"]))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add_document(self, paragraphs, embeddings, insured_name, policy_date=None, source=None):
+        """
+        Add every paragraph of one policy document, tagged with insured name, date and section.
+        Returns False if this document was already indexed.
+        """
+        doc_key = (insured_name, policy_date, source)
+        if doc_key in self.documents:
+            return False
+
+        embeddings = _normalize(embeddings)
+        section = None
+        occurrences = []
+        for i, (para, emb) in enumerate(zip(paragraphs, embeddings)):
+            section = detect_section(para, section)
+            key = _paragraph_key(para)
+            vec_id = self.key_to_id.get(key)
+            if vec_id is None:
+                vec_id = len(self.texts)
+                self.key_to_id[key] = vec_id
+                self.texts.append(para)
+                self._pending.append(emb)
+            occurrences.append({
+                "id": vec_id,
+                "insured_name": insured_name,
+                "policy_date": policy_date,
+                "section": section,
+                "paragraph_index": i,
+                "source": source,
+            })
+        self._add_occurrences(occurrences)
+        self.documents.add(doc_key)
+        return True
+
+    def _flush_pending(self):
+        if not self._pending:
+            return
+        new = np.vstack(self._pending).astype(np.float32)
+        if len(self.vectors):
+            self.vectors = np.vstack([np.asarray(self.vectors), new])
+        else:
+            self.vectors = new
+        self._pending = []
+
+    def build(self, nlist=None, iterations=10, sample_size=50_000, seed=0):
+        """
+        (Re)train the coarse quantizer and reassign every vector to a cluster.
+        """
+        self._flush_pending()
+        n = len(self.vectors)
+        if n == 0:
+            return
+        vectors = np.asarray(self.vectors)
+        if nlist is None:
+            nlist = int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n))
+
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, size=min(n, sample_size), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            # Empty clusters keep their previous centroid
+            empty = np.bincount(assignment, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+
+        self.centroids = centroids
+        self.trained_size = n
+        self.assignment = self._assign(vectors)
+        self._lists = None
+        self._saved["assignments"] = 0  # every assignment changed: rewrite the file
+
+    def _assign(self, vectors, chunk_size=65_536):
+        assignment = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = np.asarray(vectors[start:start + chunk_size])
+            assignment[start:start + chunk_size] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return assignment
+
+    def _update_assignment(self):
+        """Assign vectors added since the last build to their nearest existing cluster."""
+        if self.centroids is not None and len(self.assignment) < len(self.vectors):
+            self.assignment = np.concatenate([self.assignment, self._assign(self.vectors[len(self.assignment):])])
+            self._lists = None
+
+    def _inverted_lists(self):
+        if self._lists is None:
+            order = np.argsort(self.assignment, kind="stable").astype(np.int64)
+            counts = np.bincount(self.assignment, minlength=len(self.centroids))
+            self._lists = (np.concatenate([[0], np.cumsum(counts)]).astype(np.int64), order)
+        return self._lists
+
+    def _append(self, name, data, committed):
+        """Write `data` at byte offset `committed` of a data file, dropping anything an interrupted save left there."""
+        mode = "r+b" if os.path.exists(self._file(name)) else "wb"
+        with open(self._file(name), mode) as f:
+            f.truncate(committed)
+            f.seek(committed)
+            f.write(data)
+
+    def _replace(self, name, write):
+        """Write a whole file through a uniquely named temporary file, so readers never see it half-written."""
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=name + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, self._file(name))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def save(self):
+        """
+        Append what was added since the last save, retraining the clusters once the index has
+        grown 4x since the last build. Does nothing if nothing was added.
+        """
+        self._flush_pending()
+        if len(self.vectors) and (self.centroids is None or len(self.vectors) >= 4 * self.trained_size):
+            self.build()
+        self._update_assignment()
+        saved = self._saved
+        if (saved["vectors"] == len(self.vectors) and saved["texts"] == len(self.texts) and
+                saved["occurrences"] == len(self.occurrences) and saved["assignments"] == len(self.assignment)):
+            return
+
+        os.makedirs(self.path, exist_ok=True)
+        meta = self._meta or {"dim": 0, "vectors": 0, "texts": 0, "texts_bytes": 0, "occurrences": 0,
+                              "occurrences_bytes": 0, "assignments": 0, "trained_size": 0, "generation": 0}
+        previous_generation = meta["generation"]
+        if self._meta is None:
+            saved = {key: 0 for key in saved}  # first save: write everything
+        meta = dict(meta, dim=int(self.vectors.shape[1]), backend=self.backend or "torch")
+
+        self._append("vectors.f32", np.ascontiguousarray(self.vectors[saved["vectors"]:], dtype=np.float32).tobytes(),
+                     saved["vectors"] * meta["dim"] * 4)
+        for name, items, count_key, bytes_key in (("texts.jsonl", self.texts, "texts", "texts_bytes"),
+                                                  ("occurrences.jsonl", self.occurrences, "occurrences", "occurrences_bytes")):
+            data = "".join(json.dumps(item) + "\n" for item in items[saved[count_key]:]).encode("utf-8")
+            self._append(name, data, meta[bytes_key] if saved[count_key] else 0)
+            meta[bytes_key] = (meta[bytes_key] if saved[count_key] else 0) + len(data)
+            meta[count_key] = len(items)
+        if self.centroids is not None:
+            if saved["assignments"] == 0:
+                # Retrained: the new clusters go to new files, which meta.json switches to atomically
+                meta["generation"] = previous_generation + 1
+                self._replace(f"centroids-{meta['generation']}.npy", lambda f: np.save(f, self.centroids))
+            self._append(f"assignments-{meta['generation']}.i32", self.assignment[saved["assignments"]:].tobytes(),
+                         saved["assignments"] * 4)
+        meta.update(vectors=len(self.vectors), assignments=len(self.assignment), trained_size=self.trained_size)
+        self._replace("meta.json", lambda f: f.write(json.dumps(meta).encode("utf-8")))
+
+        self._meta = meta
+        self._saved = {"vectors": len(self.vectors), "texts": len(self.texts),
+                       "occurrences": len(self.occurrences), "assignments": len(self.assignment)}
+        if meta["generation"] != previous_generation:
+            for name in (f"centroids-{previous_generation}.npy", f"assignments-{previous_generation}.i32"):
+                if os.path.exists(self._file(name)):
+                    os.remove(self._file(name))
+
+    def search(self, query_embedding, k=10, nprobe=8, min_score=0.0):
+        """
+        Return up to k indexed wordings most similar to the query, each with every policy it appears in.
+        """
+        self._flush_pending()
+        if len(self.vectors) == 0:
+            return []
+        query = _normalize(query_embedding)[0]
+
+        self._update_assignment()
+        if self.centroids is None:
+            candidates = np.arange(len(self.vectors))
+        else:
+            list_offsets, list_ids = self._inverted_lists()
+            probe = np.argsort(-(self.centroids @ query))[:nprobe]
+            candidates = np.concatenate([list_ids[list_offsets[c]:list_offsets[c + 1]] for c in probe])
+        if len(candidates) == 0:
+            return []
+
+        candidates = np.sort(candidates)
+        scores = np.asarray(self.vectors[candidates]) @ query
+        top = np.argsort(-scores)[:k]
+
+        results = []
+        for t in top:
+            if scores[t] < min_score:
+                break
+            vec_id = int(candidates[t])
+            results.append({
+                "score": float(scores[t]),
+                "text": self.texts[vec_id],
+                "policies": self._occurrences_by_id.get(vec_id, []),
+            })
+        return results
+
+def index_policy(index, pdf_path, paragraphs, embeddings):
+    """Add one processed policy to the index, tagging it from its file name."""
+    insured_name, policy_date = parse_policy_filename(pdf_path)
+    return index.add_document(paragraphs, embeddings, insured_name, policy_date,
+                              source=os.path.basename(pdf_path))
+
+# Indexes stay loaded between searches (the query model too, see embeddings.load_embedding_model);
+# an index is reloaded when a save changes it
+_loaded_indexes = {}
+
+def open_index(index_path):
+    """The loaded index at `index_path`, shared between queries until its meta.json changes."""
+    meta_file = os.path.join(index_path, "meta.json")
+    version = os.stat(meta_file).st_mtime_ns if os.path.exists(meta_file) else None
+    loaded = _loaded_indexes.get(index_path)
+    if loaded is None or loaded[0] != version:
+        loaded = (version, ClauseIndex.load(index_path))
+        _loaded_indexes[index_path] = loaded
+    return loaded[1]
+
+def search_similar_clauses(index_path, clause_text, model=None, k=10, nprobe=8):
+    """
+    Find which indexed policies contain wording similar to `clause_text`.
+    The query is encoded as the indexed paragraphs were: encode_paragraphs (window-pooled, so long
+    clauses are not truncated) with a model of the backend recorded in the index, unless `model` is given.
+    """
+    from embeddings import load_embedding_model, encode_paragraphs
+    index = open_index(index_path)
+    model = model or load_embedding_model(index.backend or "torch")
+    return index.search(encode_paragraphs(model, [clause_text]), k=k, nprobe=nprobe)
+
+if __name__ == "__main__":
+    import sys
+    index_path = sys.argv[1] if len(sys.argv) > 1 else "clause_index"
+    clause = sys.argv[2] if len(sys.argv) > 2 else "any act of terrorism regardless of any other cause"
+    for result in search_similar_clauses(index_path, clause):
+        policies = ", ".join(f"{p['insured_name']} ({p['policy_date']}, {p['section']})" for p in result["policies"])
+        print(f"{result['score']:.3f}  {result['text'][:80]!r}\n       {policies}")
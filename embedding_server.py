@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger("policy_diff")
+
+SOCKET_ENV = "POLICY_DIFF_EMBEDDING_SOCKET"  # workers encode through the server on this socket when set
+DEFAULT_SOCKET = "/tmp/policy-diff-embeddings.sock"
+
+# Wire format, both directions: 4-byte big-endian length + payload.
+# Request: JSON {"paragraphs": [...]}. Response: JSON {"shape": [n, dim], "backend": ...} or {"error": ...},
+# followed (on success) by the float32 embeddings as raw bytes.
+
+def _send(sock, payload):
+    sock.sendall(struct.pack(">I", len(payload)) + payload)
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("embedding server closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def _recv(sock):
+    (size,) = struct.unpack(">I", _recv_exactly(sock, 4))
+    return _recv_exactly(sock, size)
+
+class RequestCoalescer:
+    """
+    Merge concurrent encode requests into larger batches: the first request waits up to `max_wait`
+    seconds for others, then all of them (up to `max_batch` paragraphs) are encoded together,
+    each distinct paragraph once, and every caller gets its own rows back.
+    """
+
+    def __init__(self, encode, max_batch=512, max_wait=0.005):
+        self.encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = {"requests": 0, "batches": 0, "paragraphs": 0, "encoded": 0}
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, paragraphs):
+        pending = {"paragraphs": paragraphs, "done": threading.Event(), "result": None, "error": None}
+        self._queue.put(pending)
+        pending["done"].wait()
+        if pending["error"] is not None:
+            raise pending["error"]
+        return pending["result"]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0]["paragraphs"])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(pending)
+                size += len(pending["paragraphs"])
+
+            unique = list(dict.fromkeys(p for pending in batch for p in pending["paragraphs"]))
+            try:
+                embeddings = np.asarray(self.encode(unique), dtype=np.float32) if unique else None
+                rows = {p: i for i, p in enumerate(unique)}
+                for pending in batch:
+                    if pending["paragraphs"]:
+                        pending["result"] = embeddings[[rows[p] for p in pending["paragraphs"]]]
+                    else:
+                        pending["result"] = np.zeros((0, 0), dtype=np.float32)
+            except Exception as exc:
+                for pending in batch:
+                    pending["error"] = exc
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["paragraphs"] += size
+            self.stats["encoded"] += len(unique)
+            for pending in batch:
+                pending["done"].set()
+
+class _EncodeHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(_recv(self.request).decode("utf-8"))
+            embeddings = self.server.coalescer.submit(request["paragraphs"])
+        except ConnectionError:
+            return
+        except Exception as exc:
+            _send(self.request, json.dumps({"error": f"{type(exc).__name__}: {exc}"}).encode("utf-8"))
+            return
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        header = {"shape": list(embeddings.shape), "backend": self.server.backend}
+        _send(self.request, json.dumps(header).encode("utf-8"))
+        _send(self.request, embeddings.tobytes())
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    """
+    One process holding the embedding model for every worker on the machine, serving encode
+    requests over a Unix socket. Concurrent requests are coalesced into shared batches.
+    """
+    daemon_threads = True
+    request_queue_size = 256  # many workers connect at once
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, backend="torch", num_threads=None, max_batch=512, max_wait=0.005):
+        from embeddings import load_embedding_model, encode_paragraphs
+        from execution import plan_execution
+
+        # The server shares the node with the workers: by default it takes the embedding share of the
+        # CPUs that their execution plans leave out (see execution.plan_execution)
+        num_threads = num_threads or plan_execution(embedding_server=True).embedding_threads
+        model = load_embedding_model(backend, num_threads=num_threads)
+        self.coalescer = RequestCoalescer(lambda paragraphs: encode_paragraphs(model, paragraphs),
+                                          max_batch=max_batch, max_wait=max_wait)
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        super().__init__(socket_path, _EncodeHandler)
+        self.socket_path = socket_path
+        self.backend = backend
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+class EmbeddingClient:
+    """Encode paragraphs through a running EmbeddingServer; a drop-in for the cascade's encode function."""
+
+    def __init__(self, socket_path=None, timeout=300):
+        self.socket_path = socket_path or os.environ.get(SOCKET_ENV, DEFAULT_SOCKET)
+        self.timeout = timeout
+        self._backend = None
+
+    @property
+    def backend(self):
+        """The server's model backend, from its reply header (asked with an empty request if needed)."""
+        if self._backend is None:
+            self.encode([])
+        return self._backend
+
+    def encode(self, paragraphs):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            _send(sock, json.dumps({"paragraphs": list(paragraphs)}).encode("utf-8"))
+            header = json.loads(_recv(sock).decode("utf-8"))
+            if "error" in header:
+                raise RuntimeError(f"embedding server: {header['error']}")
+            self._backend = header.get("backend", "unknown")
+            return np.frombuffer(_recv(sock), dtype=np.float32).reshape(header["shape"])
+
+    __call__ = encode
+
+def serve(socket_path=DEFAULT_SOCKET, backend="torch", num_threads=None, max_batch=512, max_wait=0.005):
+    server = EmbeddingServer(socket_path, backend, num_threads, max_batch, max_wait)
+    logger.info("Embedding server (%s) listening on %s", backend, socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        logger.info("Embedding server stats: %s", server.coalescer.stats)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Serve paragraph embeddings to all workers on this machine.")
+    parser.add_argument("--socket", default=os.environ.get(SOCKET_ENV, DEFAULT_SOCKET))
+    parser.add_argument("--backend", default="torch", help="torch, onnx or onnx-int8")
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads for the model")
+    parser.add_argument("--max-batch", type=int, default=512, help="paragraphs per coalesced batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="how long a request waits for others")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    serve(args.socket, args.backend, args.threads, args.max_batch, args.max_wait_ms / 1000)
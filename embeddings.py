@@ -0,0 +1,263 @@
+import inspect
+import os
+import time
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+ONNX_DIR = "onnx_models"
+
+# Loaded models, keyed by (backend, model name, quantize, threads), so repeated comparisons reuse them
+_MODELS = {}
+
+def _normalize(embeddings):
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return embeddings / norms
+
+class OnnxEmbeddingModel:
+    """
+    Sentence embedding model run through ONNX Runtime on CPU.
+    Reproduces the SentenceTransformer pipeline (mean pooling + L2 normalization),
+    so its embeddings can be used in place of the PyTorch ones.
+    """
+
+    def __init__(self, model_path, tokenizer_dir, max_seq_length=256, num_threads=None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_dir)
+        self.max_seq_length = max_seq_length
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """Encode a list of sentences into normalized embeddings."""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            batch = sentences[start:start + batch_size]
+            tokens = self.tokenizer(batch, padding=True, truncation=True,
+                                    max_length=self.max_seq_length, return_tensors="np")
+            feed = {name: tokens[name].astype(np.int64) for name in tokens if name in self.input_names}
+            token_embeddings = self.session.run(["last_hidden_state"], feed)[0]
+
+            # Mean pooling over real (non-padding) tokens
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            counts = np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(_normalize(summed / counts))
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.vstack(batches).astype(np.float32)
+
+def export_onnx_model(model_name=MODEL_NAME, output_dir=ONNX_DIR, quantize=False):
+    """
+    Export the transformer behind a SentenceTransformer to ONNX, optionally with dynamic int8 quantization.
+    Returns the path of the .onnx file; existing exports are reused.
+    """
+    model_dir = os.path.join(output_dir, os.path.basename(model_name.rstrip("/")))
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    int8_path = os.path.join(model_dir, "model.int8.onnx")
+
+    if not os.path.exists(fp32_path):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        os.makedirs(model_dir, exist_ok=True)
+        st_model = SentenceTransformer(model_name, device="cpu")
+        transformer = st_model[0].auto_model.eval()
+        tokenizer = st_model.tokenizer
+        tokenizer.save_pretrained(model_dir)
+
+        dummy = tokenizer(["Policy limit: $10,000,000"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in dummy]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        # Newer torch defaults to the dynamo exporter, which needs onnxscript; the classic one is enough here
+        export_kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        class _Wrapper(torch.nn.Module):
+            # Positional inputs -> keyword call, since forward() signatures differ across transformers versions
+            def __init__(self, inner):
+                super().__init__()
+                self.inner = inner
+
+            def forward(self, *inputs):
+                return self.inner(**dict(zip(input_names, inputs))).last_hidden_state
+
+        with torch.no_grad():
+            torch.onnx.export(_Wrapper(transformer), tuple(dummy[name] for name in input_names), fp32_path,
+                              input_names=input_names, output_names=["last_hidden_state"],
+                              dynamic_axes=dynamic_axes, opset_version=14, **export_kwargs)
+
+    if not quantize:
+        return fp32_path
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+def load_embedding_model(backend="torch", model_name=MODEL_NAME, quantize=False, num_threads=None):
+    """
+    Load the paragraph embedding model.
+    - backend: "torch" (SentenceTransformer), "onnx" (ONNX Runtime, CPU) or "onnx-int8"
+    - quantize: use a dynamically int8-quantized ONNX model (onnx backend only)
+    - num_threads: intra-op threads for this worker (None keeps the library default)
+    """
+    if backend == "onnx-int8":
+        backend, quantize = "onnx", True
+    key = (backend, model_name, quantize, num_threads)
+    if key in _MODELS:
+        return _MODELS[key]
+
+    if backend == "torch":
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        model = SentenceTransformer(model_name, device="cpu")
+    elif backend == "onnx":
+        model_path = export_onnx_model(model_name, quantize=quantize)
+        model = OnnxEmbeddingModel(model_path, os.path.dirname(model_path), num_threads=num_threads)
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend!r} (expected 'torch' or 'onnx')")
+
+    _MODELS[key] = model
+    return model
+
+def _split_into_windows(text, offsets, window, stride):
+    """Split an over-length paragraph into overlapping token windows, sliced from the original text."""
+    pieces = []
+    start = 0
+    while True:
+        end = min(start + window, len(offsets))
+        pieces.append((text[offsets[start][0]:offsets[end - 1][1]], end - start))
+        if end == len(offsets):
+            return pieces
+        start += stride
+
+def encode_paragraphs(model, paragraphs, token_budget=8192, max_batch_size=128, window_overlap=32):
+    """
+    Encode paragraphs with length-bucketed batches and no silent truncation.
+    - Paragraphs are sorted by token count and packed into batches whose padded size
+      (batch size x longest paragraph) stays within `token_budget`, so short table rows
+      are not padded out to the length of page-long clauses.
+    - Paragraphs longer than the model's window are split into overlapping windows whose
+      embeddings are averaged (weighted by token count), so the whole clause is compared.
+    Returns embeddings in the original paragraph order.
+    """
+    if not paragraphs:
+        return np.zeros((0, 0), dtype=np.float32)
+    tokenizer = model.tokenizer
+    max_len = model.max_seq_length
+    window = max_len - 2  # room for [CLS] and [SEP]
+    stride = max(1, window - window_overlap)
+
+    tokens = tokenizer(list(paragraphs), add_special_tokens=False, truncation=False,
+                       return_offsets_mapping=True, verbose=False)
+    pieces = []  # (paragraph index, text, token count)
+    for i, (para, offsets) in enumerate(zip(paragraphs, tokens["offset_mapping"])):
+        if len(offsets) <= window:
+            pieces.append((i, para, len(offsets)))
+        else:
+            pieces.extend((i, text, n) for text, n in _split_into_windows(para, offsets, window, stride))
+
+    # Bucket by length: consecutive pieces in sorted order have similar lengths
+    order = sorted(range(len(pieces)), key=lambda k: pieces[k][2])
+    batches = []
+    batch = []
+    for k in order:
+        padded_len = pieces[k][2] + 2
+        if batch and ((len(batch) + 1) * padded_len > token_budget or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch = []
+        batch.append(k)
+    if batch:
+        batches.append(batch)
+
+    piece_embeddings = [None] * len(pieces)
+    for batch in batches:
+        encoded = np.asarray(model.encode([pieces[k][1] for k in batch], batch_size=len(batch)),
+                             dtype=np.float32)
+        for k, emb in zip(batch, encoded):
+            piece_embeddings[k] = emb
+
+    # Pool windows back into one embedding per paragraph
+    dim = len(piece_embeddings[0])
+    pooled = np.zeros((len(paragraphs), dim), dtype=np.float32)
+    weights = np.zeros(len(paragraphs), dtype=np.float32)
+    for (i, _, n), emb in zip(pieces, piece_embeddings):
+        pooled[i] += emb * max(n, 1)
+        weights[i] += max(n, 1)
+    pooled /= weights[:, None]
+    return _normalize(pooled)
+
+def check_backend_parity(pdf_dir, backend="onnx", quantize=True, num_threads=None, min_similarity=0.99):
+    """
+    Compare embeddings from an alternative backend against the PyTorch ones on every PDF in `pdf_dir`.
+    Reports cosine agreement, best-match agreement and encode time for both backends.
+    """
+    from main import extract_ocr_text_from_pdf, smart_split_into_paragraphs, clean_text_for_comparison
+
+    reference = load_embedding_model("torch", num_threads=num_threads)
+    candidate = load_embedding_model(backend, quantize=quantize, num_threads=num_threads)
+
+    similarities = []
+    reference_time = candidate_time = 0.0
+    matches_agree = matches_total = 0
+    for filename in sorted(os.listdir(pdf_dir)):
+        if not filename.endswith(".pdf"):
+            continue
+        text = extract_ocr_text_from_pdf(os.path.join(pdf_dir, filename))
+        paragraphs = smart_split_into_paragraphs(clean_text_for_comparison(text))
+        if not paragraphs:
+            continue
+
+        # Encoded as production encodes them (bucketed batches, long paragraphs window-pooled)
+        start = time.perf_counter()
+        ref = encode_paragraphs(reference, paragraphs)
+        reference_time += time.perf_counter() - start
+        start = time.perf_counter()
+        cand = encode_paragraphs(candidate, paragraphs)
+        candidate_time += time.perf_counter() - start
+
+        similarities.extend((ref * cand).sum(axis=1))
+        # Nearest-neighbour decisions within the document should not change (a paragraph needs a neighbour)
+        if len(paragraphs) < 2:
+            continue
+        matches_agree += int((np.argsort(-(ref @ ref.T), axis=1)[:, 1] ==
+                              np.argsort(-(cand @ cand.T), axis=1)[:, 1]).sum())
+        matches_total += len(paragraphs)
+
+    if not similarities:
+        print("No paragraphs processed. Check the PDF directory.")
+        return None
+
+    similarities = np.asarray(similarities)
+    report = {
+        "paragraphs": len(similarities),
+        "mean_cosine": float(similarities.mean()),
+        "min_cosine": float(similarities.min()),
+        "share_above_threshold": float((similarities >= min_similarity).mean()),
+        "nearest_neighbour_agreement": matches_agree / matches_total if matches_total else None,
+        "torch_seconds": reference_time,
+        f"{backend}_seconds": candidate_time,
+        "speedup": reference_time / candidate_time if candidate_time else None,
+    }
+    print(f"\nEmbedding parity: torch vs {backend}{' (int8)' if quantize else ''} "
+          f"({report['paragraphs']} paragraphs)\n")
+    print(f"Mean cosine:        {report['mean_cosine']:.4f}")
+    print(f"Min cosine:         {report['min_cosine']:.4f}")
+    print(f"Cosine >= {min_similarity}:     {report['share_above_threshold']:.2%}")
+    if matches_total:
+        print(f"NN agreement:       {report['nearest_neighbour_agreement']:.2%}")
+    print(f"Encode time:        torch {reference_time:.2f}s, {backend} {candidate_time:.2f}s")
+    return report
+
+if __name__ == "__main__":
+    check_backend_parity("ANNOTATED-POLICIES/EXPIRING", backend="onnx", quantize=True)
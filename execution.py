@@ -0,0 +1,118 @@
+import logging
+import math
+import os
+import sys
+from embedding_server import SOCKET_ENV as EMBEDDING_SOCKET_ENV
+
+logger = logging.getLogger("policy_diff")
+
+# The one knob: worker processes x threads per worker (defaults: 1 worker, all available CPUs)
+WORKERS_ENV = "POLICY_DIFF_WORKERS"
+THREADS_ENV = "POLICY_DIFF_THREADS"
+
+def cgroup_cpu_limit():
+    """CPU quota of this container (cgroup v2 cpu.max or v1 cfs quota) in CPUs, or None when unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+def available_cpus():
+    """CPUs this process may actually use: its affinity mask, capped by the cgroup quota."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    limit = cgroup_cpu_limit()
+    if limit:
+        cpus = min(cpus, max(1, math.floor(limit)))
+    return cpus
+
+class ExecutionPlan:
+    """
+    Thread budgets for one worker process, so tesseract, torch and the tokenizer do not
+    oversubscribe the CPUs between them:
+    - torch_threads: intra-op threads of the embedding model. By default the cascade encodes after
+      extraction, so OCR and encoding each get the whole budget; with eager encoding (see overlapping)
+      they run at the same time and torch gets half of it
+    - ocr_workers: tesseract processes run in parallel (pipeline OCR pool), each limited to one
+      OpenMP thread (OMP_THREAD_LIMIT=1), since parallelism comes from running several pages at once;
+      when encoding overlaps, they get what torch leaves
+    - embedding_threads: threads of the embedding server (embedding_server.py) when the workers encode
+      through it. It runs on the same node, so its threads are taken out of the CPUs before they are
+      split between the workers, and the workers keep no torch budget of their own
+    - tokenizers_parallelism: only in a single-worker process; forked workers must not inherit it
+    """
+
+    def __init__(self, workers, threads, cpus, embedding_threads=0, overlap_encode=False):
+        self.workers = workers
+        self.threads = threads
+        self.cpus = cpus
+        self.embedding_threads = embedding_threads
+        self.overlap_encode = overlap_encode
+        self.omp_thread_limit = 1
+        if embedding_threads:
+            self.torch_threads = 1
+            self.ocr_workers = threads
+        elif overlap_encode:
+            self.torch_threads = max(1, threads // 2)
+            self.ocr_workers = max(1, threads - self.torch_threads)
+        else:
+            self.torch_threads = threads
+            self.ocr_workers = threads
+        self.tokenizers_parallelism = workers == 1 and threads > 1 and not embedding_threads
+
+    def overlapping(self):
+        """This plan for a run that encodes while pages are still in OCR (eager encoding): the budget is split."""
+        return ExecutionPlan(self.workers, self.threads, self.cpus, self.embedding_threads, overlap_encode=True)
+
+    def to_dict(self):
+        return dict(vars(self))
+
+def plan_execution(workers=None, threads=None, embedding_server=None):
+    """
+    Split the available CPUs into `workers` processes x `threads` threads (from the environment if not given).
+    With `embedding_server` (default: when POLICY_DIFF_EMBEDDING_SOCKET is set), half the CPUs are
+    left to the embedding server and the workers split the other half.
+    """
+    cpus = available_cpus()
+    if embedding_server is None:
+        embedding_server = bool(os.environ.get(EMBEDDING_SOCKET_ENV))
+    embedding_threads = max(1, cpus // 2) if embedding_server else 0
+    worker_cpus = max(1, cpus - embedding_threads)
+    workers = max(1, min(int(workers or os.environ.get(WORKERS_ENV) or 1), worker_cpus))
+    threads = max(1, int(threads or os.environ.get(THREADS_ENV) or worker_cpus // workers))
+    return ExecutionPlan(workers, threads, cpus, embedding_threads)
+
+_current = None
+
+def configure(workers=None, threads=None):
+    """
+    Plan and apply thread budgets for this process. The knob is also exported to the environment,
+    so worker processes (and the tesseract processes they spawn) inherit the same plan.
+    """
+    global _current
+    plan = plan_execution(workers, threads)
+    os.environ[WORKERS_ENV] = str(plan.workers)
+    os.environ[THREADS_ENV] = str(plan.threads)
+    os.environ["OMP_THREAD_LIMIT"] = str(plan.omp_thread_limit)
+    os.environ["TOKENIZERS_PARALLELISM"] = "true" if plan.tokenizers_parallelism else "false"
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(plan.torch_threads)
+    _current = plan
+    logger.debug("Execution plan: %s", plan.to_dict())
+    return plan
+
+def current_plan():
+    """
+    The plan configured for this process, or one computed from the environment. Computing it applies
+    and exports nothing: only an entry point's configure() changes the environment.
+    """
+    return _current or plan_execution()
@@ -1,14 +1,14 @@
 import random
 import calendar
+import copy
+import difflib
+import json
+import re
+import shutil
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 import os
-from reportlab.platypus import PageBreak
+from concurrent.futures import ProcessPoolExecutor
 
 # Fictional company names
 def reset_insured_names():
@@ -49,12 +49,13 @@ def reset_insured_names():
     ]
 
 
-def choose_sublimit(options, policy_limit, parent_limit=None):
+def choose_sublimit(options, policy_limit, parent_limit=None, rng=random):
     """
     Choose a sublimit option from a list of options
     - options: list containing numeric values (int or float) or strings (e.g. "Policy Limit")
     - policy_limit: overall policy limit (int)
     - parent_limit: if provided, also require option <= parent_limit (for interdependent sublimits)
+    - rng: random source (module-level random by default)
     Returns the chosen option.
     """
     valid_options = []
@@ -68,382 +69,410 @@ def choose_sublimit(options, policy_limit, parent_limit=None):
     if not valid_options:
         # Fallback: if no option qualifies, simply use the policy limit.
         return policy_limit
-    return random.choice(valid_options)
+    return rng.choice(valid_options)
 
-def choose_deductible(range_min, range_max, bias_min, bias_max, bias_probability=0.8):
+def choose_deductible(range_min, range_max, bias_min, bias_max, bias_probability=0.8, rng=random):
     """
     Choose a deductible value with a bias toward the specified range.
     Values are in dollars -> result is rounded to the nearest thousand.
     """
-    if random.random() < bias_probability:
-        value = random.uniform(bias_min, bias_max)
+    if rng.random() < bias_probability:
+        value = rng.uniform(bias_min, bias_max)
     else:
-        value = random.uniform(range_min, range_max)
+        value = rng.uniform(range_min, range_max)
     return round(value / 1000) * 1000
 
-def choose_sir(range_min, range_max, bias_min, bias_max, bias_probability=0.8):
+def choose_sir(range_min, range_max, bias_min, bias_max, bias_probability=0.8, rng=random):
     """
     Choose a SIR value with bias, rounded to the nearest thousand.
     """
-    if random.random() < bias_probability:
-        value = random.uniform(bias_min, bias_max)
+    if rng.random() < bias_probability:
+        value = rng.uniform(bias_min, bias_max)
     else:
-        value = random.uniform(range_min, range_max)
+        value = rng.uniform(range_min, range_max)
     return round(value / 1000) * 1000
 
-def generate_policy_data(policy_id, insured_name, override_inception_date=None, is_renewal=False):
-    """Generate single policy data with randomized sublimits, deductibles, SIR, and dates.
-       If override_inception_date is provided, it is used as the inception date."""
-    # Exclusion clause options
-    TERRORISM_EXCLUSIONS = [
-        """<b>Terrorism Exclusion Endorsement (NMA2920)</b><br/>
-        Notwithstanding any provision to the contrary within this
-        insurance or any endorsement thereto it is agreed that this
-        insurance excludes loss, damage, cost or expense of whatsoever
-        nature directly or indirectly caused by, resulting from or in
-        connection with any act of terrorism regardless of any other
-        cause or event contributing concurrently or in any other
-        sequence to the loss.
-
-        For the purpose of this endorsement an act of terrorism means
-        an act, including but not limited to the use of force or
-        violence and/or the threat thereof, of any person or group(s)
-        of persons, whether acting alone or on behalf of or in
-        connection with any organisation(s) or government(s),
-        committed for political, religious, ideological or similar
-        purposes including the intention to influence any government
-        and/or to put the public, or any section of the public, in
-        fear.
-
-        This endorsement also excludes loss, damage, cost or expense
-        of whatsoever nature directly or indirectly caused by,
-        resulting from or in connection with any action taken in
-        controlling, preventing, suppressing or in any way relating to
-        any act of terrorism.
-
-        If the Underwriters allege that by reason of this exclusion,
-        any loss, damage, cost or expense is not covered by this
-        insurance the burden of proving the contrary shall be upon the
-        Assured.
-
-        In the event any portion of this endorsement is found to be
-        invalid or unenforceable, the remainder shall remain in full
-        force and effect.
-        """,
-
-        """<b>Terrorism Exclusion Endorsement (NMA2921)</b><br/>
-        Notwithstanding any provision to the contrary within this Policy or any endorsement thereto, it is agreed that this Policy
-        excludes loss, damage, cost or expense of whatsoever nature directly or indirectly caused by, resulting from or in
-        connection with any act of terrorism regardless of any other cause or event contributing concurrently or in any other
-        sequence to the loss.
-        For the purpose of this endorsement an act of terrorism means an act, including but not limited to the use of force or
-        violence and/or the threat thereof, of any person or group(s) of persons, whether acting alone or on behalf of or in
-        connection with any organization(s) or government(s), committed for political, religious, ideological or similar purposed
-        including the intention to influence any government and/or to put the public, or any section of the public, in fear.
-        This endorsement also excludes loss, damage, cost or expense of whatsoever nature directly or indirectly caused by,
-        resulting from or in connection with any action taken in controlling, preventing, suppressing or in any way relating to any
-        act of terrorism.
-        If the Insurers allege that by reason of this exclusion, any loss, damage, cost or expense is not covered by this Policy the
-        burden of proving the contrary shall be upon the Insured.
-        In the event any portion of this endorsement is found invalid or unenforceable, the remainder shall remain in full force and
-        Effect.
-        """,
-
-        """<b>Terrorism Exclusion Endorsement (NMA2918)</b><br/>
-        Notwithstanding any provision to the contrary within this insurance or any
-        endorsement thereto it is agreed that this insurance excludes loss, damage, cost or
-        expense of whatsoever nature directly or indirectly caused by, resulting from or in
-        connection with any of the following regardless of any other cause or event
-        contributing concurrently or in any other sequence to the loss;
-        1. war, invasion, acts of foreign enemies, hostilities or warlike operations (whether
-        war be declared or not), civil war, rebellion, revolution, insurrection, civil
-        commotion assuming the proportions of or amounting to an uprising, military or
-        usurped power; or
-        2. any act of terrorism.
-        For the purpose of this endorsement an act of terrorism means an act, including
-        but not limited to the use of force or violence and/or the threat thereof, of any
-        person or group(s) of persons, whether acting alone or on behalf of or in
-        connection with any organisation(s) or government(s), committed for political,
-        religious, ideological or similar purposes including the intention to influence any
-        government and/or to put the public, or any section of the public, in fear.
-        This endorsement also excludes loss, damage, cost or expense of whatsoever
-        nature directly or indirectly caused by, resulting from or in connection with any action
-        taken in controlling, preventing, suppressing or in any way relating to 1 and/or 2
-        above.
-        If the Underwriters allege that by reason of this exclusion, any loss, damage, cost or
-        expense is not covered by this insurance the burden of proving the contrary shall be
-        upon the Assured.
-        In the event any portion of this endorsement is found to be invalid or unenforceable,
-        the remainder shall remain in full force and effect.
-        """,
-
-        """<b>Terrorism Exclusion Endorsement (NMA2919)</b><br/>
-        Notwithstanding any provision to the contrary within this reinsurance or any endorsement thereto it is
-        agreed that this reinsurance excludes loss, damage, cost or expense of whatsoever nature directly or
-        indirectly caused by, resulting from or in connection with any of the following regardless of any other
-        cause or event contributing concurrently or in any other sequence to the loss;
-        (1) war, invasion, acts of foreign enemies, hostilities or warlike operations (whether war be declared or
-        not), civil war, rebellion, revolution, insurrection, civil commotion assuming the proportions of or
-        amounting to an uprising, military or usurped power; or
-        (2) any act of terrorism.
-        For the purpose of this exclusion, an act of terrorism means an activity, including the threat of an activity
-        or the preparation for an activity, whether violent or nonviolent, that appears to be intended to
-        (i) intimidate, coerce, or retaliate against any segment of the civilian population, or (ii) disrupt any
-        segment of the economy, or (iii) influence the policy of a government by intimidation, coercion, or
-        retaliation, or (iv) advance a political, religious, ideological, or ethnic cause.
-        This endorsement also excludes loss, damage, cost or expense of whatsoever nature directly or
-        indirectly caused by, resulting from or in connection with any action taken in controlling, preventing,
-        suppressing or in any way relating to (1) and/or (2) above.
-        In the event any portion of this endorsement is found to be invalid or unenforceable, the remainder
-        shall remain in full force and effect.
-        """,
-
-        """<b>War & Civil War Exclusion Clause (NMA 464)</b><br/>
-        Notwithstanding anything to the contrary contained herein this Policy does not cover Loss or Damage directly or indirectly occasioned by, happening through or in consequence of war, invasion, acts of foreign enemies, hostilities (whether war be declared or not), civil war, rebellion, revolution, insurrection, military or usurped power or confiscation or nationalism or requisition or destruction of or damage to property by or under the order of any government or public or local authority.
-        """
+# Exclusion clause options
+TERRORISM_EXCLUSIONS = [
+    """<b>Terrorism Exclusion Endorsement (NMA2920)</b><br/>
+    Notwithstanding any provision to the contrary within this
+    insurance or any endorsement thereto it is agreed that this
+    insurance excludes loss, damage, cost or expense of whatsoever
+    nature directly or indirectly caused by, resulting from or in
+    connection with any act of terrorism regardless of any other
+    cause or event contributing concurrently or in any other
+    sequence to the loss.
+
+    For the purpose of this endorsement an act of terrorism means
+    an act, including but not limited to the use of force or
+    violence and/or the threat thereof, of any person or group(s)
+    of persons, whether acting alone or on behalf of or in
+    connection with any organisation(s) or government(s),
+    committed for political, religious, ideological or similar
+    purposes including the intention to influence any government
+    and/or to put the public, or any section of the public, in
+    fear.
+
+    This endorsement also excludes loss, damage, cost or expense
+    of whatsoever nature directly or indirectly caused by,
+    resulting from or in connection with any action taken in
+    controlling, preventing, suppressing or in any way relating to
+    any act of terrorism.
+
+    If the Underwriters allege that by reason of this exclusion,
+    any loss, damage, cost or expense is not covered by this
+    insurance the burden of proving the contrary shall be upon the
+    Assured.
+
+    In the event any portion of this endorsement is found to be
+    invalid or unenforceable, the remainder shall remain in full
+    force and effect.
+    """,
+
+    """<b>Terrorism Exclusion Endorsement (NMA2921)</b><br/>
+    Notwithstanding any provision to the contrary within this Policy or any endorsement thereto, it is agreed that this Policy
+    excludes loss, damage, cost or expense of whatsoever nature directly or indirectly caused by, resulting from or in
+    connection with any act of terrorism regardless of any other cause or event contributing concurrently or in any other
+    sequence to the loss.
+    For the purpose of this endorsement an act of terrorism means an act, including but not limited to the use of force or
+    violence and/or the threat thereof, of any person or group(s) of persons, whether acting alone or on behalf of or in
+    connection with any organization(s) or government(s), committed for political, religious, ideological or similar purposed
+    including the intention to influence any government and/or to put the public, or any section of the public, in fear.
+    This endorsement also excludes loss, damage, cost or expense of whatsoever nature directly or indirectly caused by,
+    resulting from or in connection with any action taken in controlling, preventing, suppressing or in any way relating to any
+    act of terrorism.
+    If the Insurers allege that by reason of this exclusion, any loss, damage, cost or expense is not covered by this Policy the
+    burden of proving the contrary shall be upon the Insured.
+    In the event any portion of this endorsement is found invalid or unenforceable, the remainder shall remain in full force and
+    Effect.
+    """,
+
+    """<b>Terrorism Exclusion Endorsement (NMA2918)</b><br/>
+    Notwithstanding any provision to the contrary within this insurance or any
+    endorsement thereto it is agreed that this insurance excludes loss, damage, cost or
+    expense of whatsoever nature directly or indirectly caused by, resulting from or in
+    connection with any of the following regardless of any other cause or event
+    contributing concurrently or in any other sequence to the loss;
+    1. war, invasion, acts of foreign enemies, hostilities or warlike operations (whether
+    war be declared or not), civil war, rebellion, revolution, insurrection, civil
+    commotion assuming the proportions of or amounting to an uprising, military or
+    usurped power; or
+    2. any act of terrorism.
+    For the purpose of this endorsement an act of terrorism means an act, including
+    but not limited to the use of force or violence and/or the threat thereof, of any
+    person or group(s) of persons, whether acting alone or on behalf of or in
+    connection with any organisation(s) or government(s), committed for political,
+    religious, ideological or similar purposes including the intention to influence any
+    government and/or to put the public, or any section of the public, in fear.
+    This endorsement also excludes loss, damage, cost or expense of whatsoever
+    nature directly or indirectly caused by, resulting from or in connection with any action
+    taken in controlling, preventing, suppressing or in any way relating to 1 and/or 2
+    above.
+    If the Underwriters allege that by reason of this exclusion, any loss, damage, cost or
+    expense is not covered by this insurance the burden of proving the contrary shall be
+    upon the Assured.
+    In the event any portion of this endorsement is found to be invalid or unenforceable,
+    the remainder shall remain in full force and effect.
+    """,
+
+    """<b>Terrorism Exclusion Endorsement (NMA2919)</b><br/>
+    Notwithstanding any provision to the contrary within this reinsurance or any endorsement thereto it is
+    agreed that this reinsurance excludes loss, damage, cost or expense of whatsoever nature directly or
+    indirectly caused by, resulting from or in connection with any of the following regardless of any other
+    cause or event contributing concurrently or in any other sequence to the loss;
+    (1) war, invasion, acts of foreign enemies, hostilities or warlike operations (whether war be declared or
+    not), civil war, rebellion, revolution, insurrection, civil commotion assuming the proportions of or
+    amounting to an uprising, military or usurped power; or
+    (2) any act of terrorism.
+    For the purpose of this exclusion, an act of terrorism means an activity, including the threat of an activity
+    or the preparation for an activity, whether violent or nonviolent, that appears to be intended to
+    (i) intimidate, coerce, or retaliate against any segment of the civilian population, or (ii) disrupt any
+    segment of the economy, or (iii) influence the policy of a government by intimidation, coercion, or
+    retaliation, or (iv) advance a political, religious, ideological, or ethnic cause.
+    This endorsement also excludes loss, damage, cost or expense of whatsoever nature directly or
+    indirectly caused by, resulting from or in connection with any action taken in controlling, preventing,
+    suppressing or in any way relating to (1) and/or (2) above.
+    In the event any portion of this endorsement is found to be invalid or unenforceable, the remainder
+    shall remain in full force and effect.
+    """,
+
+    """<b>War & Civil War Exclusion Clause (NMA 464)</b><br/>
+    Notwithstanding anything to the contrary contained herein this Policy does not cover Loss or Damage directly or indirectly occasioned by, happening through or in consequence of war, invasion, acts of foreign enemies, hostilities (whether war be declared or not), civil war, rebellion, revolution, insurrection, military or usurped power or confiscation or nationalism or requisition or destruction of or damage to property by or under the order of any government or public or local authority.
+    """
 ]
-    
-    NUCLEAR_EXCLUSIONS = [
-        'NMA 1975A Nuclear Energy Risk Exclusion', 
-        'CL 370 Institute Radioactive Contamination, Chemical, Biological, Bio-Chemical, and Electromagnetic Weapons Exclusion Clause',
-        'Excluded',
-        'Included'
-    ]
-    COMMUNICABLE_DISEASE_EXCLUSIONS = [
-        """<b>Communicable Disease Exclusion (LMA5394)</b><br/>
-        1. Notwithstanding any provision to the contrary within this reinsurance agreement, this reinsurance
-        agreement excludes any loss, damage, liability, claim, cost or expense of whatsoever nature,
-        directly or indirectly caused by, contributed to by, resulting from, arising out of, or in connection
-        with a Communicable Disease or the fear or threat (whether actual or perceived) of a
-        Communicable Disease regardless of any other cause or event contributing concurrently or in any
-        other sequence thereto.
-        2. As used herein, a Communicable Disease means any disease which can be transmitted by means of
-        any substance or agent from any organism to another organism where:
-        2.1. the substance or agent includes, but is not limited to, a virus, bacterium, parasite or other
-        organism or any variation thereof, whether deemed living or not, and
-        2.2. the method of transmission, whether direct or indirect, includes but is not limited to,
-        airborne transmission, bodily fluid transmission, transmission from or to any surface or
-        object, solid, liquid or gas or between organisms, and
-        2.3. the disease, substance or agent can cause or threaten damage to human health or human
-        welfare or can cause or threaten damage to, deterioration of, loss of value of, marketability
-        of or loss of use of property.
-        """,
-
-        """<b>Communicable Disease Endorsement (LMA5393)</b><br/>
-        1. This policy, subject to all applicable terms, conditions and exclusions, covers losses attributable
-        to direct physical loss or physical damage occurring during the period of insurance. Consequently
-        and notwithstanding any other provision of this policy to the contrary, this policy does not insure
-        any loss, damage, claim, cost, expense or other sum, directly or indirectly arising out of,
-        attributable to, or occurring concurrently or in any sequence with a Communicable Disease or the
-        fear or threat (whether actual or perceived) of a Communicable Disease.
-        2. For the purposes of this endorsement, loss, damage, claim, cost, expense or other sum, includes,
-        but is not limited to, any cost to clean-up, detoxify, remove, monitor or test:
-        2.1. for a Communicable Disease, or
-        2.2. any property insured hereunder that is affected by such Communicable Disease.
-        3. As used herein, a Communicable Disease means any disease which can be transmitted by means of
-        any substance or agent from any organism to another organism where:
-        3.1. the substance or agent includes, but is not limited to, a virus, bacterium, parasite or other
-        organism or any variation thereof, whether deemed living or not, and
-        3.2. the method of transmission, whether direct or indirect, includes but is not limited to,
-        airborne transmission, bodily fluid transmission, transmission from or to any surface or
-        object, solid, liquid or gas or between organisms, and
-        3.3. the disease, substance or agent can cause or threaten damage to human health or human
-        welfare or can cause or threaten damage to, deterioration of, loss of value of, marketability
-        of or loss of use of property insured hereunder.
-        4. This endorsement applies to all coverage extensions, additional coverages, exceptions to any
-        exclusion and other coverage grant(s).
-        All other terms, conditions and exclusions of the policy remain the same.
-        """,
-        'Excluded',
-        'Included'
-    ]
-    SANCTIONS_LIMITATIONS = [
-        'LMA 3100 Sanctions Limitation & Exclusion Clause',
-        'LMA 3100A Sanctions Limitation & Exclusion Clause',
-        'Excluded',
-        'Included'
-    ]
-    CYBER_EXCLUSIONS = [
-        """<b>Cyber Exclusion Clause (LMA5401)</b><br/>
-        1 Notwithstanding any provision to the contrary within this Policy or any endorsement thereto
-        this Policy excludes any:
-        1.1 Cyber Loss;
-        1.2 loss, damage, liability, claim, cost, expense of whatsoever nature directly or indirectly
-        caused by, contributed to by, resulting from, arising out of or in connection with any
-        loss of use, reduction in functionality, repair, replacement, restoration or reproduction
-        of any Data, including any amount pertaining to the value of such Data;
-        regardless of any other cause or event contributing concurrently or in any other sequence
-        thereto.
-        2 In the event any portion of this endorsement is found to be invalid or unenforceable, the
-        remainder shall remain in full force and effect.
-        3 This endorsement supersedes and, if in conflict with any other wording in the Policy or any
-        endorsement thereto having a bearing on Cyber Loss or Data, replaces that wording.
-        Definitions
-        4 Cyber Loss means any loss, damage, liability, claim, cost or expense of whatsoever nature
-        directly or indirectly caused by, contributed to by, resulting from, arising out of or in
-        connection with any Cyber Act or Cyber Incident including, but not limited to, any action
-        taken in controlling, preventing, suppressing or remediating any Cyber Act or Cyber Incident.
-        5 Cyber Act means an unauthorised, malicious or criminal act or series of related unauthorised,
-        malicious or criminal acts, regardless of time and place, or the threat or hoax thereof
-        involving access to, processing of, use of or operation of any Computer System.
-        6 Cyber Incident means:
-        6.1 any error or omission or series of related errors or omissions involving access to,
-        processing of, use of or operation of any Computer System; or
-        6.2 any partial or total unavailability or failure or series of related partial or total
-        unavailability or failures to access, process, use or operate any Computer System.
-        7 Computer System means:
-        7.1 any computer, hardware, software, communications system, electronic device
-        (including, but not limited to, smart phone, laptop, tablet, wearable device), server,
-        cloud or microcontroller including any similar system or any configuration of the
-        aforementioned and including any associated input, output, data storage device,
-        networking equipment or back up facility,
-        owned or operated by the Insured or any other party.
-        8 Data means information, facts, concepts, code or any other information of any kind that is
-        recorded or transmitted in a form to be used, accessed, processed, transmitted or stored by
-        a Computer System.
-        """,
-        
-        """<b>Cyber Exclusion Clause (LMA5400)</b><br/>
-        1 Notwithstanding any provision to the contrary within this Policy or any endorsement thereto
-        this Policy excludes any:
-        1.1 Cyber Loss, unless subject to the provisions of paragraph 2;
-        1.2 loss, damage, liability, claim, cost, expense of whatsoever nature directly or indirectly
-        caused by, contributed to by, resulting from, arising out of or in connection with any
-        loss of use, reduction in functionality, repair, replacement, restoration or reproduction
-        of any Data, including any amount pertaining to the value of such Data, unless subject
-        to the provisions of paragraph 3;
-        regardless of any other cause or event contributing concurrently or in any other sequence
-        thereto.
-        2 Subject to all the terms, conditions, limitations and exclusions of this Policy or any
-        endorsement thereto, this Policy covers physical loss or physical damage to property insured
-        under this Policy caused by any ensuing fire or explosion which directly results from a Cyber
-        Incident, unless that Cyber Incident is caused by, contributed to by, resulting from, arising
-        out of or in connection with a Cyber Act including, but not limited to, any action taken in
-        controlling, preventing, suppressing or remediating any Cyber Act.
-        3 Subject to all the terms, conditions, limitations and exclusions of this Policy or any
-        endorsement thereto, should Data Processing Media owned or operated by the Insured suffer
-        physical loss or physical damage insured by this Policy, then this Policy will cover the cost to
-        repair or replace the Data Processing Media itself plus the costs of copying the Data from
-        back-up or from originals of a previous generation. These costs will not include research and
-        engineering nor any costs of recreating, gathering or assembling the Data. If such media is
-        not repaired, replaced or restored the basis of valuation shall be the cost of the blank Data
-        Processing Media. However, this Policy excludes any amount pertaining to the value of such
-        Data, to the Insured or any other party, even if such Data cannot be recreated, gathered or
-        assembled.
-        4 In the event any portion of this endorsement is found to be invalid or unenforceable, the
-        remainder shall remain in full force and effect.
-        5 This endorsement supersedes and, if in conflict with any other wording in the Policy or any
-        endorsement thereto having a bearing on Cyber Loss, Data or Data Processing Media, replaces
-        that wording.
-        Definitions
-        6 Cyber Loss means any loss, damage, liability, claim, cost or expense of whatsoever nature
-        directly or indirectly caused by, contributed to by, resulting from, arising out of or in
-        connection with any Cyber Act or Cyber Incident including, but not limited to, any action
-        taken in controlling, preventing, suppressing or remediating any Cyber Act or Cyber Incident.
-        7 Cyber Act means an unauthorised, malicious or criminal act or series of related unauthorised,
-        malicious or criminal acts, regardless of time and place, or the threat or hoax thereof
-        involving access to, processing of, use of or operation of any Computer System.
-        8 Cyber Incident means:
-        8.1 any error or omission or series of related errors or omissions involving access to,
-        processing of, use of or operation of any Computer System; or
-        8.2 any partial or total unavailability or failure or series of related partial or total
-        unavailability or failures to access, process, use or operate any Computer System.
-        9 Computer System means:
-        9.1 any computer, hardware, software, communications system, electronic device
-        (including, but not limited to, smart phone, laptop, tablet, wearable device), server,
-        cloud or microcontroller including any similar system or any configuration of the
-        aforementioned and including any associated input, output, data storage device,
-        networking equipment or back up facility,
-        owned or operated by the Insured or any other party.
-        10 Data means information, facts, concepts, code or any other information of any kind that is
-        recorded or transmitted in a form to be used, accessed, processed, transmitted or stored by
-        a Computer System.
-        11 Data Processing Media means any property insured by this Policy on which Data can be stored
-        but not the Data itself.
-        """,
-
-        """<b>Marine Cyber Exclusion (LMA5402)</b><br/> 
-        This clause shall be paramount and shall override anything in this insurance inconsistent therewith.
-        1 In no case shall this insurance cover any loss, damage, liability or expense directly or indirectly caused by, contributed to by or arising from:
-        1.1 the failure, error or malfunction of any computer, computer system, computer software programme, code, or process or any other electronic system, or
-        1.2 the use or operation, as a means for inflicting harm, of any computer, computer system, computer software programme, malicious code, computer virus or process or any other electronic system.
-        """,
-
-        """<b>NMA 2915 Electronic Data Endorsement B</b><br/>
-        Electronic Data Exclusion
-        Notwithstanding any provision to the contrary within the Policy or any endorsement thereto, it is understood and agreed as follows:
-        (a)  This Policy does not insure loss, damage, destruction, distortion, erasure, corruption or alteration of ELECTRONIC DATA from any cause whatsoever (including but not limited to COMPUTER VIRUS) or loss of use, reduction in functionality, cost, expense of whatsoever nature resulting therefrom, regardless of any other cause or event contributing concurrently or in any other sequence to the loss.
-        ELECTRONIC DATA means facts, concepts and information converted to a form useable for communications, interpretation or processing by electronic and electromechanical data processing or electronically controlled equipment and includes programmes, software and other coded instructions for the processing and manipulation of data or the direction and manipulation of such equipment.
-        COMPUTER VIRUS means a set of corrupting, harmful or otherwise unauthorised instructions or code including a set of maliciously introduced unauthorised instructions or code, programmatic or otherwise, that propagate themselves through a computer system or network of whatsoever nature. COMPUTER VIRUS includes but is not limited to 'Trojan Horses', 'worms' and 'time or logic bombs'.
-        (b)  However, in the event that a peril listed below results from any of the matters described in paragraph (a) above, this Policy, subject to all its terms, conditions and exclusions, will cover physical damage occurring during the Policy period to property insured by this Policy directly caused by such listed peril.
-        Listed Perils
-        Fire Explosion
-        Electronic Data Processing Media Valuation
-        Notwithstanding any provision to the contrary within the Policy or any endorsement thereto, it is understood and agreed as follows:
-        Should electronic data processing media insured by this Policy suffer physical loss or damage insured by this Policy, then the basis of valuation shall be the cost of the blank media plus the costs of copying the ELECTRONIC DATA from back-up or from originals of a previous generation. These costs will not include research and engineering nor any costs of recreating, gathering or assembling such ELECTRONIC DATA. If the media is not repaired, replaced or restored the basis of valuation shall be the cost of the blank media. However this Policy does not insure any amount pertaining to the value of such ELECTRONIC DATA to the Assured or any other party, even if such ELECTRONIC DATA cannot be recreated, gathered or assembled.
-        """,
-        'Excluded',
-        'Included'
-    ]
 
-    MICROORGANISM_CLAUSES = [
-        """<b>Microorganism Exclusion (LMA5018)</b><br/>
-        This Policy does not insure any loss, damage, claim, cost, expense or other sum directly or indirectly arising out of or relating to:
-        mold, mildew, fungus, spores or other microorganism of any type, nature, or description, including but not limited to any substance whose presence poses an actual or potential threat to human health.
-        This Exclusion applies regardless whether there is (i) any physical loss or damage to insured property; (ii) any insured peril or cause, whether or not contributing concurrently or in any sequence; (iii) any loss of use, occupancy, or functionality; or (iv) any action required, including but not limited to repair, replacement, removal, cleanup, abatement, disposal, relocation, or steps taken to address medical or legal concerns.
-        This Exclusion replaces and supersedes any provision in the Policy that provides insurance, in whole or in part, for these matters.
-        """,
-
-        """<b>Microorganism Exclusion (MAP)</b><br/>
-        This policy does not insure any loss, damage, claim, cost, expense or other sum directly or indirectly arising out of or relating to:
-        Mold, mildew, fungus, spores or other microorganisms of any type, nature, or description, including but not limited to any substance whose presence poses an actual or potential threat to human health.
-        This exclusion applies regardless where there is
-        any physical loss or damage to insured property ;
-        any insured peril or cause, whether or not contributing concurrently or in any sequence ;
-        any loss or use, occupancy or functionality or
-        any action required including but not limited to repair, replacement, removal, cleanup, abatement, disposal, relocation, or steps taken to address medical or legal concerns.
-        This exclusion replaces and supersedes any provision in the Policy that provides insurance, in whole or in part for this matters.
-        """
+NUCLEAR_EXCLUSIONS = [
+    'NMA 1975A Nuclear Energy Risk Exclusion', 
+    'CL 370 Institute Radioactive Contamination, Chemical, Biological, Bio-Chemical, and Electromagnetic Weapons Exclusion Clause',
+    'Excluded',
+    'Included'
 ]
+COMMUNICABLE_DISEASE_EXCLUSIONS = [
+    """<b>Communicable Disease Exclusion (LMA5394)</b><br/>
+    1. Notwithstanding any provision to the contrary within this reinsurance agreement, this reinsurance
+    agreement excludes any loss, damage, liability, claim, cost or expense of whatsoever nature,
+    directly or indirectly caused by, contributed to by, resulting from, arising out of, or in connection
+    with a Communicable Disease or the fear or threat (whether actual or perceived) of a
+    Communicable Disease regardless of any other cause or event contributing concurrently or in any
+    other sequence thereto.
+    2. As used herein, a Communicable Disease means any disease which can be transmitted by means of
+    any substance or agent from any organism to another organism where:
+    2.1. the substance or agent includes, but is not limited to, a virus, bacterium, parasite or other
+    organism or any variation thereof, whether deemed living or not, and
+    2.2. the method of transmission, whether direct or indirect, includes but is not limited to,
+    airborne transmission, bodily fluid transmission, transmission from or to any surface or
+    object, solid, liquid or gas or between organisms, and
+    2.3. the disease, substance or agent can cause or threaten damage to human health or human
+    welfare or can cause or threaten damage to, deterioration of, loss of value of, marketability
+    of or loss of use of property.
+    """,
 
-    TRANSMISSION_LINES_EXCLUSION = ["""<b>Transmission and Distribution Lines Exclusion</b><br/>
-        All transmission and distribution lines, including wire, cables, poles, pylons, standards, towers and any equipment of any type which may be attendant to such installations of any description. This exclusion includes but is not limited to transmission or distribution of electrical power, telephone or telegraph signals, and all communication signals whether audio or visual
-        This exclusion applies only to above and below ground equipment, except that which is within three hundred and five (305) metres (or one thousand (1,000) feet) of the insured`s premises or as defined in the Assured`s original policy(ies)
-        This exclusion applies both to physical loss or damage to the equipment and all business interruption, consequential loss and/or other contingent losses related to transmission and distribution lines
-        """,
-        "Included",
-        "Excluded"]
-
-    PREMIUM_PROCESSING_CLAUSE_TEMPLATE = """<b>Premium Processing Clause</b><br/>
-        Where the premium is to be paid through {company_name}, payment to (Re)Insurers will be deemed to occur on the day ...
-        """
-    
-    PREMIUM_PAYMENT_CLAUSE_TEMPLATE = """<b>Premium Payment Clause</b><br/>
-        The (Re)Insured undertakes that premium will be paid in full to underwriters within {days} days of inception of this policy (or, in respect of instalment premiums, when due).
-        If the premium due under this policy has not been so paid to Underwriters by the {days} day from the inception of this policy (and, in respect of instalment premiums, by the date they are due) Underwriters shall have the right to cancel this policy by notifying the (Re)Insured via the broker in writing. In the event of cancellation, premium is due to Underwriters on a pro rata basis for the period that Underwriters are on risk but the full policy premium shall be payable to Underwriters in the event of a loss or occurrence prior to the date of termination which gives rise to a valid claim under this policy.
-        It is agreed that Underwriters shall give not less than 15 days prior notice of cancellation to the (Re)Insured via the broker. If premium due is paid in full to Underwriters before the notice period expires, notice of cancellation shall automatically be revoked. If not, the policy shall automatically terminate at the end of the notice period.
-        Unless otherwise agreed, the Leading Underwriter (and Agreement Parties if appropriate) are authorized to exercise rights under this clause on their own behalf and on behalf of all Underwriters participating in this contract.
-        If any provision of this clause is found by any court or administrative body of competent jurisdiction to be invalid or unenforceable, such invalidity or unenforceability will not effect the other provisions of this clause which will remain in full force and effect.
-        Where the premium is to be paid through a London Market Bureau, payment to Underwriters will be deemed to occur on the day of delivery of a premium advice note to the Bureau."""
-
-    PAYMENT_TERMS = [90, 150, 210]
-    POLICY_DURATIONS = [12, 15, 18, 24]
-
-    BROKERAGE_COMPANIES = ["Brokerage ABC", "ABC Brokers", "Random Brokers", "Brokerage Brokerage"]
+    """<b>Communicable Disease Endorsement (LMA5393)</b><br/>
+    1. This policy, subject to all applicable terms, conditions and exclusions, covers losses attributable
+    to direct physical loss or physical damage occurring during the period of insurance. Consequently
+    and notwithstanding any other provision of this policy to the contrary, this policy does not insure
+    any loss, damage, claim, cost, expense or other sum, directly or indirectly arising out of,
+    attributable to, or occurring concurrently or in any sequence with a Communicable Disease or the
+    fear or threat (whether actual or perceived) of a Communicable Disease.
+    2. For the purposes of this endorsement, loss, damage, claim, cost, expense or other sum, includes,
+    but is not limited to, any cost to clean-up, detoxify, remove, monitor or test:
+    2.1. for a Communicable Disease, or
+    2.2. any property insured hereunder that is affected by such Communicable Disease.
+    3. As used herein, a Communicable Disease means any disease which can be transmitted by means of
+    any substance or agent from any organism to another organism where:
+    3.1. the substance or agent includes, but is not limited to, a virus, bacterium, parasite or other
+    organism or any variation thereof, whether deemed living or not, and
+    3.2. the method of transmission, whether direct or indirect, includes but is not limited to,
+    airborne transmission, bodily fluid transmission, transmission from or to any surface or
+    object, solid, liquid or gas or between organisms, and
+    3.3. the disease, substance or agent can cause or threaten damage to human health or human
+    welfare or can cause or threaten damage to, deterioration of, loss of value of, marketability
+    of or loss of use of property insured hereunder.
+    4. This endorsement applies to all coverage extensions, additional coverages, exceptions to any
+    exclusion and other coverage grant(s).
+    All other terms, conditions and exclusions of the policy remain the same.
+    """,
+    'Excluded',
+    'Included'
+]
+SANCTIONS_LIMITATIONS = [
+    'LMA 3100 Sanctions Limitation & Exclusion Clause',
+    'LMA 3100A Sanctions Limitation & Exclusion Clause',
+    'Excluded',
+    'Included'
+]
+CYBER_EXCLUSIONS = [
+    """<b>Cyber Exclusion Clause (LMA5401)</b><br/>
+    1 Notwithstanding any provision to the contrary within this Policy or any endorsement thereto
+    this Policy excludes any:
+    1.1 Cyber Loss;
+    1.2 loss, damage, liability, claim, cost, expense of whatsoever nature directly or indirectly
+    caused by, contributed to by, resulting from, arising out of or in connection with any
+    loss of use, reduction in functionality, repair, replacement, restoration or reproduction
+    of any Data, including any amount pertaining to the value of such Data;
+    regardless of any other cause or event contributing concurrently or in any other sequence
+    thereto.
+    2 In the event any portion of this endorsement is found to be invalid or unenforceable, the
+    remainder shall remain in full force and effect.
+    3 This endorsement supersedes and, if in conflict with any other wording in the Policy or any
+    endorsement thereto having a bearing on Cyber Loss or Data, replaces that wording.
+    Definitions
+    4 Cyber Loss means any loss, damage, liability, claim, cost or expense of whatsoever nature
+    directly or indirectly caused by, contributed to by, resulting from, arising out of or in
+    connection with any Cyber Act or Cyber Incident including, but not limited to, any action
+    taken in controlling, preventing, suppressing or remediating any Cyber Act or Cyber Incident.
+    5 Cyber Act means an unauthorised, malicious or criminal act or series of related unauthorised,
+    malicious or criminal acts, regardless of time and place, or the threat or hoax thereof
+    involving access to, processing of, use of or operation of any Computer System.
+    6 Cyber Incident means:
+    6.1 any error or omission or series of related errors or omissions involving access to,
+    processing of, use of or operation of any Computer System; or
+    6.2 any partial or total unavailability or failure or series of related partial or total
+    unavailability or failures to access, process, use or operate any Computer System.
+    7 Computer System means:
+    7.1 any computer, hardware, software, communications system, electronic device
+    (including, but not limited to, smart phone, laptop, tablet, wearable device), server,
+    cloud or microcontroller including any similar system or any configuration of the
+    aforementioned and including any associated input, output, data storage device,
+    networking equipment or back up facility,
+    owned or operated by the Insured or any other party.
+    8 Data means information, facts, concepts, code or any other information of any kind that is
+    recorded or transmitted in a form to be used, accessed, processed, transmitted or stored by
+    a Computer System.
+    """,
     
+    """<b>Cyber Exclusion Clause (LMA5400)</b><br/>
+    1 Notwithstanding any provision to the contrary within this Policy or any endorsement thereto
+    this Policy excludes any:
+    1.1 Cyber Loss, unless subject to the provisions of paragraph 2;
+    1.2 loss, damage, liability, claim, cost, expense of whatsoever nature directly or indirectly
+    caused by, contributed to by, resulting from, arising out of or in connection with any
+    loss of use, reduction in functionality, repair, replacement, restoration or reproduction
+    of any Data, including any amount pertaining to the value of such Data, unless subject
+    to the provisions of paragraph 3;
+    regardless of any other cause or event contributing concurrently or in any other sequence
+    thereto.
+    2 Subject to all the terms, conditions, limitations and exclusions of this Policy or any
+    endorsement thereto, this Policy covers physical loss or physical damage to property insured
+    under this Policy caused by any ensuing fire or explosion which directly results from a Cyber
+    Incident, unless that Cyber Incident is caused by, contributed to by, resulting from, arising
+    out of or in connection with a Cyber Act including, but not limited to, any action taken in
+    controlling, preventing, suppressing or remediating any Cyber Act.
+    3 Subject to all the terms, conditions, limitations and exclusions of this Policy or any
+    endorsement thereto, should Data Processing Media owned or operated by the Insured suffer
+    physical loss or physical damage insured by this Policy, then this Policy will cover the cost to
+    repair or replace the Data Processing Media itself plus the costs of copying the Data from
+    back-up or from originals of a previous generation. These costs will not include research and
+    engineering nor any costs of recreating, gathering or assembling the Data. If such media is
+    not repaired, replaced or restored the basis of valuation shall be the cost of the blank Data
+    Processing Media. However, this Policy excludes any amount pertaining to the value of such
+    Data, to the Insured or any other party, even if such Data cannot be recreated, gathered or
+    assembled.
+    4 In the event any portion of this endorsement is found to be invalid or unenforceable, the
+    remainder shall remain in full force and effect.
+    5 This endorsement supersedes and, if in conflict with any other wording in the Policy or any
+    endorsement thereto having a bearing on Cyber Loss, Data or Data Processing Media, replaces
+    that wording.
+    Definitions
+    6 Cyber Loss means any loss, damage, liability, claim, cost or expense of whatsoever nature
+    directly or indirectly caused by, contributed to by, resulting from, arising out of or in
+    connection with any Cyber Act or Cyber Incident including, but not limited to, any action
+    taken in controlling, preventing, suppressing or remediating any Cyber Act or Cyber Incident.
+    7 Cyber Act means an unauthorised, malicious or criminal act or series of related unauthorised,
+    malicious or criminal acts, regardless of time and place, or the threat or hoax thereof
+    involving access to, processing of, use of or operation of any Computer System.
+    8 Cyber Incident means:
+    8.1 any error or omission or series of related errors or omissions involving access to,
+    processing of, use of or operation of any Computer System; or
+    8.2 any partial or total unavailability or failure or series of related partial or total
+    unavailability or failures to access, process, use or operate any Computer System.
+    9 Computer System means:
+    9.1 any computer, hardware, software, communications system, electronic device
+    (including, but not limited to, smart phone, laptop, tablet, wearable device), server,
+    cloud or microcontroller including any similar system or any configuration of the
+    aforementioned and including any associated input, output, data storage device,
+    networking equipment or back up facility,
+    owned or operated by the Insured or any other party.
+    10 Data means information, facts, concepts, code or any other information of any kind that is
+    recorded or transmitted in a form to be used, accessed, processed, transmitted or stored by
+    a Computer System.
+    11 Data Processing Media means any property insured by this Policy on which Data can be stored
+    but not the Data itself.
+    """,
+
+    """<b>Marine Cyber Exclusion (LMA5402)</b><br/> 
+    This clause shall be paramount and shall override anything in this insurance inconsistent therewith.
+    1 In no case shall this insurance cover any loss, damage, liability or expense directly or indirectly caused by, contributed to by or arising from:
+    1.1 the failure, error or malfunction of any computer, computer system, computer software programme, code, or process or any other electronic system, or
+    1.2 the use or operation, as a means for inflicting harm, of any computer, computer system, computer software programme, malicious code, computer virus or process or any other electronic system.
+    """,
+
+    """<b>NMA 2915 Electronic Data Endorsement B</b><br/>
+    Electronic Data Exclusion
+    Notwithstanding any provision to the contrary within the Policy or any endorsement thereto, it is understood and agreed as follows:
+    (a)  This Policy does not insure loss, damage, destruction, distortion, erasure, corruption or alteration of ELECTRONIC DATA from any cause whatsoever (including but not limited to COMPUTER VIRUS) or loss of use, reduction in functionality, cost, expense of whatsoever nature resulting therefrom, regardless of any other cause or event contributing concurrently or in any other sequence to the loss.
+    ELECTRONIC DATA means facts, concepts and information converted to a form useable for communications, interpretation or processing by electronic and electromechanical data processing or electronically controlled equipment and includes programmes, software and other coded instructions for the processing and manipulation of data or the direction and manipulation of such equipment.
+    COMPUTER VIRUS means a set of corrupting, harmful or otherwise unauthorised instructions or code including a set of maliciously introduced unauthorised instructions or code, programmatic or otherwise, that propagate themselves through a computer system or network of whatsoever nature. COMPUTER VIRUS includes but is not limited to 'Trojan Horses', 'worms' and 'time or logic bombs'.
+    (b)  However, in the event that a peril listed below results from any of the matters described in paragraph (a) above, this Policy, subject to all its terms, conditions and exclusions, will cover physical damage occurring during the Policy period to property insured by this Policy directly caused by such listed peril.
+    Listed Perils
+    Fire Explosion
+    Electronic Data Processing Media Valuation
+    Notwithstanding any provision to the contrary within the Policy or any endorsement thereto, it is understood and agreed as follows:
+    Should electronic data processing media insured by this Policy suffer physical loss or damage insured by this Policy, then the basis of valuation shall be the cost of the blank media plus the costs of copying the ELECTRONIC DATA from back-up or from originals of a previous generation. These costs will not include research and engineering nor any costs of recreating, gathering or assembling such ELECTRONIC DATA. If the media is not repaired, replaced or restored the basis of valuation shall be the cost of the blank media. However this Policy does not insure any amount pertaining to the value of such ELECTRONIC DATA to the Assured or any other party, even if such ELECTRONIC DATA cannot be recreated, gathered or assembled.
+    """,
+    'Excluded',
+    'Included'
+]
+
+MICROORGANISM_CLAUSES = [
+    """<b>Microorganism Exclusion (LMA5018)</b><br/>
+    This Policy does not insure any loss, damage, claim, cost, expense or other sum directly or indirectly arising out of or relating to:
+    mold, mildew, fungus, spores or other microorganism of any type, nature, or description, including but not limited to any substance whose presence poses an actual or potential threat to human health.
+    This Exclusion applies regardless whether there is (i) any physical loss or damage to insured property; (ii) any insured peril or cause, whether or not contributing concurrently or in any sequence; (iii) any loss of use, occupancy, or functionality; or (iv) any action required, including but not limited to repair, replacement, removal, cleanup, abatement, disposal, relocation, or steps taken to address medical or legal concerns.
+    This Exclusion replaces and supersedes any provision in the Policy that provides insurance, in whole or in part, for these matters.
+    """,
+
+    """<b>Microorganism Exclusion (MAP)</b><br/>
+    This policy does not insure any loss, damage, claim, cost, expense or other sum directly or indirectly arising out of or relating to:
+    Mold, mildew, fungus, spores or other microorganisms of any type, nature, or description, including but not limited to any substance whose presence poses an actual or potential threat to human health.
+    This exclusion applies regardless where there is
+    any physical loss or damage to insured property ;
+    any insured peril or cause, whether or not contributing concurrently or in any sequence ;
+    any loss or use, occupancy or functionality or
+    any action required including but not limited to repair, replacement, removal, cleanup, abatement, disposal, relocation, or steps taken to address medical or legal concerns.
+    This exclusion replaces and supersedes any provision in the Policy that provides insurance, in whole or in part for this matters.
+    """
+]
+
+TRANSMISSION_LINES_EXCLUSION = ["""<b>Transmission and Distribution Lines Exclusion</b><br/>
+    All transmission and distribution lines, including wire, cables, poles, pylons, standards, towers and any equipment of any type which may be attendant to such installations of any description. This exclusion includes but is not limited to transmission or distribution of electrical power, telephone or telegraph signals, and all communication signals whether audio or visual
+    This exclusion applies only to above and below ground equipment, except that which is within three hundred and five (305) metres (or one thousand (1,000) feet) of the insured`s premises or as defined in the Assured`s original policy(ies)
+    This exclusion applies both to physical loss or damage to the equipment and all business interruption, consequential loss and/or other contingent losses related to transmission and distribution lines
+    """,
+    "Included",
+    "Excluded"]
+
+PREMIUM_PROCESSING_CLAUSE_TEMPLATE = """<b>Premium Processing Clause</b><br/>
+    Where the premium is to be paid through {company_name}, payment to (Re)Insurers will be deemed to occur on the day ...
+    """
+
+PREMIUM_PAYMENT_CLAUSE_TEMPLATE = """<b>Premium Payment Clause</b><br/>
+    The (Re)Insured undertakes that premium will be paid in full to underwriters within {days} days of inception of this policy (or, in respect of instalment premiums, when due).
+    If the premium due under this policy has not been so paid to Underwriters by the {days} day from the inception of this policy (and, in respect of instalment premiums, by the date they are due) Underwriters shall have the right to cancel this policy by notifying the (Re)Insured via the broker in writing. In the event of cancellation, premium is due to Underwriters on a pro rata basis for the period that Underwriters are on risk but the full policy premium shall be payable to Underwriters in the event of a loss or occurrence prior to the date of termination which gives rise to a valid claim under this policy.
+    It is agreed that Underwriters shall give not less than 15 days prior notice of cancellation to the (Re)Insured via the broker. If premium due is paid in full to Underwriters before the notice period expires, notice of cancellation shall automatically be revoked. If not, the policy shall automatically terminate at the end of the notice period.
+    Unless otherwise agreed, the Leading Underwriter (and Agreement Parties if appropriate) are authorized to exercise rights under this clause on their own behalf and on behalf of all Underwriters participating in this contract.
+    If any provision of this clause is found by any court or administrative body of competent jurisdiction to be invalid or unenforceable, such invalidity or unenforceability will not effect the other provisions of this clause which will remain in full force and effect.
+    Where the premium is to be paid through a London Market Bureau, payment to Underwriters will be deemed to occur on the day of delivery of a premium advice note to the Bureau."""
+
+PAYMENT_TERMS = [90, 150, 210]
+POLICY_DURATIONS = [12, 15, 18, 24]
+
+# The standard sublimit schedule, in document order: (key, options, parent sublimit whose amount caps this one).
+# Options are dollar amounts or "Policy Limit"; a period sublimit picks one of its options in the unit of
+# PERIOD_SUBLIMITS, and a string is a fixed value.
+SUBLIMIT_SCHEDULE = [
+    ('flood', [10_000_000, 25_000_000, 50_000_000, 100_000_000], None),
+    ('sfha_flood', [5_000_000, 10_000_000, 25_000_000, 50_000_000], 'flood'),
+    ('earthquake', ["Policy Limit", 50_000_000, 100_000_000, 200_000_000], None),
+    ('california_earthquake', [20_000_000, 25_000_000, 25_000_000, 50_000_000, 75_000_000, 100_000_000], 'flood'),
+    ('named_windstorm', ["Policy Limit", 50_000_000, 100_000_000, 200_000_000], None),
+    ('accidental_interruption', [10_000_000, 25_000_000, 50_000_000], None),
+    ('ammonia_contamination', [10_000_000, 25_000_000, 50_000_000], None),
+    ('automatic_coverage', [10_000_000, 25_000_000, 50_000_000, 100_000_000], None),
+    ('contingent_time_element', [10_000_000, 25_000_000, 50_000_000, 100_000_000], None),
+    ('errors_omissions', [10_000_000, 25_000_000, 50_000_000], None),
+    ('gross_profits', [12, 18], None),
+    ('ingress_egress', [10_000_000, 25_000_000, 50_000_000], None),
+    ('miscellaneous_property', [10_000_000, 25_000_000, 50_000_000], None),
+    ('ordinary_payroll', "365 days", None),
+    ('rental_property', [10_000_000, 25_000_000, 50_000_000, 100_000_000], None),
+    ('rolling_stock', [10_000_000, 25_000_000, 50_000_000], None),
+    ('transportation', [10_000_000, 25_000_000, 50_000_000, 100_000_000], None),
+    ('valuable_papers_records', [10_000_000, 25_000_000, 50_000_000, 100_000_000], None),
+]
+PERIOD_SUBLIMITS = {'gross_profits': 'months'}
+
+BROKERAGE_COMPANIES = ["Brokerage ABC", "ABC Brokers", "Random Brokers", "Brokerage Brokerage"]
+
+def generate_policy_data(policy_id, insured_name, override_inception_date=None, is_renewal=False, rng=random,
+                         as_of=None):
+    """Generate single policy data with randomized sublimits, deductibles, SIR, and dates.
+       If override_inception_date is provided, it is used as the inception date.
+       rng: random source (a seeded random.Random makes the result reproducible).
+       as_of: date the random inception date is counted back from (defaults to today)."""
     # Chooses policy duration (majority being 12 months)
-    duration_months = random.choices(POLICY_DURATIONS, weights=[70, 10, 10, 10])[0]
+    duration_months = rng.choices(POLICY_DURATIONS, weights=[70, 10, 10, 10])[0]
     
     # Determine inception date.
     if override_inception_date:
         inception_date = override_inception_date
     else:
-        days_back = random.randint(30, 360)
-        initial_date = datetime.now() - timedelta(days=days_back)
+        days_back = rng.randint(30, 360)
+        initial_date = (as_of or datetime.now()) - timedelta(days=days_back)
         year = initial_date.year
         month = initial_date.month
         # Choose a start day: 1st, 15th, or last day of the month.
-        start_day_option = random.choice([1, 15, 'last'])
+        start_day_option = rng.choice([1, 15, 'last'])
         if start_day_option == 'last':
             start_day = calendar.monthrange(year, month)[1]
         else:
@@ -462,19 +491,19 @@ def generate_policy_data(policy_id, insured_name, override_inception_date=None,
     expiration_date = inception_date + relativedelta(months=+duration_months)
     
     # Overall policy limit (ensuring sublimits are valid)
-    policy_limit = random.randint(10_000_000, 200_000_000)
+    policy_limit = rng.randint(10_000_000, 200_000_000)
     
     # Financial values
-    insured_value = policy_limit * random.uniform(0.8, 1.2)
-    base_premium = policy_limit * random.uniform(0.001, 0.005)
-    brokerage_commission = random.uniform(0.10, 0.25)
+    insured_value = policy_limit * rng.uniform(0.8, 1.2)
+    base_premium = policy_limit * rng.uniform(0.001, 0.005)
+    brokerage_commission = rng.uniform(0.10, 0.25)
     premium = base_premium * (1 + brokerage_commission)
     
     # Generate deductibles (rounded to the nearest thousand)
-    deductible_all_other = choose_deductible(25_000, 50_000_000, 25_000, 50_000_000, bias_probability=0.5)
-    deductible_earthquake = choose_deductible(5_000_000, 100_000_000, 5_000_000, 25_000_000)
-    deductible_named_windstorm = choose_deductible(5_000_000, 100_000_000, 5_000_000, 25_000_000)
-    deductible_flood = choose_deductible(5_000_000, 100_000_000, 5_000_000, 25_000_000)
+    deductible_all_other = choose_deductible(25_000, 50_000_000, 25_000, 50_000_000, bias_probability=0.5, rng=rng)
+    deductible_earthquake = choose_deductible(5_000_000, 100_000_000, 5_000_000, 25_000_000, rng=rng)
+    deductible_named_windstorm = choose_deductible(5_000_000, 100_000_000, 5_000_000, 25_000_000, rng=rng)
+    deductible_flood = choose_deductible(5_000_000, 100_000_000, 5_000_000, 25_000_000, rng=rng)
     
     deductibles = {
         'all_other_loss': f"${deductible_all_other:,} each and every loss",
@@ -484,130 +513,55 @@ def generate_policy_data(policy_id, insured_name, override_inception_date=None,
     }
     
     # Generate Self-Insured Retention (SIR)
-    sir_choice = random.choices(['none', 'single', 'aggregated'], weights=[0.5, 0.3, 0.2])[0]
+    sir_choice = rng.choices(['none', 'single', 'aggregated'], weights=[0.5, 0.3, 0.2])[0]
     if sir_choice == 'none':
         sir = None
     elif sir_choice == 'single':
-        sir_value = choose_sir(5_000_000, 100_000_000, 5_000_000, 25_000_000)
+        sir_value = choose_sir(5_000_000, 100_000_000, 5_000_000, 25_000_000, rng=rng)
         sir = f"${sir_value:,} each and every loss"
     else:  # Aggregated SIR
-        sir_value = choose_sir(5_000_000, 100_000_000, 5_000_000, 25_000_000)
-        aggregate = random.randint(sir_value, 100_000_000)
+        sir_value = choose_sir(5_000_000, 100_000_000, 5_000_000, 25_000_000, rng=rng)
+        aggregate = rng.randint(sir_value, 100_000_000)
         aggregate = round(aggregate / 1000) * 1000
         sir = f"${sir_value:,} each and every loss and ${aggregate:,} in the annual aggregate"
     
-    # Generate sublimits (all values must be <= policy_limit)
+    # Generate sublimits (all values must be <= policy_limit, and <= the parent sublimit if any)
     sublimits = {}
-    # Flood sublimit options (in dollars)
-    flood_options = [10_000_000, 25_000_000, 50_000_000, 100_000_000]
-    flood_sublimit = choose_sublimit(flood_options, policy_limit)
-    sublimits['flood'] = f"${flood_sublimit:,}" if isinstance(flood_sublimit, (int, float)) else flood_sublimit
-
-    # SFHA Flood: must be <= Flood sublimit
-    sfha_flood_options = [5_000_000, 10_000_000, 25_000_000, 50_000_000]
-    sfha_flood_sublimit = choose_sublimit(sfha_flood_options, policy_limit, parent_limit=(flood_sublimit if isinstance(flood_sublimit, (int, float)) else policy_limit))
-    sublimits['sfha_flood'] = f"${sfha_flood_sublimit:,}" if isinstance(sfha_flood_sublimit, (int, float)) else sfha_flood_sublimit
-
-    # Earthquake: options include "Policy Limit" or specific amounts.
-    earthquake_options = ["Policy Limit", 50_000_000, 100_000_000, 200_000_000]
-    earthquake_sublimit = choose_sublimit(earthquake_options, policy_limit)
-    sublimits['earthquake'] = f"${earthquake_sublimit:,}" if isinstance(earthquake_sublimit, (int, float)) else earthquake_sublimit
-
-    # California Earthquake: must be <= Flood sublimit.
-    california_eq_options = [20_000_000, 25_000_000, 25_000_000, 50_000_000, 75_000_000, 100_000_000]
-    california_eq_sublimit = choose_sublimit(california_eq_options, policy_limit, parent_limit=(flood_sublimit if isinstance(flood_sublimit, (int, float)) else policy_limit))
-    sublimits['california_earthquake'] = f"${california_eq_sublimit:,}" if isinstance(california_eq_sublimit, (int, float)) else california_eq_sublimit
-
-    # Named Windstorm: options include "Policy Limit".
-    named_windstorm_options = ["Policy Limit", 50_000_000, 100_000_000, 200_000_000]
-    named_windstorm_sublimit = choose_sublimit(named_windstorm_options, policy_limit)
-    sublimits['named_windstorm'] = f"${named_windstorm_sublimit:,}" if isinstance(named_windstorm_sublimit, (int, float)) else named_windstorm_sublimit
-
-    # Accidental Interruption of Services
-    accidental_interruption_options = [10_000_000, 25_000_000, 50_000_000]
-    accidental_interruption_sublimit = choose_sublimit(accidental_interruption_options, policy_limit)
-    sublimits['accidental_interruption'] = f"${accidental_interruption_sublimit:,}" if isinstance(accidental_interruption_sublimit, (int, float)) else accidental_interruption_sublimit
-
-    # Ammonia Contamination
-    ammonia_contamination_options = [10_000_000, 25_000_000, 50_000_000]
-    ammonia_contamination_sublimit = choose_sublimit(ammonia_contamination_options, policy_limit)
-    sublimits['ammonia_contamination'] = f"${ammonia_contamination_sublimit:,}" if isinstance(ammonia_contamination_sublimit, (int, float)) else ammonia_contamination_sublimit
-
-    # Automatic Coverage
-    automatic_coverage_options = [10_000_000, 25_000_000, 50_000_000, 100_000_000]
-    automatic_coverage_sublimit = choose_sublimit(automatic_coverage_options, policy_limit)
-    sublimits['automatic_coverage'] = f"${automatic_coverage_sublimit:,}" if isinstance(automatic_coverage_sublimit, (int, float)) else automatic_coverage_sublimit
-
-    # Contingent Time Element
-    contingent_time_options = [10_000_000, 25_000_000, 50_000_000, 100_000_000]
-    contingent_time_sublimit = choose_sublimit(contingent_time_options, policy_limit)
-    sublimits['contingent_time_element'] = f"${contingent_time_sublimit:,}" if isinstance(contingent_time_sublimit, (int, float)) else contingent_time_sublimit
-
-    # Errors & Omissions
-    errors_omissions_options = [10_000_000, 25_000_000, 50_000_000]
-    errors_omissions_sublimit = choose_sublimit(errors_omissions_options, policy_limit)
-    sublimits['errors_omissions'] = f"${errors_omissions_sublimit:,}" if isinstance(errors_omissions_sublimit, (int, float)) else errors_omissions_sublimit
-
-    # Gross Profits (period options)
-    gross_profits_options = [12, 18]
-    gross_profits = random.choice(gross_profits_options)
-    sublimits['gross_profits'] = f"{gross_profits} months"
-
-    # Ingress / Egress
-    ingress_egress_options = [10_000_000, 25_000_000, 50_000_000]
-    ingress_egress_sublimit = choose_sublimit(ingress_egress_options, policy_limit)
-    sublimits['ingress_egress'] = f"${ingress_egress_sublimit:,}" if isinstance(ingress_egress_sublimit, (int, float)) else ingress_egress_sublimit
-
-    # Miscellaneous Property
-    misc_property_options = [10_000_000, 25_000_000, 50_000_000]
-    misc_property_sublimit = choose_sublimit(misc_property_options, policy_limit)
-    sublimits['miscellaneous_property'] = f"${misc_property_sublimit:,}" if isinstance(misc_property_sublimit, (int, float)) else misc_property_sublimit
-
-    # Ordinary Payroll (fixed)
-    sublimits['ordinary_payroll'] = "365 days"
-
-    # Rental Property
-    rental_property_options = [10_000_000, 25_000_000, 50_000_000, 100_000_000]
-    rental_property_sublimit = choose_sublimit(rental_property_options, policy_limit)
-    sublimits['rental_property'] = f"${rental_property_sublimit:,}" if isinstance(rental_property_sublimit, (int, float)) else rental_property_sublimit
-
-    # Rolling Stock
-    rolling_stock_options = [10_000_000, 25_000_000, 50_000_000]
-    rolling_stock_sublimit = choose_sublimit(rolling_stock_options, policy_limit)
-    sublimits['rolling_stock'] = f"${rolling_stock_sublimit:,}" if isinstance(rolling_stock_sublimit, (int, float)) else rolling_stock_sublimit
-
-    # Transportation
-    transportation_options = [10_000_000, 25_000_000, 50_000_000, 100_000_000]
-    transportation_sublimit = choose_sublimit(transportation_options, policy_limit)
-    sublimits['transportation'] = f"${transportation_sublimit:,}" if isinstance(transportation_sublimit, (int, float)) else transportation_sublimit
-
-    # Valuable Papers & Records
-    valuable_papers_options = [10_000_000, 25_000_000, 50_000_000, 100_000_000]
-    valuable_papers_sublimit = choose_sublimit(valuable_papers_options, policy_limit)
-    sublimits['valuable_papers_records'] = f"${valuable_papers_sublimit:,}" if isinstance(valuable_papers_sublimit, (int, float)) else valuable_papers_sublimit
+    amounts = {}
+    for key, options, parent in SUBLIMIT_SCHEDULE:
+        if isinstance(options, str):
+            sublimits[key] = options
+        elif key in PERIOD_SUBLIMITS:
+            sublimits[key] = f"{rng.choice(options)} {PERIOD_SUBLIMITS[key]}"
+        else:
+            parent_limit = None
+            if parent:
+                parent_limit = amounts[parent] if isinstance(amounts[parent], (int, float)) else policy_limit
+            amounts[key] = choose_sublimit(options, policy_limit, parent_limit=parent_limit, rng=rng)
+            sublimits[key] = f"${amounts[key]:,}" if isinstance(amounts[key], (int, float)) else amounts[key]
 
     # Coverage options 
     coverage = {
-        'earthquake': random.choice([True, False]),
-        'strikes_riots_civil_commotion': random.choice([True, False]),
-        'named_windstorm': random.choice([True, False]),
-        'flood': random.choice([True, False])
+        'earthquake': rng.choice([True, False]),
+        'strikes_riots_civil_commotion': rng.choice([True, False]),
+        'named_windstorm': rng.choice([True, False]),
+        'flood': rng.choice([True, False])
     }
     
     # Generates policy number
-    policy_number = f"PN-{random.randint(100000, 999999)}"
+    policy_number = f"PN-{rng.randint(100000, 999999)}"
     
     return {
         'policy_id': policy_id,
         'insured_name': insured_name,
         'policy_number': policy_number,
-        'terrorism_exclusion': random.choice(TERRORISM_EXCLUSIONS),
-        'nuclear_exclusion': random.choice(NUCLEAR_EXCLUSIONS),
-        'communicable_disease_exclusion': random.choice(COMMUNICABLE_DISEASE_EXCLUSIONS),
-        'sanctions_limitation': random.choice(SANCTIONS_LIMITATIONS),
-        'cyber_exclusion': random.choice(CYBER_EXCLUSIONS),
-        'microorganism_exclusion': random.choice(MICROORGANISM_CLAUSES),
-        'transmission_exclusion': random.choice(TRANSMISSION_LINES_EXCLUSION),
+        'terrorism_exclusion': rng.choice(TERRORISM_EXCLUSIONS),
+        'nuclear_exclusion': rng.choice(NUCLEAR_EXCLUSIONS),
+        'communicable_disease_exclusion': rng.choice(COMMUNICABLE_DISEASE_EXCLUSIONS),
+        'sanctions_limitation': rng.choice(SANCTIONS_LIMITATIONS),
+        'cyber_exclusion': rng.choice(CYBER_EXCLUSIONS),
+        'microorganism_exclusion': rng.choice(MICROORGANISM_CLAUSES),
+        'transmission_exclusion': rng.choice(TRANSMISSION_LINES_EXCLUSION),
         'inception_date': inception_date.strftime('%Y-%m-%d'),
         'expiration_date': expiration_date.strftime('%Y-%m-%d'),
         'duration_months': duration_months,
@@ -615,15 +569,36 @@ def generate_policy_data(policy_id, insured_name, override_inception_date=None,
         'insured_value': f"${round(insured_value):,}",
         'premium': f"${round(premium):,}",
         'brokerage_commission_percentage': f"{round(brokerage_commission * 100, 2)}%",
-        'payment_terms_days': random.choice(PAYMENT_TERMS),
+        'payment_terms_days': rng.choice(PAYMENT_TERMS),
         'deductibles': deductibles,
         'sir': sir,
         'sublimits': sublimits,
         'coverage': coverage
     }
 
+_STYLES = None
+
+def get_styles():
+    """Build the paragraph stylesheet once per process and reuse it for every PDF."""
+    global _STYLES
+    if _STYLES is None:
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        _STYLES = getSampleStyleSheet()
+        _STYLES.add(ParagraphStyle(
+            name='CustomHeading',
+            parent=_STYLES['Heading1'],
+            fontSize=16,
+            spaceAfter=30
+        ))
+    return _STYLES
+
 def create_pdf(policy_data, output_dir='policies', is_renewal=False):
     """Create PDF document for a single policy using filename: 'Insured Name @ MM-DD-YYYY.pdf'."""
+    # reportlab is only needed for PDFs; policy data and text-only documents work without it
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
     os.makedirs(output_dir, exist_ok=True)
     # Convert inception_date to desired MM-DD-YYYY format for file naming.
     inception_dt = datetime.strptime(policy_data['inception_date'], '%Y-%m-%d')
@@ -640,13 +615,7 @@ def create_pdf(policy_data, output_dir='policies', is_renewal=False):
         bottomMargin=72
     )
     
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(
-        name='CustomHeading',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30
-    ))
+    styles = get_styles()
     
     content = []
     policy_type = "RENEWAL" if is_renewal else "ORIGINAL"  # Note: You can customize this as needed.
@@ -774,42 +743,313 @@ def create_pdf(policy_data, output_dir='policies', is_renewal=False):
     doc.build(content)
     return filename
 
-def generate_all_policies(num_pairs=150):
+# Exclusion fields in document order, with their labels and the wordings they are drawn from
+CLAUSE_FIELDS = [
+    ("Terrorism", 'terrorism_exclusion', TERRORISM_EXCLUSIONS),
+    ("Nuclear", 'nuclear_exclusion', NUCLEAR_EXCLUSIONS),
+    ("Communicable Disease", 'communicable_disease_exclusion', COMMUNICABLE_DISEASE_EXCLUSIONS),
+    ("Cyber", 'cyber_exclusion', CYBER_EXCLUSIONS),
+    ("Sanctions", 'sanctions_limitation', SANCTIONS_LIMITATIONS),
+    ("Microorganism", 'microorganism_exclusion', MICROORGANISM_CLAUSES),
+    ("Transmission & Distribution Lines", 'transmission_exclusion', TRANSMISSION_LINES_EXCLUSION)
+]
+
+# Sublimits that a renewal can add on top of the standard schedule
+ADDITIONAL_SUBLIMIT_OPTIONS = {
+    'debris_removal': [5_000_000, 10_000_000, 25_000_000],
+    'civil_authority': [5_000_000, 10_000_000, 25_000_000],
+    'extra_expense': [10_000_000, 25_000_000, 50_000_000],
+    'fine_arts': [1_000_000, 5_000_000, 10_000_000],
+    'leasehold_interest': [5_000_000, 10_000_000, 25_000_000]
+}
+
+# Sublimits that must not exceed another sublimit
+SUBLIMIT_PARENTS = {key: parent for key, _, parent in SUBLIMIT_SCHEDULE if parent}
+
+MUTATION_TYPES = ("limit_change", "clause_swap", "added_sublimit", "coverage_toggle")
+
+def parse_amount(value):
+    """Return (amount, suffix) for values like '$25,000 each and every loss', or (None, value)."""
+    match = re.match(r'^\$([\d,]+)(.*)$', str(value))
+    if not match:
+        return None, value
+    return int(match.group(1).replace(',', '')), match.group(2)
+
+def _mutate_limit(policy, rng, used_fields):
+    policy_limit, _ = parse_amount(policy['policy_limit'])
+    candidates = []
+    for section in ('deductibles', 'sublimits'):
+        for key, value in policy[section].items():
+            if f"{section}.{key}" not in used_fields and parse_amount(value)[0] is not None:
+                candidates.append((section, key))
+    rng.shuffle(candidates)
+    for section, key in candidates:
+        old_value = policy[section][key]
+        amount, suffix = parse_amount(old_value)
+        new_amount = round(amount * rng.choice([0.5, 0.75, 1.25, 1.5, 2.0]) / 1000) * 1000
+        if section == 'sublimits':
+            # Respect the same caps generate_policy_data applies
+            cap = policy_limit
+            parent = SUBLIMIT_PARENTS.get(key)
+            if parent:
+                parent_amount = parse_amount(policy['sublimits'][parent])[0]
+                cap = min(cap, parent_amount) if parent_amount else cap
+            children = [parse_amount(policy['sublimits'][c])[0] for c, p in SUBLIMIT_PARENTS.items() if p == key]
+            floor = max([c for c in children if c] or [0])
+            new_amount = max(min(new_amount, cap), floor)
+        if new_amount != amount:
+            policy[section][key] = f"${new_amount:,}{suffix}"
+            return {"type": "limit_change", "field": f"{section}.{key}", "from": old_value, "to": policy[section][key]}
+    return None
+
+def _mutate_clause(policy, rng, used_fields):
+    candidates = [(f, options) for _, f, options in CLAUSE_FIELDS if f not in used_fields and len(options) > 1]
+    if not candidates:
+        return None
+    field, options = rng.choice(candidates)
+    old_value = policy[field]
+    policy[field] = rng.choice([o for o in options if o != old_value])
+    return {"type": "clause_swap", "field": field, "from": old_value, "to": policy[field]}
+
+def _mutate_added_sublimit(policy, rng, used_fields):
+    candidates = [k for k in ADDITIONAL_SUBLIMIT_OPTIONS if k not in policy['sublimits']]
+    if not candidates:
+        return None
+    key = rng.choice(candidates)
+    policy_limit, _ = parse_amount(policy['policy_limit'])
+    amount = choose_sublimit(ADDITIONAL_SUBLIMIT_OPTIONS[key], policy_limit, rng=rng)
+    policy['sublimits'][key] = f"${amount:,}"
+    return {"type": "added_sublimit", "field": f"sublimits.{key}", "from": None, "to": policy['sublimits'][key]}
+
+def _mutate_coverage(policy, rng, used_fields):
+    candidates = [k for k in policy['coverage'] if f"coverage.{k}" not in used_fields]
+    if not candidates:
+        return None
+    key = rng.choice(candidates)
+    policy['coverage'][key] = not policy['coverage'][key]
+    return {"type": "coverage_toggle", "field": f"coverage.{key}",
+            "from": not policy['coverage'][key], "to": policy['coverage'][key]}
+
+MUTATORS = {
+    "limit_change": _mutate_limit,
+    "clause_swap": _mutate_clause,
+    "added_sublimit": _mutate_added_sublimit,
+    "coverage_toggle": _mutate_coverage
+}
+
+def mutate_policy_data(expiring_policy, rng=random, num_mutations=3, mutation_types=MUTATION_TYPES, policy_id=None):
+    """Derive a renewal from an expiring policy by applying a controlled number of mutations.
+       The renewal starts at the expiring policy's expiration date for the same duration and keeps
+       every other field, so the returned field changes are the complete ground truth.
+       Returns (renewal_policy, field_changes)."""
+    renewal = copy.deepcopy(expiring_policy)
+    if policy_id is not None:
+        renewal['policy_id'] = policy_id
+    inception_dt = datetime.strptime(expiring_policy['expiration_date'], '%Y-%m-%d')
+    renewal['inception_date'] = inception_dt.strftime('%Y-%m-%d')
+    renewal['expiration_date'] = (inception_dt + relativedelta(months=+renewal['duration_months'])).strftime('%Y-%m-%d')
+
+    field_changes = []
+    used_fields = set()
+    for _ in range(num_mutations):
+        # Try the requested types in random order until one applies
+        for mutation_type in rng.sample(list(mutation_types), len(mutation_types)):
+            change = MUTATORS[mutation_type](renewal, rng, used_fields)
+            if change:
+                used_fields.add(change["field"])
+                field_changes.append(change)
+                break
+    return renewal, field_changes
+
+def policy_paragraphs(policy_data, is_renewal=False):
+    """Plain-text paragraphs of a policy in the order create_pdf lays them out
+       (title, then one per table row, heading, or clause paragraph)."""
+    def plain(text):
+        return " ".join(re.sub(r'<[^>]+>', ' ', text).split())
+
+    paragraphs = [
+        f"INSURANCE POLICY - {'RENEWAL' if is_renewal else 'ORIGINAL'}",
+        f"Policy Number: {policy_data['policy_number']}",
+        f"Insured Name: {policy_data['insured_name']}",
+        f"Inception Date: {policy_data['inception_date']}",
+        f"Expiration Date: {policy_data['expiration_date']}",
+        f"Duration: {policy_data['duration_months']} months",
+        f"Payment Terms: {policy_data['payment_terms_days']} days from inception",
+        f"Policy Limit: {policy_data['policy_limit']}",
+        "Financial Information",
+        f"Insured Value: {policy_data['insured_value']}",
+        f"Premium: {policy_data['premium']}",
+        f"Brokerage Commission: {policy_data['brokerage_commission_percentage']}",
+        "Deductibles"
+    ]
+    paragraphs += [f"{k.replace('_', ' ').title()}: {v}" for k, v in policy_data['deductibles'].items()]
+    paragraphs += ["Self Insured Retention (SIR)", policy_data['sir'] if policy_data['sir'] else "None", "Sublimits"]
+    paragraphs += [f"{k.replace('_', ' ').title()}: {v}" for k, v in policy_data['sublimits'].items()]
+    paragraphs.append("Exclusions and Clauses")
+    for label, field, _ in CLAUSE_FIELDS:
+        paragraphs.append(f"{label}:")
+        paragraphs += [plain(p) for p in policy_data[field].split("<br/>") if plain(p)]
+    paragraphs.append("Coverage Information")
+    for key, label in [('earthquake', 'Earthquake'), ('strikes_riots_civil_commotion', 'Strikes, Riots, Civil Commotion'),
+                       ('named_windstorm', 'Named Windstorm'), ('flood', 'Flood')]:
+        paragraphs.append(f"{label}: {'Included' if policy_data['coverage'][key] else 'Excluded'}")
+    return paragraphs
+
+def document_paragraphs(pdf_path):
+    """Paragraphs of a rendered policy exactly as test.main_test segments it: OCR text, then main.evaluation_paragraphs."""
+    from main import extract_ocr_text_from_pdf, evaluation_paragraphs
+    return evaluation_paragraphs(extract_ocr_text_from_pdf(pdf_path))
+
+def _comparable_words(paragraph):
+    """Words of a paragraph with dates dropped and case folded, as clean_text_for_comparison ignores them."""
+    return re.sub(r'\b\d{4}-\d{2}-\d{2}\b', '', paragraph).lower().split()
+
+def map_paragraph_labels(source_paragraphs, source_labels, document_paragraphs):
+    """Carry per-paragraph labels of the generated text over to another segmentation of the same
+       document (e.g. the evaluator's OCR paragraphs, see document_paragraphs). The words of both are
+       aligned, and a document paragraph is labelled True if any of its aligned words comes from a
+       True source paragraph; OCR misreads only lose alignment, they never create a label."""
+    source_words, source_owner = [], []
+    for k, paragraph in enumerate(source_paragraphs):
+        words = _comparable_words(paragraph)
+        source_words += words
+        source_owner += [k] * len(words)
+    document_words, document_owner = [], []
+    for k, paragraph in enumerate(document_paragraphs):
+        words = _comparable_words(paragraph)
+        document_words += words
+        document_owner += [k] * len(words)
+
+    labels = [False] * len(document_paragraphs)
+    matcher = difflib.SequenceMatcher(None, source_words, document_words, autojunk=False)
+    for a, b, size in matcher.get_matching_blocks():
+        for offset in range(size):
+            if source_labels[source_owner[a + offset]]:
+                labels[document_owner[b + offset]] = True
+    return labels
+
+def build_annotation(expiring_paragraphs, renewal_paragraphs, field_changes=None, expiring_document=None):
+    """Ground-truth annotation in the ANNOTATIONS/*.json format.
+       expiring_paragraphs / renewal_paragraphs: the generated text of both policies (see policy_paragraphs),
+       so the labels come from the mutations that were applied, never from OCR.
+       paragraph_changes[i] is True if expiring paragraph i has no unchanged counterpart in the
+       renewal; dates and whitespace are ignored, as in clean_text_for_comparison.
+       expiring_document: the expiring policy as the evaluator segments it (see document_paragraphs);
+       when given, the labels are mapped onto those paragraphs (see map_paragraph_labels), so
+       paragraph_changes lines up with the evaluator's predictions."""
+    def comparable(paragraph):
+        return " ".join(_comparable_words(paragraph))
+
+    matcher = difflib.SequenceMatcher(None, [comparable(p) for p in expiring_paragraphs],
+                                      [comparable(p) for p in renewal_paragraphs], autojunk=False)
+    paragraph_changes = [True] * len(expiring_paragraphs)
+    added_paragraphs = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            paragraph_changes[i1:i2] = [False] * (i2 - i1)
+        elif tag in ('insert', 'replace'):
+            added_paragraphs.extend(renewal_paragraphs[j1:j2])
+    if expiring_document is not None:
+        paragraph_changes = map_paragraph_labels(expiring_paragraphs, paragraph_changes, expiring_document)
+        expiring_paragraphs = expiring_document
+    return {
+        "paragraph_changes": paragraph_changes,
+        "expiring_paragraphs": expiring_paragraphs,
+        "added_paragraphs": added_paragraphs,
+        "field_changes": field_changes or []
+    }
+
+def pair_rng(seed, pair_index):
+    """Independent, reproducible random source for one expiring/renewal pair (None -> unseeded)."""
+    if seed is None:
+        return random.Random()
+    return random.Random(f"{seed}:{pair_index}")
+
+def generate_policy_pair(pair_index, insured_name, num_pairs, seed=None, as_of=None, output_dir='policies',
+                         renewal_mode='independent', num_mutations=3, mutation_types=MUTATION_TYPES,
+                         annotation_dir=None, ocr_segmentation=None):
+    """Generate and render one expiring/renewal pair. Runs in a worker process.
+       renewal_mode: 'independent' draws a fresh renewal; 'mutated' derives it from the expiring
+       policy and writes its ground-truth annotation to annotation_dir/<Insured Name>.json.
+       ocr_segmentation: number the annotation's paragraphs as the evaluator's OCR segments the
+       rendered expiring PDF (default: when tesseract is installed); otherwise they follow policy_paragraphs."""
+    rng = pair_rng(seed, pair_index)
+
+    # Generate the expiring policy (original)
+    expiring_policy = generate_policy_data(policy_id=pair_index, insured_name=insured_name,
+                                           override_inception_date=None, is_renewal=False, rng=rng, as_of=as_of)
+    # Generate PDF for expiring policy
+    expiring_filename = create_pdf(expiring_policy, output_dir)
+
+    # For the renewal, override the inception date to be the expiring policy's expiration date.
+    if renewal_mode == 'mutated':
+        renewal_policy, field_changes = mutate_policy_data(expiring_policy, rng, num_mutations=num_mutations,
+                                                           mutation_types=mutation_types,
+                                                           policy_id=num_pairs + pair_index)
+    else:
+        renewal_inception_dt = datetime.strptime(expiring_policy['expiration_date'], '%Y-%m-%d')
+        renewal_policy = generate_policy_data(
+            policy_id=num_pairs + pair_index,  # Ensure a different policy number
+            insured_name=insured_name,
+            override_inception_date=renewal_inception_dt,
+            is_renewal=True,
+            rng=rng
+        )
+    renewal_filename = create_pdf(renewal_policy, output_dir)
+    if renewal_mode == 'mutated':
+        # Labels come from the applied mutations; OCR only decides how they are numbered
+        if ocr_segmentation is None:
+            ocr_segmentation = shutil.which('tesseract') is not None
+        annotation_dir = annotation_dir or os.path.join(output_dir, 'ANNOTATIONS')
+        os.makedirs(annotation_dir, exist_ok=True)
+        annotation = build_annotation(policy_paragraphs(expiring_policy), policy_paragraphs(renewal_policy, is_renewal=True),
+                                      field_changes,
+                                      document_paragraphs(expiring_filename) if ocr_segmentation else None)
+        with open(os.path.join(annotation_dir, f"{insured_name}.json"), 'w') as f:
+            json.dump(annotation, f, indent=2)
+    return [expiring_filename, renewal_filename]
+
+def _generate_policy_pair_args(args):
+    return generate_policy_pair(*args)
+
+def generate_all_policies(num_pairs=150, seed=None, workers=None, output_dir='policies', as_of=None,
+                          renewal_mode='independent', num_mutations=3, mutation_types=MUTATION_TYPES,
+                          annotation_dir=None, ocr_segmentation=None):
     """Generate PDF documents for policy pairs (expiring and corresponding renewal).
        - For each pair, the expiring and renewal policies share the same Insured Name.
        - The renewal policy's inception date is set equal to the expiring policy's expiration date.
-       - The expiring policy is from the previous year relative to the renewal."""
-    output_dir = 'policies'
+       - The expiring policy is from the previous year relative to the renewal.
+       - seed: each pair gets its own random source derived from (seed, pair index), so a run
+         is reproducible regardless of worker count; pass as_of too for identical dates.
+       - workers: number of processes rendering PDFs (None = one per CPU, 1 = serial).
+       - renewal_mode='mutated': renewals are the expiring policy plus num_mutations changes drawn
+         from mutation_types, and a labelled annotation JSON is written per pair (numbered by the
+         OCR segmentation of the expiring PDF when ocr_segmentation, default: if tesseract is installed)."""
     reset_insured_names()
     os.makedirs(output_dir, exist_ok=True)
-    generated_files = []
-    
+    as_of = as_of or datetime.now()
+
+    # Assign insured names up front so they do not depend on scheduling order
+    jobs = []
     for i in range(1, num_pairs + 1):
         # Picks a unique insured name from the pool
-        if INSURED_NAMES_POOL:
-            insured_name = INSURED_NAMES_POOL.pop(0)
-        else:
-            insured_name = f"Company {i}"
-        
-        # Generate the expiring policy (original)
-        expiring_policy = generate_policy_data(policy_id=i, insured_name=insured_name, override_inception_date=None, is_renewal=False)
-        # Generate PDF for expiring policy
-        expiring_filename = create_pdf(expiring_policy, output_dir)
-        generated_files.append(expiring_filename)
-        
-        # For the renewal, override the inception date to be the expiring policy's expiration date.
-        renewal_inception_dt = datetime.strptime(expiring_policy['expiration_date'], '%Y-%m-%d')
-        renewal_policy = generate_policy_data(
-            policy_id=num_pairs + i,  # Ensure a different policy number
-            insured_name=insured_name,
-            override_inception_date=renewal_inception_dt,
-            is_renewal=True
-        )
-        renewal_filename = create_pdf(renewal_policy, output_dir)
-        generated_files.append(renewal_filename)
-    
+        insured_name = INSURED_NAMES_POOL[i - 1] if i <= len(INSURED_NAMES_POOL) else f"Company {i}"
+        jobs.append((i, insured_name, num_pairs, seed, as_of, output_dir,
+                     renewal_mode, num_mutations, tuple(mutation_types), annotation_dir, ocr_segmentation))
+
+    generated_files = []
+    if workers == 1 or num_pairs <= 1:
+        for job in jobs:
+            generated_files.extend(generate_policy_pair(*job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, num_pairs // (4 * (workers or os.cpu_count() or 1)))
+            for files in pool.map(_generate_policy_pair_args, jobs, chunksize=chunksize):
+                generated_files.extend(files)
+
     return generated_files
 
 # Code to generate all policy pairs
-#generate_all_policies(35)
+#generate_all_policies(35, seed=698)
+#generate_all_policies(35, seed=698, renewal_mode='mutated', num_mutations=3)
 #print(f"Generated {len(generated_files)} policy documents in the 'policies' directory")
\ No newline at end of file
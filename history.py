@@ -0,0 +1,190 @@
+import html
+import os
+from datetime import datetime
+from functools import partial
+from cascade import cascade_match, normalize_paragraph
+from clause_index import parse_policy_filename, detect_section
+from main import (DIFF_MAX_CHARS, REPORT_STYLE, clean_text_for_comparison, extract_paragraphs, get_html_diff,
+                  make_encoder, record_cache_stats, render_diffs, renumber_anchors)
+from ocr import FixedOcr, AdaptiveOcr
+from page_cache import PageCache
+from tracing import traced, span, count
+
+def version_label(pdf_path):
+    _, policy_date = parse_policy_filename(pdf_path)
+    return policy_date or os.path.splitext(os.path.basename(pdf_path))[0]
+
+def _policy_date(pdf_path):
+    _, policy_date = parse_policy_filename(pdf_path)
+    for fmt in ("%m-%d-%Y", "%m/%d/%Y", "%m-%d-%y", "%m/%d/%y"):
+        try:
+            return datetime.strptime(policy_date or "", fmt)
+        except ValueError:
+            pass
+    return None
+
+def order_versions(pdf_paths):
+    """Oldest version first, by the policy date in the file names; the given order if any date is missing."""
+    dates = [_policy_date(p) for p in pdf_paths]
+    if None in dates:
+        return list(pdf_paths)
+    return [p for _, p in sorted(zip(dates, pdf_paths), key=lambda pair: pair[0])]
+
+def build_lineages(versions, matches_per_step, min_score=0.5):
+    """
+    Chain paragraphs of consecutive versions into clause lineages.
+    - versions: paragraph lists, oldest first
+    - matches_per_step[k]: cascade_match matches of versions[k] against versions[k + 1]
+    A paragraph continues the lineage of the earlier paragraph matched to it with the highest score
+    (at least `min_score`); unclaimed paragraphs start a new lineage, unmatched ones end theirs.
+    Returns lineages as {"start": version index, "paragraphs": [paragraph index per version from start]}.
+    """
+    lineages = [{"start": 0, "paragraphs": [i]} for i in range(len(versions[0]))] if versions else []
+    owner = list(range(len(lineages)))  # lineage of each paragraph in the current version
+    for k, matches in enumerate(matches_per_step):
+        best = {}  # renewal paragraph -> (score, expiring paragraph)
+        for i, match in enumerate(matches):
+            if match and match["score"] >= min_score:
+                j = match["renewal_index"]
+                if j not in best or match["score"] > best[j][0]:
+                    best[j] = (match["score"], i)
+        next_owner = []
+        for j in range(len(versions[k + 1])):
+            if j in best:
+                lineage_id = owner[best[j][1]]
+            else:
+                lineage_id = len(lineages)
+                lineages.append({"start": k + 1, "paragraphs": []})
+            lineages[lineage_id]["paragraphs"].append(j)
+            next_owner.append(lineage_id)
+        owner = next_owner
+    return lineages
+
+def lineage_events(lineage, versions, clean=None):
+    """Status of a lineage in every version: original, added, unchanged, changed or removed (None before it exists)."""
+    events = [None] * len(versions)
+    start = lineage["start"]
+    previous = None
+    for offset, j in enumerate(lineage["paragraphs"]):
+        v = start + offset
+        text = versions[v][j]
+        if previous is None:
+            events[v] = "original" if v == 0 else "added"
+        elif normalize_paragraph(previous, clean) == normalize_paragraph(text, clean):
+            events[v] = "unchanged"
+        else:
+            events[v] = "changed"
+        previous = text
+    end = start + len(lineage["paragraphs"])
+    if end < len(versions):
+        events[end] = "removed"
+    return events
+
+def render_history_report(pdf_paths, versions, lineages, clean=None):
+    """Build the HTML lineage report: one entry per clause that changed, appeared or disappeared."""
+    labels = [version_label(p) for p in pdf_paths]
+    sections = []
+    for paragraphs in versions:
+        current = None
+        section_of = []
+        for para in paragraphs:
+            current = detect_section(para, current)
+            section_of.append(current)
+        sections.append(section_of)
+
+    parts = ["<html><head><meta charset='UTF-8'><title>Policy Diff - Version History</title>", REPORT_STYLE,
+             "</head><body>", "<h1>Policy Version History</h1>",
+             f"<p>Versions: {' &rarr; '.join(html.escape(label) for label in labels)}</p>"]
+    stable = 0
+    entries = []
+    diff_slots = []  # (entry, position in entry, version, previous text, current text)
+    for lineage in lineages:
+        events = lineage_events(lineage, versions, clean)
+        if all(e in (None, "original", "unchanged") for e in events):
+            stable += 1
+            continue
+        start = lineage["start"]
+        first_text = versions[start][lineage["paragraphs"][0]]
+        section = sections[start][lineage["paragraphs"][0]] or "Policy"
+        snippet = first_text.splitlines()[0][:80]
+        timeline = " &middot; ".join(f"{html.escape(labels[v])}: {e}" for v, e in enumerate(events) if e)
+        entry = [f"<h3>{html.escape(section)}: {html.escape(snippet)}</h3>", f"<p>{timeline}</p>"]
+        for offset, j in enumerate(lineage["paragraphs"]):
+            v = start + offset
+            if events[v] == "added":
+                entry.append(f"<p>Added in {html.escape(labels[v])}:</p><pre>{html.escape(versions[v][j])}</pre>")
+            elif events[v] == "changed":
+                previous = versions[v - 1][lineage["paragraphs"][offset - 1]]
+                diff_slots.append((entry, len(entry), v, previous, versions[v][j]))
+                entry.append(None)
+        entries.append(entry)
+
+    # All diffs go through render_diffs, one batch per pair of consecutive versions (the table headers
+    # name the versions), so each stays within the diff size and time budget
+    with span("diff"):
+        for v in sorted({slot[2] for slot in diff_slots}):
+            slots = [slot for slot in diff_slots if slot[2] == v]
+            make_diff = partial(get_html_diff, fromdesc=labels[v - 1], todesc=labels[v], max_chars=DIFF_MAX_CHARS)
+            for (entry, position, _, _, _), diff_html in zip(slots, render_diffs([s[3:] for s in slots], make_diff)):
+                entry[position] = diff_html
+        # Anchor ids unique across the batches, numbered in report order
+        for (entry, position, _, _, _), diff_html in zip(diff_slots, renumber_anchors(
+                [entry[position] for entry, position, _, _, _ in diff_slots])):
+            entry[position] = diff_html
+    entries = ["\n".join(entry) + "<hr>" for entry in entries]
+    count("lineages", len(lineages))
+    count("lineages_changed", len(entries))
+    parts.append(f"<p>Clauses tracked: {len(lineages)}; with changes: {len(entries)}; "
+                 f"unchanged across all versions: {stable}</p><hr>")
+    parts.extend(entries)
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+def compare_history(pdf_paths, output_path="history_output.html", backend="torch", num_threads=None,
+                    cache_dir=None, adaptive_ocr=False, min_score=0.5):
+    """
+    Compare three or more renewal years of one policy in a single run.
+    Every version is OCR'd and split once (all versions go through one pipeline run), then only
+    consecutive versions are aligned, embedding only the paragraphs the cascade cannot settle
+    (paragraphs that recur across years are embedded once), so the work grows linearly with the number of versions.
+    Writes one lineage report per clause to `output_path` and returns the lineages, oldest version first.
+    """
+    pdf_paths = order_versions(pdf_paths)
+    with traced("history"):
+        cache = PageCache(cache_dir) if cache_dir else None
+        ocr = AdaptiveOcr() if adaptive_ocr else FixedOcr()
+        versions, encode = extract_paragraphs(pdf_paths, make_encoder(backend, num_threads, cache), ocr, cache)
+        count("paragraphs", sum(len(v) for v in versions))
+
+        with span("clean"):
+            cleaned = {p: clean_text_for_comparison(p) for paragraphs in versions for p in paragraphs}
+        with span("similarity"):
+            matches_per_step = []
+            for older, newer in zip(versions, versions[1:]):
+                matches, tier_counts = cascade_match(older, newer, encode, clean=cleaned.__getitem__)
+                matches_per_step.append(matches)
+                for tier, resolved in tier_counts.items():
+                    count(f"tier_{tier}", resolved)
+            lineages = build_lineages(versions, matches_per_step, min_score)
+
+        with span("render"):
+            report = render_history_report(pdf_paths, versions, lineages, cleaned.__getitem__)
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(report)
+        if cache:
+            record_cache_stats(cache)
+    print(f"Version history report written to {output_path}")
+    return [{"versions": [{"version": version_label(pdf_paths[lineage["start"] + offset]),
+                           "text": versions[lineage["start"] + offset][j]}
+                          for offset, j in enumerate(lineage["paragraphs"])],
+             "events": lineage_events(lineage, versions, cleaned.__getitem__)}
+            for lineage in lineages]
+
+if __name__ == "__main__":
+    import logging
+    import sys
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if len(sys.argv) < 3:
+        print("usage: python history.py VERSION.pdf VERSION.pdf [VERSION.pdf ...]")
+        sys.exit(1)
+    compare_history(sys.argv[1:])
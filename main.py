@@ -1,28 +1,53 @@
+import logging
+import multiprocessing
 import os
+import pickle
 import re
-import nltk
-from nltk.tokenize import sent_tokenize
-os.environ["TOKENIZERS_PARALLELISM"] = "false"
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
 import difflib
-from pdf2image import convert_from_path
-import pytesseract
+import signal
+import threading
+import time
+from collections import Counter, deque
+from html import escape
+from multiprocessing.connection import wait as wait_for_connections
+import numpy as np
+from clause_index import ClauseIndex, index_policy
+from embeddings import load_embedding_model, encode_paragraphs
+from embedding_server import EmbeddingClient, SOCKET_ENV as EMBEDDING_SOCKET_ENV
+from execution import configure, current_plan
+from cascade import cascade_match, format_tier_counts
+from ocr import FixedOcr, AdaptiveOcr, summarize_ocr
+from page_cache import PageCache
+from pipeline import process_documents
+from report_store import ReportStore, make_record
+from sentence_diff import localize_changes, render_sentence_diff, sent_tokenize
+from tracing import traced, span, count
+
+logger = logging.getLogger("policy_diff")
 
-# download tokenizer
-nltk.download('punkt')
+# Heavy dependencies (torch, sentence_transformers, pdf2image, pytesseract, nltk) are imported
+# on first use, so importing this module stays cheap and never touches the network.
+# NLTK data is looked up locally (see sentence_diff.sent_tokenize), never downloaded at import time.
 
-def extract_ocr_text_from_pdf(pdf_path, dpi=300):
+def extract_ocr_text_from_pdf(pdf_path, dpi=300, ocr=None):
     """
     Extract full text from a PDF using OCR.
+    `ocr` selects the OCR settings, e.g. ocr.AdaptiveOcr() (default: every page at `dpi`).
     """
-    pages = convert_from_path(pdf_path, dpi=dpi)
-    text = ""
-    for page in pages:
-        page_text = pytesseract.image_to_string(page)
-        text += page_text + "\n"
-    return text
+    texts, reports = (ocr or FixedOcr(dpi)).extract_pages(pdf_path)
+    log_ocr_summary(pdf_path, reports)
+    return "".join(page_text + "\n" for page_text in texts)
+
+def log_ocr_summary(pdf_path, reports):
+    """Log per-page OCR resolution and confidence (debug) and a per-document summary."""
+    for report in reports:
+        logger.debug("%s page %s: %s DPI, confidence %s%s", os.path.basename(pdf_path), report.get("page"),
+                     report["dpi"], report.get("confidence", "n/a"), " (escalated)" if report.get("escalated") else "")
+    summary = summarize_ocr(reports)
+    if summary["pages"] and summary["mean_confidence"] is not None:
+        logger.info("%s: %d pages OCR'd, %d escalated, mean confidence %.1f, %.0f%% of full-resolution pixels",
+                    os.path.basename(pdf_path), summary["pages"], summary["escalated"],
+                    summary["mean_confidence"], 100 * summary["pixel_share"])
 
 def smart_split_into_paragraphs(text):
     """
@@ -31,15 +56,248 @@ def smart_split_into_paragraphs(text):
     paragraphs = re.split(r'\n\s*\n', text)
     return [p.strip() for p in paragraphs if p.strip()]
 
-def get_html_diff(exp_text, ren_text, context=False, numlines=0):
+# Diff budget per paragraph pair: text over DIFF_MAX_CHARS characters, or a diff running longer than
+# DIFF_SECONDS (both configurable through the environment), is replaced by a coarse summary (see coarse_diff), so a page OCR'd as one paragraph
+# cannot stall the report
+DIFF_MAX_CHARS = int(os.environ.get("POLICY_DIFF_MAX_DIFF_CHARS", 20_000))
+DIFF_SECONDS = float(os.environ.get("POLICY_DIFF_DIFF_SECONDS", 2.0))
+
+# One HtmlDiff per thread: make_table keeps per-call state on the instance; also counts the
+# coarse summaries the thread has produced (see budgeted_diff)
+_html_diff = threading.local()
+
+def evaluation_paragraphs(text):
+    """
+    Paragraphs of OCR text as the paragraph-level evaluation counts them (test.main_test, and the
+    annotations generate_policies writes for it): dates and policy numbers removed, then split.
+    """
+    return smart_split_into_paragraphs(clean_text_for_comparison(text))
+
+def get_html_diff(exp_text, ren_text, context=False, numlines=0, fromdesc="Expiring", todesc="Renewal",
+                  max_chars=None):
     """
     Generate an HTML diff table comparing two text blocks.
+    With `max_chars`, longer pairs get a coarse summary instead (see coarse_diff).
+    """
+    if max_chars is not None and len(exp_text) + len(ren_text) > max_chars:
+        return coarse_diff(exp_text, ren_text, f"{len(exp_text) + len(ren_text):,} characters, "
+                                               f"over the {max_chars:,} character budget")
+    if not hasattr(_html_diff, "instance"):
+        _html_diff.instance = difflib.HtmlDiff(wrapcolumn=80)
+    return _html_diff.instance.make_table(exp_text.splitlines(),
+                                          ren_text.splitlines(),
+                                          fromdesc=fromdesc, todesc=todesc,
+                                          context=context, numlines=numlines)
+
+def get_sentence_diff(exp_text, ren_text):
+    """
+    Diff only the sentences that changed between two paragraphs (see sentence_diff.py);
+    short paragraphs are diffed whole with get_html_diff. Each diffed run is held to DIFF_MAX_CHARS.
     """
-    hd = difflib.HtmlDiff(wrapcolumn=80)
-    return hd.make_table(exp_text.splitlines(),
-                         ren_text.splitlines(),
-                         fromdesc="Expiring", todesc="Renewal",
-                         context=context, numlines=numlines)
+    return render_sentence_diff(exp_text, ren_text,
+                                lambda exp_run, ren_run: get_html_diff(exp_run, ren_run, max_chars=DIFF_MAX_CHARS))
+
+def coarse_diff(exp_text, ren_text, reason):
+    """
+    Stand-in for a diff that is over budget, computed in linear time: word counts of both
+    sides and a sample of the words removed and added, under a clear "coarse summary" marker.
+    """
+    _html_diff.coarse = getattr(_html_diff, "coarse", 0) + 1
+    exp_words, ren_words = Counter(exp_text.split()), Counter(ren_text.split())
+    removed, added = exp_words - ren_words, ren_words - exp_words
+
+    def sample(words, limit=40):
+        listed = list(words.elements())
+        return escape(" ".join(listed[:limit])) + (" &hellip;" if len(listed) > limit else "")
+
+    return (f"<div class='coarse_diff'><p><b>Coarse summary (full diff skipped: {escape(reason)})</b></p>"
+            f"<p>Expiring: {sum(exp_words.values()):,} words; Renewal: {sum(ren_words.values()):,} words; "
+            f"{sum(removed.values()):,} removed, {sum(added.values()):,} added</p>"
+            f"<p class='diff_sub'>Removed: {sample(removed)}</p><p class='diff_add'>Added: {sample(added)}</p></div>")
+
+class _DiffTimeout(Exception):
+    pass
+
+def _raise_diff_timeout(signum, frame):
+    raise _DiffTimeout()
+
+def budgeted_diff(make_diff, exp_text, ren_text, seconds=DIFF_SECONDS):
+    """
+    make_diff(exp_text, ren_text), or a coarse summary if it runs longer than `seconds`.
+    The time limit is a SIGALRM timer, so it only applies in a main thread; render_diffs runs every
+    diff in a worker process, where it always holds. Returns (html, number of coarse summaries in it),
+    counting those of the size budget too, wherever make_diff nests them.
+    """
+    timed = bool(seconds) and hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+    if timed:
+        previous = signal.signal(signal.SIGALRM, _raise_diff_timeout)
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+    coarse_before = getattr(_html_diff, "coarse", 0)
+    try:
+        diff_html = make_diff(exp_text, ren_text)
+        return diff_html, _html_diff.__dict__.get("coarse", 0) - coarse_before
+    except _DiffTimeout:
+        return coarse_diff(exp_text, ren_text, f"took longer than {seconds:g} s"), 1
+    finally:
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+def _load_sentence_tokenizer():
+    """
+    Import NLTK and load punkt before any diff runs under the timer: an import cut short by
+    the timer would leave NLTK half-initialized for every later diff in the process.
+    """
+    try:
+        sent_tokenize("Loaded.")
+    except LookupError:
+        pass
+
+# How long past the diff budget a worker may stay silent (stuck where the timer cannot interrupt it,
+# e.g. inside a C extension) before it is killed
+DIFF_GRACE_SECONDS = 1.0
+
+def _diff_worker(conn, make_diff, seconds):
+    """Worker process of render_diffs: diff the pairs sent over `conn`, one at a time, until it gets None."""
+    _load_sentence_tokenizer()
+    conn.send(None)  # ready
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        conn.send(budgeted_diff(make_diff, *job, seconds))
+
+def _diff_in_workers(make_diff, pairs, workers, seconds, context):
+    """
+    Diff `pairs` in `workers` processes, each handed one pair at a time. A worker that has not answered
+    DIFF_GRACE_SECONDS after the budget is killed and replaced, and its pair gets a coarse summary.
+    Returns (html, number of coarse summaries) per pair, as budgeted_diff.
+    """
+    results = [None] * len(pairs)
+    queued = deque(range(len(pairs)))
+    idle = []
+    busy = {}  # connection -> (process, pair index, deadline)
+
+    def start_worker():
+        conn, child_conn = context.Pipe()
+        process = context.Process(target=_diff_worker, args=(child_conn, make_diff, seconds), daemon=True)
+        process.start()
+        child_conn.close()
+        conn.recv()
+        return conn, process
+
+    def stop_worker(conn, process):
+        # A forked worker also holds copies of the parent's connections, so it is told to stop rather
+        # than left to notice the connection closing
+        try:
+            conn.send(None)
+        except OSError:
+            pass
+        conn.close()
+        process.join(timeout=DIFF_GRACE_SECONDS)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    try:
+        while queued or busy:
+            while queued and len(busy) < workers:
+                conn, process = idle.pop() if idle else start_worker()
+                i = queued.popleft()
+                conn.send(pairs[i])
+                deadline = time.monotonic() + seconds + DIFF_GRACE_SECONDS if seconds else None
+                busy[conn] = (process, i, deadline)
+
+            deadlines = [deadline for _, _, deadline in busy.values() if deadline is not None]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            for conn in wait_for_connections(list(busy), timeout):
+                process, i, _ = busy.pop(conn)
+                try:
+                    results[i] = conn.recv()
+                    idle.append((conn, process))
+                except EOFError:  # the worker died, e.g. out of memory
+                    results[i] = coarse_diff(*pairs[i], "the diff process exited"), 1
+                    stop_worker(conn, process)
+
+            now = time.monotonic()
+            for conn, (process, i, deadline) in list(busy.items()):
+                if deadline is not None and now > deadline:
+                    del busy[conn]
+                    process.kill()
+                    stop_worker(conn, process)
+                    results[i] = coarse_diff(*pairs[i], f"took longer than {seconds:g} s"), 1
+    finally:
+        for conn, process in idle + [(conn, process) for conn, (process, _, _) in busy.items()]:
+            stop_worker(conn, process)
+    return results
+
+# HtmlDiff anchor ids: "from3_12", "to3_12" (lines) and "difflib_chg_to3__1" (change links), 3 being the table number
+_DIFF_ANCHOR = re.compile(r'((?:id|href)="#?(?:difflib_chg_)?(?:from|to))(\d+)(_)')
+
+def renumber_anchors(diffs):
+    """
+    Give every HtmlDiff table in `diffs` its own anchor number, in order. Tables diffed in different
+    processes, or taken from the cache, are numbered independently and would otherwise share ids.
+    """
+    next_number = 0
+    renumbered = []
+    for diff_html in diffs:
+        numbers = {}
+
+        def replace(match):
+            nonlocal next_number
+            if match.group(2) not in numbers:
+                numbers[match.group(2)] = next_number
+                next_number += 1
+            return f"{match.group(1)}{numbers[match.group(2)]}{match.group(3)}"
+        renumbered.append(_DIFF_ANCHOR.sub(replace, diff_html))
+    return renumbered
+
+def render_diffs(pairs, make_diff=None, cache=None, workers=None, seconds=DIFF_SECONDS):
+    """
+    Diff a batch of (expiring, renewal) paragraph pairs, each within the time budget (see budgeted_diff).
+    Pairs not in `cache` (a PageCache) are diffed by up to `workers` worker processes (default: the
+    execution plan's threads), so the budget holds whichever thread calls this; a worker stuck past it
+    is killed (see _diff_in_workers). Without fork, a make_diff that cannot be pickled, e.g. a lambda,
+    runs in this process and only its size budget holds off the main thread.
+    Returns the diffs in order, with anchor ids unique across the batch (see renumber_anchors).
+    """
+    make_diff = make_diff or get_sentence_diff
+    diffs = [cache.lookup_diff(make_diff, exp_text, ren_text) if cache else None for exp_text, ren_text in pairs]
+    missing = [i for i, diff_html in enumerate(diffs) if diff_html is None]
+
+    context = None
+    if missing:
+        # Forked workers inherit make_diff and the loaded tokenizer; spawned ones need make_diff pickled
+        _load_sentence_tokenizer()
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        else:
+            try:
+                pickle.dumps(make_diff)
+                context = multiprocessing.get_context()
+            except (pickle.PicklingError, AttributeError, TypeError):
+                pass
+    missing_pairs = [pairs[i] for i in missing]
+    if context:
+        workers = max(1, min(workers or current_plan().threads, len(missing)))
+        results = _diff_in_workers(make_diff, missing_pairs, workers, seconds, context)
+    else:
+        results = [budgeted_diff(make_diff, exp_text, ren_text, seconds) for exp_text, ren_text in missing_pairs]
+
+    # Counted here: counters incremented in worker processes would be lost
+    count("diffs_coarse", sum(coarse for _, coarse in results))
+    for i, (diff_html, coarse) in zip(missing, results):
+        diffs[i] = diff_html
+        # A coarse summary, even of one sentence run, is only as good as the budget it was made under
+        # (a timed-out diff may fit on a less busy run, a raised DIFF_MAX_CHARS fits more), so only
+        # complete diffs are cached
+        if cache and not coarse:
+            cache.store_diff(make_diff, pairs[i][0], pairs[i][1], diff_html)
+    return renumber_anchors(diffs)
 
 def wrap_in_div(html_content, title):
     """Wrap given HTML content in a div with a header title."""
@@ -75,10 +333,7 @@ def clean_text_for_comparison(text):
     
     return text.strip()
 
-def main(expiring_pdf, renewal_pdf, threshold=0.95):
-    html_parts = []
-    html_parts.append("<html><head><meta charset='UTF-8'><title>Policy Diff - Entire Policy</title>")
-    html_parts.append("""
+REPORT_STYLE = """
     <style>
     body { font-family: Calibri, sans-serif; }
     table.diff {font-family:Courier; border:medium;}
@@ -87,51 +342,244 @@ def main(expiring_pdf, renewal_pdf, threshold=0.95):
     .diff_add {background-color:#aaffaa}
     .diff_chg {background-color:#ffff77}
     .diff_sub {background-color:#ffaaaa}
+    .coarse_diff {border: 1px dashed #888; padding: 0 10px;}
     pre { background-color: #f4f4f4; padding: 10px; }
     </style>
-    """)
+    """
+
+def render_report(expiring_paragraphs, renewal_paragraphs, matches, tier_counts=None, make_diff=None, cache=None):
+    """
+    Build the HTML comparison report from matched paragraphs.
+    Returns (html, detected_change).
+    """
+    changes = find_changes(expiring_paragraphs, renewal_paragraphs, matches)
+    html = render_changes_report(changes, len(expiring_paragraphs), len(renewal_paragraphs), tier_counts,
+                                 make_diff, cache)
+    return html, bool(changes)
+
+def render_changes_report(changes, num_expiring, num_renewal, tier_counts=None, make_diff=None, cache=None):
+    """
+    Build the HTML comparison report from the changed paragraphs only (see find_changes).
+    The diffs are rendered as one parallel batch first (see render_diffs).
+    """
+    with span("diff"):
+        diffs = render_diffs([(change["expiring"], change["renewal"]) for change in changes], make_diff, cache)
+    count("diffs", len(diffs))
+    html_parts = []
+    html_parts.append("<html><head><meta charset='UTF-8'><title>Policy Diff - Entire Policy</title>")
+    html_parts.append(REPORT_STYLE)
     html_parts.append("</head><body>")
     html_parts.append("<h1>Expiring vs. Renewal Policy Comparison Report</h1>")
+    html_parts.append(f"<p>Number of paragraphs in Expiring Policy: {num_expiring}</p>")
+    html_parts.append(f"<p>Number of paragraphs in Renewal Policy: {num_renewal}</p>")
+    if tier_counts:
+        html_parts.append(f"<p>Paragraphs resolved by tier: {format_tier_counts(tier_counts)}</p>")
 
-    # Step 1: Extract full OCR text from both PDFs
-    expiring_text = extract_ocr_text_from_pdf(expiring_pdf)
-    renewal_text = extract_ocr_text_from_pdf(renewal_pdf)
-
-    # Step 2: Split full OCR text into paragraphs
-    expiring_paragraphs = smart_split_into_paragraphs(expiring_text)
-    renewal_paragraphs = smart_split_into_paragraphs(renewal_text)
-    
-    html_parts.append(f"<p>Number of paragraphs in Expiring Policy: {len(expiring_paragraphs)}</p>")
-    html_parts.append(f"<p>Number of paragraphs in Renewal Policy: {len(renewal_paragraphs)}</p>")
-    
-    # Step 3: Compare paragraphs using sentence embeddings
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    exp_embeddings = model.encode(expiring_paragraphs)
-    ren_embeddings = model.encode(renewal_paragraphs)
-    similarity_matrix = cosine_similarity(exp_embeddings, ren_embeddings)
+    for diff_html in diffs:
+        html_parts.append(wrap_in_div(diff_html, "Please review change in policy"))
+        html_parts.append("<hr>")
     
-    detected_change = False
+    html_parts.append("</body></html>")
+    return "\n".join(html_parts)
+
+def find_changes(expiring_paragraphs, renewal_paragraphs, matches):
+    """
+    The expiring paragraphs that differ from their renewal counterpart, in document order, as
+    {"index", "expiring", "renewal", "score", "tier", "sentences"} dicts (renewal is "" when nothing
+    matched). "sentences" locates the changed runs of sentences (see sentence_diff.localize_changes)
+    by sentence numbers and character spans, without their text; it is empty when nothing matched.
+    """
+    changes = []
     for i, exp_para in enumerate(expiring_paragraphs):
-        j = np.argmax(similarity_matrix[i])
-        max_sim = similarity_matrix[i][j]
-        ren_para = renewal_paragraphs[j]
-        
+        match = matches[i]
+        ren_para = renewal_paragraphs[match["renewal_index"]] if match else ""
         if exp_para != ren_para:
-            detected_change = True
-            diff_html = get_html_diff(exp_para, ren_para, context=False)
-            html_parts.append(wrap_in_div(diff_html, "Please review change in policy"))
-            html_parts.append("<hr>")
-    
-    html_parts.append("</body></html>")
-    output_html = "\n".join(html_parts)
-    
-    with open("diff_output.html", "w", encoding="utf-8") as f:
-        f.write(output_html)
+            sentences = [{key: value for key, value in run.items() if key not in ("expiring", "renewal")}
+                         for run in localize_changes(exp_para, ren_para)] if ren_para else []
+            changes.append({"index": i, "expiring": exp_para, "renewal": ren_para,
+                            "score": match["score"] if match else 0.0, "tier": match["tier"] if match else None,
+                            "sentences": sentences})
+    return changes
+
+def _with_prefetched(encode, prefetched):
+    """Wrap an encode function so paragraphs already embedded (by the pipeline or an earlier call) are looked up, not re-encoded."""
+    def encode_with_prefetched(paragraphs):
+        missing = [p for p in dict.fromkeys(paragraphs) if p not in prefetched]
+        if missing:
+            prefetched.update(zip(missing, encode(missing)))
+        if not paragraphs:
+            return encode(paragraphs)
+        return np.vstack([prefetched[p] for p in paragraphs])
+    return encode_with_prefetched
+
+def make_encoder(backend="torch", num_threads=None, cache=None):
+    """
+    The encode function of the cascade: paragraphs -> embeddings, through the page cache if given.
+    When POLICY_DIFF_EMBEDDING_SOCKET is set, paragraphs are encoded by the shared embedding server
+    on that socket (see embedding_server.py) instead of a model loaded in this process.
+    `num_threads` defaults to the torch budget of the execution plan (see execution.py).
+    """
+    num_threads = num_threads or current_plan().torch_threads
+    socket_path = os.environ.get(EMBEDDING_SOCKET_ENV)
+    client = EmbeddingClient(socket_path) if socket_path else None
+
+    def encode(paragraphs):
+        with span("encode", paragraphs=len(paragraphs)):
+            if client:
+                return client.encode(paragraphs)
+            model = load_embedding_model(backend, num_threads=num_threads)
+            return encode_paragraphs(model, paragraphs)
+    if cache:
+        # Server embeddings are keyed by the server's backend, which need not match the local one
+        namespace = (lambda: f"server-{client.backend}") if client else backend
+        encode = cache.cached_encode(encode, namespace=namespace)
+    return encode
+
+def embedding_backend(backend="torch"):
+    """The backend that actually embeds paragraphs: the embedding server's when one is configured (see make_encoder)."""
+    socket_path = os.environ.get(EMBEDDING_SOCKET_ENV)
+    return EmbeddingClient(socket_path).backend if socket_path else backend
+
+def extract_paragraphs(pdf_paths, encode, ocr=None, cache=None, eager_encode=False, ocr_workers=None):
+    """
+    OCR and split any number of PDFs in one pipeline run, each document once.
+    Returns (paragraph lists in input order, encode function that embeds each paragraph at most once).
+    Encoding is left to the caller's cascade, which embeds only the paragraphs it cannot settle by hash
+    or lexical match. With `eager_encode`, every paragraph is embedded inside the pipeline while later
+    pages are still in OCR instead, which only pays off when most paragraphs end up encoded anyway.
+    """
+    ocr = ocr or FixedOcr()
+    known_texts = {}
+    if cache:
+        for i, pdf_path in enumerate(pdf_paths):
+            texts = cache.lookup_document(pdf_path, ocr)
+            if texts is not None:
+                known_texts[i] = texts
+    with span("extract"):
+        ocr_page = (lambda image, rerender: cache.ocr_page(image, ocr, rerender)) if cache else None
+        documents, prefetched = process_documents(pdf_paths, encode=encode if eager_encode else None, ocr=ocr,
+                                                  ocr_page=ocr_page, page_texts=known_texts, ocr_workers=ocr_workers)
+    for i, doc in enumerate(documents):
+        log_ocr_summary(doc["pdf_path"], doc["ocr"])
+        if cache and i not in known_texts:
+            cache.remember_document(doc["pdf_path"], doc["pages"], ocr)
+    return [doc["paragraphs"] for doc in documents], _with_prefetched(encode, prefetched)
+
+def record_cache_stats(cache):
+    count("cache_hits", cache.stats["pages_cached"] + cache.stats["embeddings_cached"] + cache.stats["diffs_cached"])
+    for name, value in cache.stats.items():
+        count(f"cache_{name}", value)
+
+def main(expiring_pdf, renewal_pdf, threshold=0.95, index_path=None, backend="torch", num_threads=None,
+         cache_dir=None, pipelined=True, adaptive_ocr=False, report_dir=None, eager_encode=False):
+    with traced("compare"):
+        detected_change = compare_policies(expiring_pdf, renewal_pdf, index_path, backend, num_threads, cache_dir,
+                                           pipelined, adaptive_ocr, report_dir, eager_encode=eager_encode)
     print("HTML diff report written to diff_output.html")
+    return detected_change
+
+def compare_policies(expiring_pdf, renewal_pdf, index_path=None, backend="torch", num_threads=None,
+                     cache_dir=None, pipelined=True, adaptive_ocr=False, report_dir=None,
+                     output_path="diff_output.html", eager_encode=False):
+    """
+    The comparison pipeline behind main(), with a span around every stage:
+    analyze_policies(), then the HTML report written to `output_path`.
+    With `report_dir`, the result is also archived in a compressed report store (see report_store.py).
+    """
+    # Reuse per-page OCR, embeddings and diffs from earlier drafts when a cache is given
+    cache = PageCache(cache_dir) if cache_dir else None
+    result = analyze_policies(expiring_pdf, renewal_pdf, index_path, backend, num_threads, cache,
+                              pipelined, adaptive_ocr, eager_encode)
+
+    # Step 4: Diff the changed paragraphs into the HTML report
+    with span("render"):
+        output_html, detected_change = render_report(result["expiring_paragraphs"], result["renewal_paragraphs"],
+                                                     result["matches"], result["tier_counts"], cache=cache)
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(output_html)
+
+    if report_dir:
+        with span("archive"):
+            ReportStore(report_dir).save(make_record(expiring_pdf, renewal_pdf, result))
+
+    if cache:
+        record_cache_stats(cache)
 
     return detected_change
 
+def analyze_policies(expiring_pdf, renewal_pdf, index_path=None, backend="torch", num_threads=None,
+                     cache=None, pipelined=True, adaptive_ocr=False, eager_encode=False):
+    """
+    Extract, split and match both policies, without rendering anything.
+    With `pipelined`, both documents are rendered, OCR'd and split concurrently
+    (see pipeline.process_documents) instead of one stage after the other. Paragraphs are then
+    embedded only where the cascade needs them, unless `eager_encode` embeds all of them in the pipeline.
+    With `index_path`, the policies are also added to that clause index, which embeds every paragraph
+    the cascade did not (see the "index_encode" span).
+    With `adaptive_ocr`, pages are OCR'd at a lower resolution first and re-OCR'd at full
+    resolution only when tesseract's confidence is low (see ocr.AdaptiveOcr).
+    Returns a dict with the paragraphs of both policies, the matches, tier counts and the changes
+    (see find_changes).
+    """
+    ocr = AdaptiveOcr() if adaptive_ocr else FixedOcr()
+    # OCR and encoding share the CPUs only when the pipeline encodes while pages are still in OCR
+    plan = current_plan().overlapping() if pipelined and eager_encode else current_plan()
+    encode = make_encoder(backend, num_threads or plan.torch_threads, cache)
+
+    if pipelined:
+        # Steps 1-2 overlapped: paragraphs are split out while later pages are still in OCR
+        (expiring_paragraphs, renewal_paragraphs), encode = extract_paragraphs([expiring_pdf, renewal_pdf],
+                                                                                encode, ocr, cache, eager_encode,
+                                                                                plan.ocr_workers)
+    else:
+        # Step 1: Extract full OCR text from both PDFs
+        extract_text = cache.extract_text if cache else extract_ocr_text_from_pdf
+        with span("extract"):
+            expiring_text = extract_text(expiring_pdf, ocr=ocr)
+            renewal_text = extract_text(renewal_pdf, ocr=ocr)
+
+        # Step 2: Split full OCR text into paragraphs
+        with span("split"):
+            expiring_paragraphs = smart_split_into_paragraphs(expiring_text)
+            renewal_paragraphs = smart_split_into_paragraphs(renewal_text)
+        # Embed each paragraph at most once, as the pipeline does
+        encode = _with_prefetched(encode, {})
+    count("paragraphs", len(expiring_paragraphs) + len(renewal_paragraphs))
+
+    with span("clean"):
+        cleaned = {p: clean_text_for_comparison(p) for p in expiring_paragraphs + renewal_paragraphs}
+    
+    # Step 3: Match paragraphs with the cheapest test that settles them (hash, lexical, then embeddings)
+    with span("similarity"):
+        matches, tier_counts = cascade_match(expiring_paragraphs, renewal_paragraphs, encode,
+                                             clean=cleaned.__getitem__)
+    if pipelined and eager_encode:
+        # The pipeline embedded every paragraph, not just the ones the cascade left uncertain
+        tier_counts["encoded"] = len(set(expiring_paragraphs + renewal_paragraphs))
+    for tier, resolved in tier_counts.items():
+        count(f"tier_{tier}", resolved)
+
+    # Opt-in: the clause index needs every paragraph embedded, not just the ones the cascade embedded
+    # (those are reused). The rest are encoded here, timed as "index_encode" apart from the comparison.
+    if index_path:
+        with span("index"):
+            with span("index_encode"):
+                expiring_embeddings, renewal_embeddings = encode(expiring_paragraphs), encode(renewal_paragraphs)
+            index = ClauseIndex.load(index_path, backend=embedding_backend(backend))
+            index_policy(index, expiring_pdf, expiring_paragraphs, expiring_embeddings)
+            index_policy(index, renewal_pdf, renewal_paragraphs, renewal_embeddings)
+            index.save()
+        count("paragraphs_indexed", len(expiring_paragraphs) + len(renewal_paragraphs))
+
+    changes = find_changes(expiring_paragraphs, renewal_paragraphs, matches)
+    count("paragraphs_flagged", len(changes))
+    return {"expiring_paragraphs": expiring_paragraphs, "renewal_paragraphs": renewal_paragraphs,
+            "matches": matches, "tier_counts": tier_counts, "changes": changes}
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Thread budgets from POLICY_DIFF_WORKERS / POLICY_DIFF_THREADS (default: all CPUs for this one comparison)
+    configure()
     expiring_pdf = "/Users/kristinlussi/Documents/GitHub/DATA698/Slip-Examples/ABC COMPANY @ 04-01-2024.pdf"
     renewal_pdf = "/Users/kristinlussi/Documents/GitHub/DATA698/Slip-Examples/ABC COMPANY @ 04-01-2025.pdf"
     main(expiring_pdf, renewal_pdf, threshold=0.95)
\ No newline at end of file
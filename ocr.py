@@ -0,0 +1,153 @@
+import numpy as np
+from tracing import count
+
+DEFAULT_DPI = 300
+
+def otsu_threshold(gray):
+    """Grey level that best separates ink from paper (Otsu's method) for an 8-bit greyscale image."""
+    hist = np.bincount(np.asarray(gray, dtype=np.uint8).ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    w0 = np.cumsum(hist)
+    w1 = w0[-1] - w0
+    sum0 = np.cumsum(hist * levels)
+    mu0 = sum0 / np.clip(w0, 1e-9, None)
+    mu1 = (sum0[-1] - sum0) / np.clip(w1, 1e-9, None)
+    return int(np.argmax(w0 * w1 * (mu0 - mu1) ** 2))
+
+def preprocess_page(image, binarize=True):
+    """Greyscale (and optionally binarize) a rendered page; tesseract does less work on clean two-tone input."""
+    gray = image.convert("L")
+    if not binarize:
+        return gray
+    threshold = otsu_threshold(gray)
+    return gray.point(lambda v: 255 if v > threshold else 0)
+
+def text_from_data(data):
+    """
+    Rebuild page text from pytesseract.image_to_data output the way image_to_string lays it out:
+    words joined by spaces, lines by newlines, paragraphs and blocks separated by a blank line.
+    """
+    parts = []
+    previous = None
+    for i, word in enumerate(data["text"]):
+        if data["level"][i] != 5 or not word.strip():
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if previous is None:
+            parts.append(word)
+        elif key[:2] != previous[:2]:
+            parts.append("\n\n" + word)
+        elif key != previous:
+            parts.append("\n" + word)
+        else:
+            parts.append(" " + word)
+        previous = key
+    return "".join(parts) + "\n" if parts else ""
+
+def page_confidence(data):
+    """Mean tesseract word confidence (0-100) of a page; 0 when nothing was recognized."""
+    confidences = [float(c) for c, word in zip(data["conf"], data["text"]) if float(c) >= 0 and word.strip()]
+    return sum(confidences) / len(confidences) if confidences else 0.0
+
+class FixedOcr:
+    """
+    OCR every page at one resolution with tesseract's default settings (the original behaviour).
+    OCR engines render pages at `dpi` and OCR them with ocr_page(), which returns (text, report).
+    """
+
+    def __init__(self, dpi=DEFAULT_DPI):
+        self.dpi = dpi
+
+    @property
+    def key(self):
+        """Identifies the settings, so cached OCR text from other settings is not reused."""
+        return f"fixed-{self.dpi}"
+
+    def ocr_page(self, image, rerender=None):
+        import pytesseract
+        return pytesseract.image_to_string(image), {"dpi": self.dpi, "rendered": [self.dpi]}
+
+    def extract_pages(self, pdf_path):
+        """OCR a whole PDF; returns (page texts, per-page reports)."""
+        from pdf2image import convert_from_path
+
+        texts, reports = [], []
+        for page_number, image in enumerate(convert_from_path(pdf_path, dpi=self.dpi)):
+            rerender = lambda dpi, n=page_number: render_page(pdf_path, n, dpi)
+            text, report = self.ocr_page(image, rerender)
+            texts.append(text)
+            reports.append(dict(report, page=page_number + 1))
+        count("pages", len(texts))
+        return texts, reports
+
+class AdaptiveOcr(FixedOcr):
+    """
+    OCR pages at a reduced resolution first and escalate only the pages tesseract is unsure about.
+    - dpi: first-pass resolution; 200 DPI is about 44% of the pixels of 300 DPI
+    - max_dpi: resolution for pages whose mean word confidence is below `min_confidence`
+    - psm: tesseract page segmentation mode (4 = single column of variable-size text, which suits slips)
+    - binarize: greyscale + Otsu binarization before OCR
+    """
+
+    def __init__(self, dpi=200, max_dpi=DEFAULT_DPI, min_confidence=80.0, psm=4, binarize=True):
+        super().__init__(dpi)
+        self.max_dpi = max_dpi
+        self.min_confidence = min_confidence
+        self.psm = psm
+        self.binarize = binarize
+
+    @property
+    def key(self):
+        return f"adaptive-{self.dpi}-{self.max_dpi}-{self.min_confidence:g}-psm{self.psm}-{int(self.binarize)}"
+
+    def _ocr(self, image):
+        import pytesseract
+        data = pytesseract.image_to_data(preprocess_page(image, self.binarize), config=f"--psm {self.psm}",
+                                         output_type=pytesseract.Output.DICT)
+        return text_from_data(data), page_confidence(data)
+
+    def ocr_page(self, image, rerender=None):
+        text, confidence = self._ocr(image)
+        report = {"dpi": self.dpi, "confidence": confidence, "escalated": False, "rendered": [self.dpi]}
+        if confidence < self.min_confidence and rerender is not None and self.max_dpi > self.dpi:
+            count("ocr_pages_escalated")
+            high_text, high_confidence = self._ocr(rerender(self.max_dpi))
+            report["escalated"] = True
+            report["rendered"].append(self.max_dpi)
+            if high_confidence >= confidence:
+                text = high_text
+                report.update(dpi=self.max_dpi, confidence=high_confidence)
+        return text, report
+
+def render_page(pdf_path, page_number, dpi):
+    """Render one page (0-based) of a PDF."""
+    from pdf2image import convert_from_path
+    return convert_from_path(pdf_path, dpi=dpi, first_page=page_number + 1, last_page=page_number + 1)[0]
+
+def summarize_ocr(reports, full_dpi=DEFAULT_DPI):
+    """
+    Summarize per-page OCR reports: pages, escalations, mean confidence and the pixels
+    rendered relative to OCR'ing every page once at `full_dpi`.
+    """
+    pages = [r for r in reports if not r.get("cached")]
+    if not pages:
+        return {"pages": 0, "escalated": 0, "mean_confidence": None, "pixel_share": 0.0}
+    # Escalated pages count twice: they were rendered and OCR'd at both resolutions
+    pixels = sum((dpi / full_dpi) ** 2 for r in pages for dpi in r["rendered"])
+    confidences = [r["confidence"] for r in pages if "confidence" in r]
+    return {"pages": len(pages), "escalated": sum(1 for r in pages if r.get("escalated")),
+            "mean_confidence": sum(confidences) / len(confidences) if confidences else None,
+            "pixel_share": pixels / len(pages)}
+
+if __name__ == "__main__":
+    import sys
+    ocr = AdaptiveOcr()
+    for pdf_path in sys.argv[1:]:
+        _, reports = ocr.extract_pages(pdf_path)
+        print(pdf_path)
+        for r in reports:
+            flag = "  (escalated)" if r["escalated"] else ""
+            print(f"  page {r['page']:>3}: {r['dpi']} DPI, confidence {r['confidence']:.1f}{flag}")
+        summary = summarize_ocr(reports)
+        print(f"  {summary['escalated']}/{summary['pages']} pages escalated, "
+              f"{summary['pixel_share']:.0%} of the pixels of {DEFAULT_DPI} DPI")
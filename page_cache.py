@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+from ocr import FixedOcr, render_page
+from tracing import count
+
+def _sha1(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def page_image_hash(page):
+    """Hash a rendered page image; identical pages in a revised draft hash the same."""
+    return _sha1(f"{page.mode}:{page.size}".encode("utf-8") + page.tobytes())
+
+class PageCache:
+    """
+    Content-addressed store of per-page and per-paragraph results, so a revised renewal
+    only pays for the pages and paragraphs that actually changed.
+    - documents/<file hash>.json   page texts of a PDF already seen
+    - pages/<page hash>.json       OCR text and report of one page (per OCR settings)
+    - embeddings/<key>.npy         embedding of one paragraph (per backend)
+    - diffs/<key>.html             rendered diff table of one paragraph pair
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        for sub in ("documents", "pages", "embeddings", "diffs"):
+            os.makedirs(os.path.join(cache_dir, sub), exist_ok=True)
+        self.stats = {"pages_cached": 0, "pages_ocr": 0, "embeddings_cached": 0,
+                      "embeddings_computed": 0, "diffs_cached": 0, "diffs_computed": 0}
+
+    def _path(self, sub, key, ext):
+        return os.path.join(self.cache_dir, sub, key + ext)
+
+    def _read_text(self, sub, key, ext):
+        path = self._path(sub, key, ext)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _write_atomic(self, path, write):
+        """
+        Write a cache entry through a uniquely named temporary file and move it into place, so
+        readers never see a partial entry and concurrent writers of the same key (e.g. identical
+        pages of both documents OCR'd at once) do not collide. Entries are content-addressed,
+        so when another writer's replace wins, its copy is just as good.
+        """
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp, path)
+        except OSError:
+            if not os.path.exists(path):
+                raise
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _write_text(self, sub, key, ext, text):
+        self._write_atomic(self._path(sub, key, ext), lambda f: f.write(text.encode("utf-8")))
+
+    def _document_key(self, pdf_path, ocr):
+        return file_hash(pdf_path) + "-" + ocr.key
+
+    def lookup_document(self, pdf_path, ocr=None):
+        """Page texts of a byte-identical PDF OCR'd before with the same settings, or None."""
+        manifest = self._read_text("documents", self._document_key(pdf_path, ocr or FixedOcr()), ".json")
+        if manifest is None:
+            return None
+        texts = json.loads(manifest)
+        self.stats["pages_cached"] += len(texts)
+        return texts
+
+    def remember_document(self, pdf_path, texts, ocr=None):
+        self._write_text("documents", self._document_key(pdf_path, ocr or FixedOcr()), ".json", json.dumps(texts))
+
+    def ocr_page(self, page, ocr=None, rerender=None):
+        """
+        OCR one rendered page with `ocr` (an ocr.FixedOcr / AdaptiveOcr), unless a page with identical
+        pixels was OCR'd before with the same settings. Returns (text, report).
+        """
+        ocr = ocr or FixedOcr()
+        page_key = page_image_hash(page) + "-" + ocr.key
+        cached = self._read_text("pages", page_key, ".json")
+        if cached is not None:
+            self.stats["pages_cached"] += 1
+            entry = json.loads(cached)
+            return entry["text"], dict(entry["report"], cached=True)
+        text, report = ocr.ocr_page(page, rerender)
+        self._write_text("pages", page_key, ".json", json.dumps({"text": text, "report": report}))
+        self.stats["pages_ocr"] += 1
+        return text, report
+
+    def extract_pages(self, pdf_path, dpi=300, ocr=None):
+        """
+        Return the OCR text of every page, OCR'ing only pages not seen before.
+        A byte-identical PDF skips rendering entirely.
+        """
+        from pdf2image import convert_from_path
+
+        ocr = ocr or FixedOcr(dpi)
+        texts = self.lookup_document(pdf_path, ocr)
+        if texts is None:
+            texts = []
+            for page_number, page in enumerate(convert_from_path(pdf_path, dpi=ocr.dpi)):
+                rerender = lambda page_dpi, n=page_number: render_page(pdf_path, n, page_dpi)
+                texts.append(self.ocr_page(page, ocr, rerender)[0])
+            self.remember_document(pdf_path, texts, ocr)
+        count("pages", len(texts))
+        return texts
+
+    def extract_text(self, pdf_path, dpi=300, ocr=None):
+        """Drop-in replacement for extract_ocr_text_from_pdf backed by the page cache."""
+        return "".join(text + "\n" for text in self.extract_pages(pdf_path, dpi=dpi, ocr=ocr))
+
+    def cached_encode(self, encode, namespace="default"):
+        """
+        Wrap an encode function so each paragraph is embedded at most once per namespace (e.g. backend).
+        `namespace` may be a function, called on first use (e.g. to ask the embedding server for its backend).
+        """
+        def encode_with_cache(paragraphs):
+            prefix = namespace() if callable(namespace) else namespace
+            keys = [_sha1(prefix + "\0" + p) for p in paragraphs]
+            embeddings = [None] * len(paragraphs)
+            missing = []
+            for i, key in enumerate(keys):
+                path = self._path("embeddings", key, ".npy")
+                if os.path.exists(path):
+                    embeddings[i] = np.load(path)
+                else:
+                    missing.append(i)
+            self.stats["embeddings_cached"] += len(paragraphs) - len(missing)
+            if missing:
+                computed = np.asarray(encode([paragraphs[i] for i in missing]), dtype=np.float32)
+                for i, emb in zip(missing, computed):
+                    self._write_atomic(self._path("embeddings", keys[i], ".npy"), lambda f, emb=emb: np.save(f, emb))
+                    embeddings[i] = emb
+                self.stats["embeddings_computed"] += len(missing)
+            if not embeddings:
+                return np.zeros((0, 0), dtype=np.float32)
+            return np.vstack(embeddings)
+        return encode_with_cache
+
+    def _diff_key(self, make_diff, exp_text, ren_text):
+        return _sha1(getattr(make_diff, "__name__", "") + "\0" + exp_text + "\0" + ren_text)
+
+    def lookup_diff(self, make_diff, exp_text, ren_text):
+        """The stored diff of a paragraph pair by `make_diff`, or None."""
+        html = self._read_text("diffs", self._diff_key(make_diff, exp_text, ren_text), ".html")
+        if html is not None:
+            self.stats["diffs_cached"] += 1
+        return html
+
+    def store_diff(self, make_diff, exp_text, ren_text, html):
+        self._write_text("diffs", self._diff_key(make_diff, exp_text, ren_text), ".html", html)
+        self.stats["diffs_computed"] += 1
+
+    def cached_diff(self, make_diff, exp_text, ren_text):
+        """Return the diff of a paragraph pair, rendering it only if this exact pair is new to `make_diff`."""
+        html = self.lookup_diff(make_diff, exp_text, ren_text)
+        if html is None:
+            html = make_diff(exp_text, ren_text)
+            self.store_diff(make_diff, exp_text, ren_text, html)
+        return html
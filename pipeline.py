@@ -0,0 +1,205 @@
+import queue
+import re
+import threading
+from execution import current_plan
+from ocr import FixedOcr, render_page
+from tracing import current_trace, use_trace, span, count
+
+# Paragraph boundary, as in main.smart_split_into_paragraphs
+PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+_DONE = object()
+
+class StreamingSplitter:
+    """
+    Incremental version of main.smart_split_into_paragraphs: feed page texts in order and get
+    back the paragraphs completed so far. The text after the last paragraph break is held back,
+    since a paragraph may continue on the next page.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        last_break = None
+        for last_break in PARAGRAPH_BREAK.finditer(self.buffer):
+            pass
+        if last_break is None:
+            return []
+        # Keep the break itself: more whitespace on the next page may extend it
+        done, self.buffer = self.buffer[:last_break.start()], self.buffer[last_break.start():]
+        return [p.strip() for p in PARAGRAPH_BREAK.split(done) if p.strip()]
+
+    def close(self):
+        rest, self.buffer = self.buffer, ""
+        return [p.strip() for p in PARAGRAPH_BREAK.split(rest) if p.strip()]
+
+class _Document:
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self.num_pages = None
+        self.page_texts = {}
+        self.ocr_reports = {}
+        self.next_page = 0
+        self.splitter = StreamingSplitter()
+        self.paragraphs = []
+
+    def add_page(self, page_number, text):
+        """Record one OCR'd page; return the paragraphs completed by the pages now contiguous."""
+        self.page_texts[page_number] = text
+        completed = []
+        while self.next_page in self.page_texts:
+            completed += self.splitter.feed(self.page_texts[self.next_page] + "\n")
+            self.next_page += 1
+        if self.next_page == self.num_pages:
+            completed += self.splitter.close()
+        self.paragraphs += completed
+        return completed
+
+    @property
+    def text(self):
+        return "".join(self.page_texts[n] + "\n" for n in range(len(self.page_texts)))
+
+def _put(q, item, failed):
+    """Blocking put that gives up once another stage has failed, so no thread waits forever."""
+    while not failed.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _get(q, failed):
+    """Blocking get that returns _DONE once another stage has failed."""
+    while not failed.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _DONE
+
+def process_documents(pdf_paths, encode=None, ocr=None, ocr_page=None, page_texts=None,
+                      ocr_workers=None, queue_size=None, encode_batch_size=64):
+    """
+    OCR, split and (optionally) encode several PDFs at once as a pipeline of bounded queues:
+        rasterize (one thread per document) -> OCR (shared worker pool) -> split -> encode (one thread)
+    Pages are rendered one at a time and OCR'd as soon as they are rendered. Paragraphs are split out
+    as soon as the pages holding them are in, and encoded while later pages are still in OCR. So the
+    end-to-end time approaches that of the slowest stage, not the sum of all of them.
+    - encode: function mapping a list of paragraphs to embeddings (None skips the encode stage)
+    - ocr: OCR settings (ocr.FixedOcr or ocr.AdaptiveOcr); pages are first rendered at ocr.dpi
+    - ocr_page: function (image, rerender) -> (text, report) to use instead of ocr.ocr_page,
+      e.g. the page cache's
+    - ocr_workers: parallel OCR threads (default: the execution plan's OCR budget, see execution.py)
+    - page_texts: page texts already known for some documents (e.g. from the page cache), by position;
+      those documents skip rasterizing and OCR
+    Returns (documents, embeddings): one {"pdf_path", "text", "pages", "ocr", "paragraphs"} dict per input
+    in input order, and a {paragraph: embedding} dict of everything encoded along the way.
+    """
+    ocr = ocr or FixedOcr()
+    ocr_page = ocr_page or ocr.ocr_page
+    page_texts = page_texts or {}
+    ocr_workers = ocr_workers or current_plan().ocr_workers
+    page_queue = queue.Queue(maxsize=queue_size or 2 * ocr_workers)
+    paragraph_queue = queue.Queue(maxsize=4 * encode_batch_size)
+    documents = [_Document(path) for path in pdf_paths]
+    embeddings = {}
+    lock = threading.Lock()
+    failed = threading.Event()
+    errors = []
+    trace = current_trace()
+
+    def stage(target):
+        def run(*args):
+            with use_trace(trace):
+                try:
+                    target(*args)
+                except BaseException as exc:
+                    errors.append(exc)
+                    failed.set()
+        return run
+
+    def add_page(doc, page_number, text):
+        with lock, span("split"):
+            completed = doc.add_page(page_number, text)
+        if encode is not None:
+            for paragraph in completed:
+                if not _put(paragraph_queue, paragraph, failed):
+                    return
+
+    def rasterize(doc):
+        for page_number in range(doc.num_pages):
+            if failed.is_set():
+                return
+            with span("rasterize"):
+                image = render_page(doc.pdf_path, page_number, ocr.dpi)
+            if not _put(page_queue, (doc, page_number, image), failed):
+                return
+
+    def recognize():
+        while True:
+            item = _get(page_queue, failed)
+            if item is _DONE:
+                return
+            doc, page_number, image = item
+            rerender = lambda dpi: render_page(doc.pdf_path, page_number, dpi)
+            with span("ocr"):
+                text, report = ocr_page(image, rerender)
+            doc.ocr_reports[page_number] = dict(report, page=page_number + 1)
+            add_page(doc, page_number, text)
+
+    def encoder():
+        finished = False
+        while not finished:
+            batch = [_get(paragraph_queue, failed)]
+            # Take whatever else is already waiting, up to one batch
+            while len(batch) < encode_batch_size:
+                try:
+                    batch.append(paragraph_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _DONE in batch:
+                batch.remove(_DONE)
+                finished = True
+            batch = list(dict.fromkeys(p for p in batch if p not in embeddings))
+            if batch and not failed.is_set():
+                for paragraph, emb in zip(batch, encode(batch)):
+                    embeddings[paragraph] = emb
+
+    with span("pipeline"):
+        from pdf2image import pdfinfo_from_path
+        rasterizers = []
+        for i, doc in enumerate(documents):
+            if i in page_texts:
+                doc.num_pages = len(page_texts[i])
+            else:
+                doc.num_pages = int(pdfinfo_from_path(doc.pdf_path)["Pages"])
+                rasterizers.append(threading.Thread(target=stage(rasterize), args=(doc,), daemon=True))
+        ocr_threads = [threading.Thread(target=stage(recognize), daemon=True) for _ in range(ocr_workers)]
+        encode_thread = threading.Thread(target=stage(encoder), daemon=True) if encode is not None else None
+        for thread in rasterizers + ocr_threads + ([encode_thread] if encode_thread else []):
+            thread.start()
+
+        for i, texts in page_texts.items():
+            for page_number, text in enumerate(texts):
+                add_page(documents[i], page_number, text)
+        for thread in rasterizers:
+            thread.join()
+        for _ in ocr_threads:
+            _put(page_queue, _DONE, failed)
+        for thread in ocr_threads:
+            thread.join()
+        if encode_thread:
+            _put(paragraph_queue, _DONE, failed)
+            encode_thread.join()
+    if errors:
+        raise errors[0]
+
+    count("pages", sum(doc.num_pages for doc in documents))
+    results = [{"pdf_path": doc.pdf_path, "text": doc.text,
+                "pages": [doc.page_texts[n] for n in range(doc.num_pages)],
+                "ocr": [doc.ocr_reports[n] for n in sorted(doc.ocr_reports)],
+                "paragraphs": doc.paragraphs} for doc in documents]
+    return results, embeddings
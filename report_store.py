@@ -0,0 +1,179 @@
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+REPORT_DIR = "reports"
+
+def make_record(expiring_pdf, renewal_pdf, result):
+    """
+    The stored form of a comparison: what changed, not how it looks. The stylesheet, page
+    template and diff tables are produced by render() from the shared code in main.py.
+    `result` is the dict returned by main.analyze_policies.
+    """
+    return {
+        "expiring_pdf": os.path.basename(expiring_pdf),
+        "renewal_pdf": os.path.basename(renewal_pdf),
+        "num_expiring": len(result["expiring_paragraphs"]),
+        "num_renewal": len(result["renewal_paragraphs"]),
+        "tier_counts": result["tier_counts"],
+        "changes": [{key: change[key] for key in ("index", "expiring", "renewal", "score", "tier", "sentences")}
+                    for change in result["changes"]],
+    }
+
+def record_key(record):
+    """Content hash of a record: comparing the same pair again stores nothing new."""
+    return hashlib.sha1(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()
+
+class ReportStore:
+    """
+    Archive of comparison results as gzip-compressed JSON records, rendered to HTML on demand.
+    - <key>.json.gz   one record per distinct comparison result (content-addressed, so duplicates are stored once)
+    - index.json      key -> {expiring_pdf, renewal_pdf, changes, bytes, saved} for listing and retention
+    - index.lock      file lock held while index.json is rewritten, so processes can share the store
+    Retention: when a limit is set, the oldest reports are evicted on save (or by prune()) until
+    there are at most `max_reports`, none older than `max_age_days` and at most `max_bytes` in total.
+    """
+
+    def __init__(self, root=REPORT_DIR, max_reports=None, max_age_days=None, max_bytes=None):
+        self.root = root
+        self.max_reports = max_reports
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".json.gz")
+
+    @contextmanager
+    def _locked(self):
+        """
+        Hold the store for a read-modify-write of index.json. The thread lock covers threads of
+        this process; the fcntl lock on index.lock covers other processes sharing the directory
+        (several web or Streamlit workers), which would otherwise drop each other's entries.
+        """
+        with self._lock, open(os.path.join(self.root, "index.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_atomic(self, path, data):
+        """Write through a uniquely named temporary file and move it into place."""
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _read_index(self):
+        path = os.path.join(self.root, "index.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_index(self, index):
+        self._write_atomic(os.path.join(self.root, "index.json"), json.dumps(index, indent=1).encode("utf-8"))
+
+    def save(self, record):
+        """Store a record (see make_record) and return its key."""
+        key = record_key(record)
+        with self._locked():
+            index = self._read_index()
+            if key not in index:
+                data = gzip.compress(json.dumps(record, separators=(",", ":")).encode("utf-8"), compresslevel=9)
+                self._write_atomic(self._path(key), data)
+                index[key] = {"expiring_pdf": record["expiring_pdf"], "renewal_pdf": record["renewal_pdf"],
+                              "changes": len(record["changes"]), "bytes": len(data)}
+            # A repeated comparison counts as new for retention
+            index[key]["saved"] = time.time()
+            self._write_index(index)
+        self.prune()
+        return key
+
+    def load(self, key):
+        with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def list(self):
+        """Stored reports, newest first, as index entries with their key."""
+        index = self._read_index()
+        return sorted(({"key": key, **entry} for key, entry in index.items()), key=lambda e: -e["saved"])
+
+    def render(self, key, make_diff=None):
+        """Rebuild the full HTML report of a stored comparison."""
+        from main import render_changes_report
+        record = self.load(key)
+        return render_changes_report(record["changes"], record["num_expiring"], record["num_renewal"],
+                                     record["tier_counts"], make_diff)
+
+    def prune(self, max_reports=None, max_age_days=None, max_bytes=None):
+        """Evict the oldest reports beyond the retention limits (the store's own unless given); returns evicted keys."""
+        max_reports = max_reports if max_reports is not None else self.max_reports
+        max_age_days = max_age_days if max_age_days is not None else self.max_age_days
+        max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        if max_reports is None and max_age_days is None and max_bytes is None:
+            return []
+
+        with self._locked():
+            index = self._read_index()
+            entries = sorted(index.items(), key=lambda item: item[1]["saved"])  # oldest first
+            total_bytes = sum(entry["bytes"] for _, entry in entries)
+            cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+            evicted = []
+            for key, entry in entries:
+                remaining = len(entries) - len(evicted)
+                if not ((max_reports is not None and remaining > max_reports) or
+                        (cutoff is not None and entry["saved"] < cutoff) or
+                        (max_bytes is not None and total_bytes > max_bytes)):
+                    break
+                evicted.append(key)
+                total_bytes -= entry["bytes"]
+                del index[key]
+                if os.path.exists(self._path(key)):
+                    os.remove(self._path(key))
+            if evicted:
+                self._write_index(index)
+        return evicted
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Browse and prune archived comparison reports.")
+    parser.add_argument("--root", default=REPORT_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    show = sub.add_parser("show", help="render a stored report to HTML")
+    show.add_argument("key")
+    show.add_argument("--output", default="diff_output.html")
+    prune = sub.add_parser("prune")
+    prune.add_argument("--max-reports", type=int)
+    prune.add_argument("--max-age-days", type=float)
+    prune.add_argument("--max-bytes", type=int)
+    args = parser.parse_args()
+
+    store = ReportStore(args.root)
+    if args.command == "list":
+        for entry in store.list():
+            saved = datetime.fromtimestamp(entry["saved"]).isoformat(timespec="seconds")
+            print(f"{entry['key'][:12]}  {saved}  {entry['bytes']:>8} B  {entry['changes']:>4} changes  "
+                  f"{entry['expiring_pdf']} -> {entry['renewal_pdf']}")
+    elif args.command == "show":
+        key = next((e["key"] for e in store.list() if e["key"].startswith(args.key)), args.key)
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(store.render(key))
+        print(f"Report written to {args.output}")
+    else:
+        evicted = store.prune(args.max_reports, args.max_age_days, args.max_bytes)
+        print(f"Evicted {len(evicted)} reports")
@@ -0,0 +1,112 @@
+import difflib
+import logging
+import os
+import re
+from cascade import paragraph_hash
+
+logger = logging.getLogger("policy_diff")
+
+# NLTK data is looked up locally (NLTK_DATA or ./nltk_data), never downloaded at import time.
+NLTK_DATA_DIR = os.environ.get("NLTK_DATA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "nltk_data"))
+
+def sent_tokenize(text):
+    """
+    Split text into sentences with NLTK's punkt model, loaded from the local NLTK data directory.
+    Install it once with: python -m nltk.downloader -d nltk_data punkt punkt_tab
+    """
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    return nltk.tokenize.sent_tokenize(text)
+
+# Used when the NLTK punkt data is not installed: break after . ! ? ; followed by a capital, digit or bracket
+_FALLBACK_SENTENCE_END = re.compile(r'(?<=[.!?;])\s+(?=[A-Z(\d])')
+
+def split_sentences(text):
+    """Sentences of a paragraph as (start, end) character offsets into `text`."""
+    try:
+        sentences = sent_tokenize(text)
+    except LookupError:
+        logger.debug("NLTK punkt data not found; splitting sentences on punctuation")
+        sentences = _FALLBACK_SENTENCE_END.split(text)
+    spans = []
+    position = 0
+    for sentence in sentences:
+        start = text.find(sentence, position)
+        if start < 0:
+            start = position
+        position = start + len(sentence)
+        spans.append((start, position))
+    return spans
+
+def localize_changes(exp_text, ren_text, clean=None, exp_spans=None, ren_spans=None):
+    """
+    Align the sentences of a changed paragraph pair by their normalized hashes (see cascade.paragraph_hash)
+    and return only the runs of sentences that differ, as dicts with
+    - op: "replace", "insert" or "delete"
+    - expiring, renewal: the text of the run on each side ("" for an insert or delete)
+    - expiring_sentences, renewal_sentences: (first, last + 1) sentence numbers of the run
+    - expiring_span, renewal_span: (start, end) character offsets of the run in each paragraph
+    `exp_spans` / `ren_spans` are the split_sentences results when the caller already has them.
+    """
+    exp_spans = split_sentences(exp_text) if exp_spans is None else exp_spans
+    ren_spans = split_sentences(ren_text) if ren_spans is None else ren_spans
+    exp_hashes = [paragraph_hash(exp_text[start:end], clean) for start, end in exp_spans]
+    ren_hashes = [paragraph_hash(ren_text[start:end], clean) for start, end in ren_spans]
+
+    def char_span(spans, first, last, text):
+        if first < last:
+            return spans[first][0], spans[last - 1][1]
+        position = spans[first][0] if first < len(spans) else len(text)  # where an insert would go
+        return position, position
+
+    changes = []
+    matcher = difflib.SequenceMatcher(None, exp_hashes, ren_hashes, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            continue
+        exp_span, ren_span = char_span(exp_spans, i1, i2, exp_text), char_span(ren_spans, j1, j2, ren_text)
+        changes.append({"op": op, "expiring": exp_text[exp_span[0]:exp_span[1]],
+                        "renewal": ren_text[ren_span[0]:ren_span[1]],
+                        "expiring_sentences": (i1, i2), "renewal_sentences": (j1, j2),
+                        "expiring_span": exp_span, "renewal_span": ren_span})
+    return changes
+
+def _sentence_range(first, last):
+    if first >= last:
+        return "-"
+    return f"sentence {first + 1}" if last == first + 1 else f"sentences {first + 1}-{last}"
+
+def _char_range(span):
+    start, end = span
+    return f"characters {start}-{end}" if start < end else f"at character {start}"
+
+def describe_change(change, num_expiring=None, num_renewal=None):
+    """One-line location of a localize_changes run: its sentence numbers and character spans on each side."""
+    of_expiring = f" of {num_expiring}" if num_expiring is not None else ""
+    of_renewal = f" of {num_renewal}" if num_renewal is not None else ""
+    return (f"Expiring {_sentence_range(*change['expiring_sentences'])}{of_expiring} "
+            f"({_char_range(change['expiring_span'])}), "
+            f"renewal {_sentence_range(*change['renewal_sentences'])}{of_renewal} "
+            f"({_char_range(change['renewal_span'])}) ({change['op']})")
+
+def render_sentence_diff(exp_text, ren_text, make_diff, clean=None, min_sentences=3):
+    """
+    Diff a changed paragraph pair sentence by sentence: only the runs of changed sentences go
+    through `make_diff`, so a one-word edit in a page-long clause renders as one small table.
+    Pairs with fewer than `min_sentences` sentences on both sides (or no sentence-level
+    difference, e.g. a paragraph missing from the renewal) are diffed whole.
+    """
+    if not exp_text or not ren_text:
+        return make_diff(exp_text, ren_text)
+    exp_spans, ren_spans = split_sentences(exp_text), split_sentences(ren_text)
+    if max(len(exp_spans), len(ren_spans)) < min_sentences:
+        return make_diff(exp_text, ren_text)
+    changes = localize_changes(exp_text, ren_text, clean, exp_spans, ren_spans)
+    if not changes:
+        return make_diff(exp_text, ren_text)
+    parts = []
+    for change in changes:
+        parts.append(f"<p>{describe_change(change, len(exp_spans), len(ren_spans))}</p>")
+        parts.append(make_diff(change["expiring"], change["renewal"]))
+    return "\n".join(parts)
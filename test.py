@@ -1,11 +1,14 @@
 import json
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report, confusion_matrix, ConfusionMatrixDisplay
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
 from main import *
 import matplotlib.pyplot as plt
 
-def main_test(expiring_pdf, renewal_pdf, threshold=0.95):
+def main_test(expiring_pdf, renewal_pdf, threshold=0.95, backend="torch"):
     html_parts = []
     html_parts.append("<html><head><meta charset='UTF-8'><title>Policy Diff - Entire Policy</title>")
     html_parts.append("""
@@ -28,16 +31,16 @@ def main_test(expiring_pdf, renewal_pdf, threshold=0.95):
     renewal_text = extract_ocr_text_from_pdf(renewal_pdf)
 
     # Step 2: Clean and split
-    expiring_paragraphs = smart_split_into_paragraphs(clean_text_for_comparison(expiring_text))
-    renewal_paragraphs = smart_split_into_paragraphs(clean_text_for_comparison(renewal_text))
+    expiring_paragraphs = evaluation_paragraphs(expiring_text)
+    renewal_paragraphs = evaluation_paragraphs(renewal_text)
 
     html_parts.append(f"<p>Number of paragraphs in Expiring Policy: {len(expiring_paragraphs)}</p>")
     html_parts.append(f"<p>Number of paragraphs in Renewal Policy: {len(renewal_paragraphs)}</p>")
 
-    # Step 3: Compare using embeddings
-    model = SentenceTransformer("all-MiniLM-L6-v2")
-    exp_embeddings = model.encode(expiring_paragraphs)
-    ren_embeddings = model.encode(renewal_paragraphs)
+    # Step 3: Compare using embeddings (through the shared embedding server when one is configured)
+    encode = make_encoder(backend)
+    exp_embeddings = encode(expiring_paragraphs)
+    ren_embeddings = encode(renewal_paragraphs)
     similarity_matrix = cosine_similarity(exp_embeddings, ren_embeddings)
 
     paragraph_predictions = []
@@ -68,9 +71,16 @@ def strip_date_from_filename(filename):
     name = re.sub(r'\s*@\s*\d{1,2}[-/]\d{1,2}[-/]\d{2,4}', '', name)
     return name.strip()
 
-def batch_test(expiring_dir, renewal_dir, groundtruth_dir):
+def batch_test(expiring_dir, renewal_dir, groundtruth_dir, workers=None, threads=None):
+    """
+    Paragraph-level evaluation over all annotated pairs.
+    `workers` x `threads` is the execution knob (see execution.py); with several workers the
+    pairs are compared in parallel processes.
+    """
+    plan = configure(workers, threads)
     y_true = []
     y_pred = []
+    jobs = []
 
     for filename in os.listdir(expiring_dir):
         if not filename.endswith(".pdf"):
@@ -95,10 +105,16 @@ def batch_test(expiring_dir, renewal_dir, groundtruth_dir):
         # Load ground truth
         with open(groundtruth_file, 'r') as f:
             truth = json.load(f)
-        expected_changes = truth.get("paragraph_changes", [])
+        jobs.append((policy_name, expiring_pdf, matching_renewal_pdf, truth.get("paragraph_changes", [])))
 
-        # Get model predictions
-        detected_changes = main_test(expiring_pdf, matching_renewal_pdf)
+    # Get model predictions
+    if plan.workers > 1:
+        with ProcessPoolExecutor(max_workers=plan.workers) as pool:
+            predictions = list(pool.map(main_test, [job[1] for job in jobs], [job[2] for job in jobs]))
+    else:
+        predictions = [main_test(job[1], job[2]) for job in jobs]
+
+    for (policy_name, _, _, expected_changes), detected_changes in zip(jobs, predictions):
         # Ensure list
         if not isinstance(detected_changes, list):
             print(f"⚠️ Model output for {policy_name} is not a list.")
@@ -0,0 +1,219 @@
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+logger = logging.getLogger("policy_diff")
+
+# Environment switches
+PROFILE_ENV = "POLICY_DIFF_PROFILE"            # "cprofile" or "pyinstrument"
+PROFILE_DIR_ENV = "POLICY_DIFF_PROFILE_DIR"    # where profiles are written (default: profiles/)
+TRACE_LOG_ENV = "POLICY_DIFF_TRACE_LOG"        # append one JSON line per comparison to this file
+METRICS_PORT_ENV = "POLICY_DIFF_METRICS_PORT"  # serve Prometheus text metrics on this port
+
+class Trace:
+    """
+    Spans and counters for one comparison.
+    Spans nest per thread and are aggregated by name on export.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self.spans = []
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def span(self, name, **attrs):
+        stack = self._local.__dict__.setdefault("stack", [])
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                self.spans.append({"name": name, "parent": parent, "seconds": duration, **attrs})
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def stage_totals(self):
+        totals = {}
+        for span in self.spans:
+            total = totals.setdefault(span["name"], {"seconds": 0.0, "calls": 0})
+            total["seconds"] += span["seconds"]
+            total["calls"] += 1
+        return totals
+
+    def to_dict(self):
+        return {"trace": self.name, "started": self.started,
+                "stages": self.stage_totals(), "counters": dict(self.counters)}
+
+class MetricsRegistry:
+    """Process-wide totals across all finished traces, exported in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = {}
+        self.stage_calls = {}
+        self.counters = {}
+        self.traces = 0
+
+    def record(self, trace):
+        with self._lock:
+            self.traces += 1
+            for stage, total in trace.stage_totals().items():
+                self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + total["seconds"]
+                self.stage_calls[stage] = self.stage_calls.get(stage, 0) + total["calls"]
+            for name, value in trace.counters.items():
+                self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_prometheus(self):
+        with self._lock:
+            lines = ["# HELP policy_diff_comparisons_total Comparisons finished.",
+                     "# TYPE policy_diff_comparisons_total counter",
+                     f"policy_diff_comparisons_total {self.traces}",
+                     "# HELP policy_diff_stage_seconds Time spent per pipeline stage.",
+                     "# TYPE policy_diff_stage_seconds summary"]
+            for stage in sorted(self.stage_seconds):
+                lines.append(f'policy_diff_stage_seconds_sum{{stage="{stage}"}} {self.stage_seconds[stage]:.6f}')
+                lines.append(f'policy_diff_stage_seconds_count{{stage="{stage}"}} {self.stage_calls[stage]}')
+            for name in sorted(self.counters):
+                metric = f"policy_diff_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {self.counters[name]}")
+        return "\n".join(lines) + "\n"
+
+class _NullTrace(Trace):
+    """Stand-in outside a traced comparison: records nothing."""
+
+    @contextmanager
+    def span(self, name, **attrs):
+        yield
+
+    def count(self, name, value=1):
+        pass
+
+REGISTRY = MetricsRegistry()
+_current = threading.local()
+_NULL_TRACE = _NullTrace("untraced")
+
+def current_trace():
+    """The trace of the comparison running in this thread (a throwaway one outside a comparison)."""
+    return getattr(_current, "trace", None) or _NULL_TRACE
+
+def span(name, **attrs):
+    """Time a pipeline stage in the current trace: `with span("encode"): ...`."""
+    return current_trace().span(name, **attrs)
+
+def count(name, value=1):
+    """Add to a counter (pages, paragraphs, cache hits, ...) in the current trace."""
+    current_trace().count(name, value)
+
+@contextmanager
+def traced(name):
+    """
+    Trace one comparison: collect spans and counters, then add them to the process-wide
+    registry, log them as JSON and, if enabled, append them to the trace log.
+    Worker threads join the same trace with `use_trace(trace)`.
+    """
+    trace = Trace(name)
+    previous = getattr(_current, "trace", None)
+    _current.trace = trace
+    try:
+        with profiled(name):
+            yield trace
+    finally:
+        _current.trace = previous
+        REGISTRY.record(trace)
+        record = json.dumps(trace.to_dict())
+        logger.info(record)
+        log_path = os.environ.get(TRACE_LOG_ENV)
+        if log_path:
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(record + "\n")
+
+@contextmanager
+def use_trace(trace):
+    """Attach a worker thread to an existing trace."""
+    previous = getattr(_current, "trace", None)
+    _current.trace = trace
+    try:
+        yield trace
+    finally:
+        _current.trace = previous
+
+@contextmanager
+def profiled(name, mode=None):
+    """
+    Capture a cProfile (.prof) or pyinstrument (.html) profile of the block when
+    `mode` or the POLICY_DIFF_PROFILE environment variable asks for one.
+    """
+    mode = (mode or os.environ.get(PROFILE_ENV, "")).lower()
+    if mode not in ("cprofile", "pyinstrument"):
+        yield
+        return
+
+    out_dir = os.environ.get(PROFILE_DIR_ENV, "profiles")
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            path = os.path.join(out_dir, f"{name}-{stamp}.prof")
+            profiler.dump_stats(path)
+            logger.info("cProfile written to %s", path)
+    else:
+        from pyinstrument import Profiler
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            path = os.path.join(out_dir, f"{name}-{stamp}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+            logger.info("pyinstrument profile written to %s", path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_metrics_server = None
+
+def start_metrics_server(port=None):
+    """Serve /metrics in Prometheus text format from a background thread (once per process)."""
+    global _metrics_server
+    port = port or os.environ.get(METRICS_PORT_ENV)
+    if _metrics_server is not None or not port:
+        return _metrics_server
+    _metrics_server = HTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+    threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    return _metrics_server
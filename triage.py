@@ -0,0 +1,177 @@
+import hashlib
+import os
+import re
+import time
+from cascade import normalize_paragraph
+from clause_index import parse_policy_filename
+from page_cache import file_hash
+from tracing import traced, span, count
+
+# Reason codes
+IDENTICAL_FILE = "IDENTICAL_FILE"      # byte-identical PDFs
+IDENTICAL_PAGES = "IDENTICAL_PAGES"    # every page draws the same content
+COSMETIC_ONLY = "COSMETIC_ONLY"        # same words once dates, case, whitespace and layout are normalized
+TEXT_CHANGED = "TEXT_CHANGED"          # confirmed wording change
+NO_TEXT_LAYER = "NO_TEXT_LAYER"        # scanned pages and no OCR fallback: needs the full pipeline
+
+_MONTH = (r'(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|'
+          r'sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)')
+_DAY = r'\d{1,2}(?:st|nd|rd|th)?'
+# Fields every renewal changes: policy period dates written out in words, and the policy number
+RENEWAL_FIELDS = [
+    (re.compile(rf'\b(?:{_DAY}\s+(?:of\s+)?)?{_MONTH}\.?\s+(?:{_DAY},?\s+)?\d{{4}}\b', re.IGNORECASE), "<date>"),
+    (re.compile(r'\b(policy\s+(?:number|no\.?)\s*:?\s*)[\w-]+', re.IGNORECASE), r"\1<number>"),
+]
+
+def mask_renewal_fields(text):
+    """Replace the dates and policy numbers that change on every renewal with placeholders."""
+    for pattern, placeholder in RENEWAL_FIELDS:
+        text = pattern.sub(placeholder, text)
+    return text
+
+def page_hash(page):
+    """Hash what a PyPDF2 page draws: its content stream and the XObjects (e.g. scanned images) it uses."""
+    digest = hashlib.sha1()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    for name, xobject in sorted((xobjects.get_object() if xobjects else {}).items()):
+        stream = xobject.get_object()
+        digest.update(name.encode("utf-8"))
+        digest.update(getattr(stream, "_data", b"") or b"")
+    return digest.hexdigest()
+
+class _PageTokens:
+    """Normalized words of a PDF, read page by page on demand (text layer, or OCR for scanned pages)."""
+
+    def __init__(self, pdf_path, reader, clean, ocr):
+        self.pdf_path = pdf_path
+        self.reader = reader
+        self.clean = clean
+        self.ocr = ocr
+        self.next_page = 0
+        self.tokens = []   # (token, page number)
+        self.pages_read = 0
+
+    def load_next_page(self):
+        """Append the next page's tokens; False at the end of the document."""
+        if self.next_page >= len(self.reader.pages):
+            return False
+        page_number = self.next_page
+        self.next_page += 1
+        text = self.reader.pages[page_number].extract_text() or ""
+        if not text.strip() and self.ocr is not None:
+            from ocr import render_page
+            with span("ocr"):
+                text, _ = self.ocr.ocr_page(render_page(self.pdf_path, page_number, self.ocr.dpi),
+                                            lambda dpi: render_page(self.pdf_path, page_number, dpi))
+        elif not text.strip() and self.reader.pages[page_number].get_contents() is not None:
+            raise _NoTextLayer(page_number + 1)
+        self.pages_read += 1
+        self.tokens.extend((token, page_number + 1) for token in normalize_paragraph(text, self.clean).split())
+        return True
+
+class _NoTextLayer(Exception):
+    pass
+
+def _snippet(tokens, i, before=3, after=12):
+    return " ".join(token for token, _ in tokens[max(0, i - before):i + after])
+
+def triage_pair(expiring_pdf, renewal_pdf, clean=None, ocr=None):
+    """
+    Answer "did anything material change?" as cheaply as possible, without matching or rendering:
+    1. file hash:  byte-identical PDFs                                   -> IDENTICAL_FILE
+    2. page hash:  every page draws the same content                     -> IDENTICAL_PAGES
+    3. text:       normalized words are compared page by page from the first differing page,
+                   stopping at the first difference                      -> TEXT_CHANGED or COSMETIC_ONLY
+    Words are normalized with `clean` (default: main.clean_text_for_comparison, then mask_renewal_fields).
+    Text comes from the PDF text layer. Scanned pages are OCR'd one at a time with `ocr`
+    (an ocr.FixedOcr / AdaptiveOcr); without it they give NO_TEXT_LAYER.
+    The text layer of these slips has no reliable paragraph breaks, so normalized words rather
+    than paragraphs are compared; a moved clause therefore counts as a change.
+    Returns {"material", "reason", "pages_read", "page", "expiring", "renewal", "seconds"};
+    "material" is None when the pair could not be triaged.
+    """
+    from PyPDF2 import PdfReader
+    if clean is None:
+        from main import clean_text_for_comparison
+        clean = lambda text: mask_renewal_fields(clean_text_for_comparison(text))
+
+    start = time.perf_counter()
+    result = {"material": False, "reason": None, "pages_read": 0, "page": None, "expiring": "", "renewal": ""}
+
+    def finish(reason, material, **details):
+        result.update(details, reason=reason, material=material, seconds=time.perf_counter() - start)
+        count(f"triage_{reason.lower()}")
+        return result
+
+    with span("file_hash"):
+        if file_hash(expiring_pdf) == file_hash(renewal_pdf):
+            return finish(IDENTICAL_FILE, False)
+
+    expiring_reader, renewal_reader = PdfReader(expiring_pdf), PdfReader(renewal_pdf)
+    with span("page_hash"):
+        expiring_hashes = [page_hash(page) for page in expiring_reader.pages]
+        renewal_hashes = [page_hash(page) for page in renewal_reader.pages]
+    if expiring_hashes == renewal_hashes:
+        return finish(IDENTICAL_PAGES, False)
+    # Leading pages that draw the same content need no text comparison
+    same = 0
+    while same < min(len(expiring_hashes), len(renewal_hashes)) and expiring_hashes[same] == renewal_hashes[same]:
+        same += 1
+
+    expiring = _PageTokens(expiring_pdf, expiring_reader, clean, ocr)
+    renewal = _PageTokens(renewal_pdf, renewal_reader, clean, ocr)
+    expiring.next_page = renewal.next_page = same
+    i = 0
+    with span("text"):
+        try:
+            while True:
+                # Read another page only when one side runs out of words
+                while i >= len(expiring.tokens) and expiring.load_next_page():
+                    pass
+                while i >= len(renewal.tokens) and renewal.load_next_page():
+                    pass
+                result["pages_read"] = expiring.pages_read + renewal.pages_read
+                exp_done, ren_done = i >= len(expiring.tokens), i >= len(renewal.tokens)
+                if exp_done and ren_done:
+                    return finish(COSMETIC_ONLY, False)
+                if exp_done or ren_done or expiring.tokens[i][0] != renewal.tokens[i][0]:
+                    page = (expiring.tokens[min(i, len(expiring.tokens) - 1)][1] if expiring.tokens else None,
+                            renewal.tokens[min(i, len(renewal.tokens) - 1)][1] if renewal.tokens else None)
+                    return finish(TEXT_CHANGED, True, page=page, expiring=_snippet(expiring.tokens, i),
+                                  renewal=_snippet(renewal.tokens, i))
+                i += 1
+        except _NoTextLayer as exc:
+            return finish(NO_TEXT_LAYER, None, page=exc.args[0])
+
+def triage_batch(expiring_dir, renewal_dir, ocr=None):
+    """
+    Triage every expiring/renewal pair of two folders (paired by insured name) and
+    return {insured name: triage result}, for routing a renewal book before full review.
+    """
+    def by_insured(folder):
+        return {parse_policy_filename(f)[0]: os.path.join(folder, f)
+                for f in sorted(os.listdir(folder)) if f.lower().endswith(".pdf")}
+
+    expiring, renewal = by_insured(expiring_dir), by_insured(renewal_dir)
+    results = {}
+    with traced("triage"):
+        for insured in sorted(expiring.keys() & renewal.keys()):
+            results[insured] = triage_pair(expiring[insured], renewal[insured], ocr=ocr)
+    return results
+
+if __name__ == "__main__":
+    import sys
+    expiring_dir = sys.argv[1] if len(sys.argv) > 1 else "ANNOTATED-POLICIES/EXPIRING"
+    renewal_dir = sys.argv[2] if len(sys.argv) > 2 else "ANNOTATED-POLICIES/RENEWAL"
+    results = triage_batch(expiring_dir, renewal_dir)
+    for insured, result in results.items():
+        line = f"{insured:<35} {result['reason']:<16} {result['seconds'] * 1000:7.1f} ms"
+        if result["reason"] == TEXT_CHANGED:
+            line += f"  p.{result['page'][1]}: {result['expiring'][:50]!r} -> {result['renewal'][:50]!r}"
+        print(line)
+    review = sum(1 for r in results.values() if r["material"] is not False)
+    print(f"\n{review} of {len(results)} pairs need review")
@@ -1,5 +1,4 @@
 import matplotlib.pyplot as plt
-from test import *
 
 # Metrics for Changed and Unchanged labels
 labels = ["Unchanged", "Changed"]
@@ -1,7 +1,19 @@
-import base64
+import hashlib
 import streamlit as st
 import tempfile
 from main import *
+from clause_index import detect_section
+from report_store import ReportStore, make_record
+from sentence_diff import describe_change
+from tracing import start_metrics_server
+
+PAGE_SIZE = 25  # changed paragraphs listed per page
+
+# Thread budgets per server process from POLICY_DIFF_WORKERS / POLICY_DIFF_THREADS
+configure()
+
+# Prometheus-style /metrics endpoint when POLICY_DIFF_METRICS_PORT is set
+start_metrics_server()
 
 st.title("Expiring vs. Renewal Comparison Tool")
 
@@ -24,33 +36,84 @@ custom_css = """
 </style>
 """
 st.markdown(custom_css, unsafe_allow_html=True)
+# Colours of the diff tables
+st.markdown(REPORT_STYLE, unsafe_allow_html=True)
 
 # Upload Expiring and Renewal PDF files
 expiring_file = st.file_uploader("Upload Expiring Policy", type="pdf", key="expiring")
 renewal_file = st.file_uploader("Upload Renewal Policy", type="pdf", key="renewal")
 
-if expiring_file is not None and renewal_file is not None:
+def run_comparison(expiring_bytes, renewal_bytes, expiring_name, renewal_name):
+    """Compare two uploaded policies; returns the analysis (paragraphs, matches, changes)."""
     # Save uploaded files to temporary files so they can be processed by difference code
     with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_exp:
-        tmp_exp.write(expiring_file.read())
+        tmp_exp.write(expiring_bytes)
         expiring_path = tmp_exp.name
     with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_ren:
-        tmp_ren.write(renewal_file.read())
+        tmp_ren.write(renewal_bytes)
         renewal_path = tmp_ren.name
 
-    st.write("Processing documents...")
-    
-    # Run the main function from main.py which produces the diff html report
-    main(expiring_path, renewal_path)
-    
-    # Read the generated HTML diff report
-    with open("diff_output.html", "r", encoding="utf-8") as f:
-        diff_html = f.read()
-    
-    # Encode the HTML content into base64
-    b64_html = base64.b64encode(diff_html.encode()).decode()
-    
-    # Create a data URL and hyperlink that opens the HTML in a new tab
-    new_tab_link = f'<a href="data:text/html;base64,{b64_html}" target="_blank">Report is Ready</a>'
-    
-    st.markdown(new_tab_link, unsafe_allow_html=True)
\ No newline at end of file
+    # Revised drafts of the same renewal only re-process the pages that changed
+    with traced("compare"):
+        result = analyze_policies(expiring_path, renewal_path, cache=cache)
+        record_cache_stats(cache)
+    result["report_key"] = reports.save(make_record(expiring_name, renewal_name, result))
+    section = None
+    sections = []
+    for para in result["expiring_paragraphs"]:
+        section = detect_section(para, section)
+        sections.append(section)
+    for change in result["changes"]:
+        change["section"] = sections[change["index"]] or ""
+    return result
+
+def snippet(text, length=70):
+    text = " ".join(text.split())
+    return text if len(text) <= length else text[:length - 1] + "…"
+
+cache = PageCache(".policy_cache")
+# Compressed archive of every comparison, kept for a year
+reports = ReportStore(".policy_reports", max_age_days=365)
+
+if expiring_file is not None and renewal_file is not None:
+    expiring_bytes = expiring_file.getvalue()
+    renewal_bytes = renewal_file.getvalue()
+    comparison_key = hashlib.sha1(expiring_bytes).hexdigest() + hashlib.sha1(renewal_bytes).hexdigest()
+
+    # Streamlit reruns this script on every interaction; compare each uploaded pair only once
+    if st.session_state.get("comparison_key") != comparison_key:
+        with st.spinner("Processing documents..."):
+            st.session_state["comparison"] = run_comparison(expiring_bytes, renewal_bytes,
+                                                            expiring_file.name, renewal_file.name)
+        st.session_state["comparison_key"] = comparison_key
+    result = st.session_state["comparison"]
+    changes = result["changes"]
+
+    unchanged = len(result["expiring_paragraphs"]) - len(changes)
+    st.write(f"Paragraphs in Expiring Policy: {len(result['expiring_paragraphs'])}; "
+             f"in Renewal Policy: {len(result['renewal_paragraphs'])}")
+    st.write(f"Paragraphs resolved by tier: {format_tier_counts(result['tier_counts'])}")
+    st.write(f"**{len(changes)} changed paragraphs to review**; {unchanged} unchanged paragraphs are hidden.")
+
+    # The full HTML report is only built when asked for
+    if st.button("Prepare full HTML report"):
+        st.download_button("Download full HTML report", reports.render(result["report_key"]),
+                           file_name="diff_output.html", mime="text/html")
+
+    if changes:
+        # Only one page of changes, and only the diffs that are opened, is sent to the browser
+        num_pages = (len(changes) + PAGE_SIZE - 1) // PAGE_SIZE
+        page = st.number_input(f"Page (of {num_pages})", min_value=1, max_value=num_pages, value=1, step=1) - 1
+        page_changes = changes[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+        st.table([{"Paragraph": change["index"] + 1, "Section": change["section"],
+                   "Similarity": f"{change['score']:.3f}", "Matched by": change["tier"] or "-",
+                   "Expiring": snippet(change["expiring"])} for change in page_changes])
+
+        for change in page_changes:
+            label = f"Paragraph {change['index'] + 1}: {snippet(change['expiring'], 60)}"
+            if st.checkbox(f"Show diff - {label}", key=f"diff-{comparison_key}-{change['index']}"):
+                # Through render_diffs, so even a page OCR'd as one paragraph is diffed within the budget
+                for run in change["sentences"]:
+                    st.caption(describe_change(run))
+                diff_html = render_diffs([(change["expiring"], change["renewal"])], get_sentence_diff, cache)[0]
+                st.markdown(diff_html, unsafe_allow_html=True)